@@ -3,19 +3,167 @@ import os
 # Basic configuration settings for the application
 
 TEE_CLIENT_URL = os.getenv("TEE_CLIENT_URL", "http://localhost:7999")
+TEE_HTTP_TIMEOUT = float(os.getenv("TEE_HTTP_TIMEOUT", "30"))
+TEE_HTTP_POOL_SIZE = int(os.getenv("TEE_HTTP_POOL_SIZE", "10"))
+# Vote payload sent to /score: "binary" (app/services/vote_codec.py) or "json"
+TEE_VOTE_FORMAT = os.getenv("TEE_VOTE_FORMAT", "binary")
 
 BACKEND_WALLET_PRIVATE_KEY = os.getenv("BACKEND_WALLET_PRIVATE_KEY", "0x6c156ca8d84657e2072639f8cad5f8ef4e26e3bc64299231e10f45fe4e736f3c")
+# Worker processes for transaction signing (app/services/signer.py)
+SIGNER_PROCESSES = int(os.getenv("SIGNER_PROCESSES", str(min(os.cpu_count() or 1, 4))))
+
+# Backend transactions (app/services/tx_manager.py): an unmined transaction is
+# re-sent with the same nonce and a TX_BUMP_PERCENT higher gas price every
+# TX_BUMP_AFTER_BLOCKS blocks, at most TX_MAX_BUMPS times and up to
+# TX_MAX_GAS_PRICE_GWEI (0: no cap). Sends give up after TX_TIMEOUT seconds.
+TX_BUMP_AFTER_BLOCKS = int(os.getenv("TX_BUMP_AFTER_BLOCKS", "3"))
+TX_BUMP_PERCENT = float(os.getenv("TX_BUMP_PERCENT", "20"))
+TX_MAX_BUMPS = int(os.getenv("TX_MAX_BUMPS", "5"))
+TX_MAX_GAS_PRICE_GWEI = float(os.getenv("TX_MAX_GAS_PRICE_GWEI", "0"))
+TX_POLL_INTERVAL = float(os.getenv("TX_POLL_INTERVAL", "1"))
+TX_TIMEOUT = float(os.getenv("TX_TIMEOUT", "300"))
+
+# Finalization (app/services/finalizer.py): finalize gets a gas limit of
+# FINALIZE_BASE_GAS plus FINALIZE_GAS_PER_VOTER per voter. Proposals needing
+# more than FINALIZE_MAX_GAS (keep it under the chain's block gas limit) are
+# not sent: they can't be finalized in one transaction.
+FINALIZE_BASE_GAS = int(os.getenv("FINALIZE_BASE_GAS", "150000"))
+FINALIZE_GAS_PER_VOTER = int(os.getenv("FINALIZE_GAS_PER_VOTER", "40000"))
+FINALIZE_MAX_GAS = int(os.getenv("FINALIZE_MAX_GAS", "15000000"))
+
+# Label write-back (app/services/label_outbox.py): pending updateLabel
+# transactions sent per label_writeback_job run. A failed write is retried
+# after LABEL_RETRY_BASE_SECONDS, doubling up to LABEL_RETRY_MAX_SECONDS, and
+# given up after LABEL_WRITE_MAX_ATTEMPTS attempts.
+LABEL_WRITE_BATCH_SIZE = int(os.getenv("LABEL_WRITE_BATCH_SIZE", "20"))
+LABEL_RETRY_BASE_SECONDS = float(os.getenv("LABEL_RETRY_BASE_SECONDS", "30"))
+LABEL_RETRY_MAX_SECONDS = float(os.getenv("LABEL_RETRY_MAX_SECONDS", "3600"))
+LABEL_WRITE_MAX_ATTEMPTS = int(os.getenv("LABEL_WRITE_MAX_ATTEMPTS", "8"))
+
+# Vote reveals (app/services/reveal.py): on-chain commits are read
+# REVEAL_READ_BATCH_SIZE voters per JSON-RPC batch; matching votes are revealed
+# REVEAL_TX_BATCH_SIZE transactions at a time. A failed revealVote is retried
+# after REVEAL_RETRY_BASE_SECONDS, doubling up to REVEAL_RETRY_MAX_SECONDS, and
+# given up after REVEAL_MAX_ATTEMPTS attempts.
+REVEAL_READ_BATCH_SIZE = int(os.getenv("REVEAL_READ_BATCH_SIZE", "100"))
+REVEAL_TX_BATCH_SIZE = int(os.getenv("REVEAL_TX_BATCH_SIZE", "20"))
+REVEAL_RETRY_BASE_SECONDS = float(os.getenv("REVEAL_RETRY_BASE_SECONDS", "15"))
+REVEAL_RETRY_MAX_SECONDS = float(os.getenv("REVEAL_RETRY_MAX_SECONDS", "600"))
+REVEAL_MAX_ATTEMPTS = int(os.getenv("REVEAL_MAX_ATTEMPTS", "6"))
+
+# Client-side JSON-RPC rate governor (app/services/rpc_governor.py): a token
+# bucket per endpoint starting at RPC_RATE requests/s, growing by about
+# RPC_RATE_INCREASE requests/s per second of successful calls and multiplied by
+# RPC_RATE_DECREASE on a 429 or timeout, within [RPC_MIN_RATE, RPC_MAX_RATE].
+RPC_RATE = float(os.getenv("RPC_RATE", "10"))
+RPC_MIN_RATE = float(os.getenv("RPC_MIN_RATE", "1"))
+RPC_MAX_RATE = float(os.getenv("RPC_MAX_RATE", "100"))
+RPC_RATE_INCREASE = float(os.getenv("RPC_RATE_INCREASE", "1"))
+RPC_RATE_DECREASE = float(os.getenv("RPC_RATE_DECREASE", "0.5"))
+RPC_BURST = float(os.getenv("RPC_BURST", "10"))
+RPC_MAX_RETRIES = int(os.getenv("RPC_MAX_RETRIES", "3"))
+
+# User-signed transactions relayed by /api/propose and /api/vote
+# (app/services/smart_contract_client.py): their receipt is polled every
+# RELAY_RECEIPT_POLL_INTERVAL seconds, for at most RELAY_RECEIPT_TIMEOUT.
+RELAY_RECEIPT_POLL_INTERVAL = float(os.getenv("RELAY_RECEIPT_POLL_INTERVAL", "1"))
+RELAY_RECEIPT_TIMEOUT = float(os.getenv("RELAY_RECEIPT_TIMEOUT", "120"))
 
 # Blockchain & Smart Contract settings
 BLOCKCHAIN_RPC_URL = os.getenv("BLOCKCHAIN_RPC_URL", "https://worldchain-sepolia.gateway.tenderly.co")
 VOTE_CONTRACT_ADDRESS = os.getenv("VOTE_CONTRACT_ADDRESS", "0x39CB184af026c05B6BcB507aA8365B2dbb377dcD")
 LABEL_CONTRACT_ADDRESS = os.getenv("LABEL_CONTRACT_ADDRESS", "0xe9D4186dBB7aa4E4054e6F5176e0206f58b6F64e")
 
+# SIWE sign-in (app/routes/world.py): the Safe isOwner check runs against
+# SIWE_RPC_URL and is cached (app/services/safe_owners.py) for SAFE_OWNER_TTL
+# seconds, or SAFE_OWNER_NEGATIVE_TTL for non-owners. With SAFE_OWNER_MULTICALL,
+# lookups arriving within SAFE_OWNER_BATCH_DELAY_MS share one Multicall3 call.
+SIWE_RPC_URL = os.getenv("SIWE_RPC_URL", "https://4801.rpc.thirdweb.com")
+SAFE_OWNER_TTL = float(os.getenv("SAFE_OWNER_TTL", "600"))
+SAFE_OWNER_NEGATIVE_TTL = float(os.getenv("SAFE_OWNER_NEGATIVE_TTL", "30"))
+SAFE_OWNER_MAX_ENTRIES = int(os.getenv("SAFE_OWNER_MAX_ENTRIES", "100000"))
+SAFE_OWNER_MULTICALL = os.getenv("SAFE_OWNER_MULTICALL", "false").lower() in ("1", "true", "yes")
+SAFE_OWNER_BATCH_DELAY_MS = float(os.getenv("SAFE_OWNER_BATCH_DELAY_MS", "5"))
+MULTICALL3_ADDRESS = os.getenv("MULTICALL3_ADDRESS", "0xcA11bde05977b3631167028862bE2a173976CA11")
+
 WORLDCOIN_APP_ID = os.getenv("WORLDCOIN_APP_ID", "app_fe9854eb1759ee4b1bd45aa9ca486891")
+WORLDCOIN_API_URL = os.getenv("WORLDCOIN_API_URL", "https://developer.worldcoin.org")
 
 # TEE Service settings
 TEE_SERVICE_URL = os.getenv("TEE_SERVICE_URL", "http://localhost:8001/tee")
 
-# MongoDB settings
+# Phase lengths stored by /api/propose (commit) and the reveal job (reveal), in seconds
+PROPOSAL_COMMIT_SECONDS = int(os.getenv("PROPOSAL_COMMIT_SECONDS", str(24 * 3600)))
+PROPOSAL_REVEAL_SECONDS = int(os.getenv("PROPOSAL_REVEAL_SECONDS", "3600"))
+
+# BTS scoring shard sizes (votes per chunk). TEE shards must stay within the TA's
+# MAX_VOTERS (1000) and 64KB JSON input buffer.
+BTS_SHARD_SIZE = int(os.getenv("BTS_SHARD_SIZE", "50000"))
+TEE_SHARD_SIZE = int(os.getenv("TEE_SHARD_SIZE", "500"))
+
+# Reward scorer: "tee" (TEE only), "local" (TeeClient.compute_rewards only),
+# "fallback" (local when the TEE fails) or "shadow" (fallback, plus comparing a
+# sample of TEE results against the local scorer).
+BTS_SCORER_MODE = os.getenv("BTS_SCORER_MODE", "tee")
+BTS_SHADOW_SAMPLE_RATE = float(os.getenv("BTS_SHADOW_SAMPLE_RATE", "0.1"))
+BTS_SHADOW_TOLERANCE = float(os.getenv("BTS_SHADOW_TOLERANCE", "0.001"))  # in score units
+
+# Vote ingestion group commit (app/services/vote_ingest.py): flush at
+# VOTE_BATCH_SIZE votes or VOTE_BATCH_DELAY_MS after the first queued vote, and
+# answer 503 with Retry-After once VOTE_QUEUE_LIMIT votes are waiting.
+VOTE_BATCH_SIZE = int(os.getenv("VOTE_BATCH_SIZE", "500"))
+VOTE_BATCH_DELAY_MS = float(os.getenv("VOTE_BATCH_DELAY_MS", "5"))
+VOTE_QUEUE_LIMIT = int(os.getenv("VOTE_QUEUE_LIMIT", "10000"))
+VOTE_RETRY_AFTER = int(os.getenv("VOTE_RETRY_AFTER", "1"))
+
+# Archival of finished proposals (app/services/archive.py): proposals Finished for
+# ARCHIVE_AFTER_DAYS move with their votes and claimed rewards to *_archive
+# collections, ARCHIVE_BATCH_SIZE proposals per run, zlib-compressed if enabled.
+ARCHIVE_AFTER_DAYS = float(os.getenv("ARCHIVE_AFTER_DAYS", "7"))
+ARCHIVE_BATCH_SIZE = int(os.getenv("ARCHIVE_BATCH_SIZE", "20"))
+ARCHIVE_COMPRESS = os.getenv("ARCHIVE_COMPRESS", "true").lower() in ("1", "true", "yes")
+# How often rewards claimed after their proposal was archived are moved too
+ARCHIVE_SWEEP_SECONDS = float(os.getenv("ARCHIVE_SWEEP_SECONDS", "3600"))
+
+# Contract view results (app/services/view_cache.py) are cached for as long as
+# the chain head stays the same; the head is re-read at most every
+# VIEW_CACHE_HEAD_TTL seconds (keep it under the block time).
+VIEW_CACHE_HEAD_TTL = float(os.getenv("VIEW_CACHE_HEAD_TTL", "1"))
+VIEW_CACHE_MAX_ENTRIES = int(os.getenv("VIEW_CACHE_MAX_ENTRIES", "10000"))
+
+# Read-through cache for hot read endpoints (app/services/cache.py): "memory"
+# (per process TTL+LRU) or "redis" (shared; needs the redis package).
+CACHE_BACKEND = os.getenv("CACHE_BACKEND", "memory")
+CACHE_REDIS_URL = os.getenv("CACHE_REDIS_URL", "redis://localhost:6379/0")
+CACHE_TTL = float(os.getenv("CACHE_TTL", "5"))
+CACHE_MAX_ENTRIES = int(os.getenv("CACHE_MAX_ENTRIES", "10000"))
+
+# Admission control for /api/propose and /api/vote (app/services/admission.py):
+# token buckets per client IP and per verified World ID nullifier / signing
+# wallet (requests per second and burst), and at most ADMISSION_CHAIN_CONCURRENCY
+# requests submitting a signed_txn at once. "memory" (per process) or "redis"
+# (shared by all workers). ADMISSION_TRUST_FORWARDED takes the client IP from
+# X-Forwarded-For (only behind a proxy that sets it).
+ADMISSION_BACKEND = os.getenv("ADMISSION_BACKEND", "memory")
+ADMISSION_REDIS_URL = os.getenv("ADMISSION_REDIS_URL", CACHE_REDIS_URL)
+ADMISSION_RATE = float(os.getenv("ADMISSION_RATE", "1"))
+ADMISSION_BURST = float(os.getenv("ADMISSION_BURST", "10"))
+ADMISSION_IP_RATE = float(os.getenv("ADMISSION_IP_RATE", "10"))
+ADMISSION_IP_BURST = float(os.getenv("ADMISSION_IP_BURST", "50"))
+ADMISSION_CHAIN_CONCURRENCY = int(os.getenv("ADMISSION_CHAIN_CONCURRENCY", "32"))
+# Slot lifetime in the redis backend if a worker dies holding it (> the 120 s receipt wait)
+ADMISSION_CHAIN_SLOT_TTL = float(os.getenv("ADMISSION_CHAIN_SLOT_TTL", "150"))
+ADMISSION_MAX_KEYS = int(os.getenv("ADMISSION_MAX_KEYS", "100000"))
+# How long a signed_txn is remembered, so replaying it doesn't charge its wallet again
+ADMISSION_SEEN_TX_TTL = float(os.getenv("ADMISSION_SEEN_TX_TTL", "86400"))
+ADMISSION_TRUST_FORWARDED = os.getenv("ADMISSION_TRUST_FORWARDED", "false").lower() in ("1", "true", "yes")
+
+# /api/export cursor batch size (documents per getMore). Uses orjson when installed.
+# Exports need "Authorization: Bearer <EXPORT_API_KEY>"; unset, the endpoint is disabled.
+EXPORT_BATCH_SIZE = int(os.getenv("EXPORT_BATCH_SIZE", "1000"))
+EXPORT_API_KEY = os.getenv("EXPORT_API_KEY", "")
+
+# MongoDB settings. "memory://" uses the in-process store in app/db/memory.py
+# (development, tests and benchmarks; data lives as long as the process).
 MONGO_URI = os.getenv("MONGODB_URI", "mongodb://localhost:27017")
 DATABASE_NAME = os.getenv("MONGODB_DB_NAME", "trustag")
\ No newline at end of file
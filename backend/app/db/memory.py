@@ -0,0 +1,842 @@
+"""
+In-process, Motor-compatible document store for development, tests and benchmarks.
+
+Selected with MONGODB_URI=memory:// (see app/db/mongodb.py). It implements the
+subset of the Motor API the backend uses, with the same semantics where the app
+depends on them:
+
+  - documents are stored and returned as BSON round-trips (copies; datetimes
+    come back naive UTC like pymongo's default codec options)
+  - filters: field equality (null matches missing), dotted paths, array
+    membership, $eq $ne $gt $gte $lt $lte $in $nin $exists, $and $or $nor
+  - updates: $set $unset $inc $setOnInsert $push $min $max, with upsert
+  - insert_many/bulk_write raise BulkWriteError with per-index writeErrors,
+    ordered or not; duplicate _ids raise DuplicateKeyError (code 11000)
+
+Every collection is indexed on _id, and create_index(field) indexes the first
+key of the index spec: a hash index for equality and $in plus a sorted index
+for range filters, so filters on indexed fields don't scan the collection.
+Operations run synchronously inside their coroutine, so each one is atomic with
+respect to other tasks, like a single-document write in MongoDB.
+"""
+import asyncio
+from bisect import bisect_left, bisect_right, insort
+from datetime import datetime, timezone
+from typing import Any, Dict, Iterable, Iterator, List, Mapping, Set, Tuple
+
+import bson
+from bson import ObjectId
+from pymongo import ReturnDocument
+from pymongo.errors import BulkWriteError, DuplicateKeyError, OperationFailure
+from pymongo.operations import DeleteMany, DeleteOne, InsertOne, ReplaceOne, UpdateMany, UpdateOne
+from pymongo.results import BulkWriteResult, DeleteResult, InsertManyResult, InsertOneResult, UpdateResult
+
+_MISSING = object()
+
+RANGE_OPERATORS = ("$gt", "$gte", "$lt", "$lte")
+
+
+# ---- values and ordering ----
+
+def _type_rank(value: Any) -> int:
+    """
+    BSON comparison order of value's type: comparison operators only match
+    values of the same rank, and sorts order ranks first.
+    """
+    if value is None or value is _MISSING:
+        return 1
+    if isinstance(value, bool):
+        return 8
+    if isinstance(value, (int, float)):
+        return 2
+    if isinstance(value, str):
+        return 3
+    if isinstance(value, Mapping):
+        return 4
+    if isinstance(value, (list, tuple)):
+        return 5
+    if isinstance(value, (bytes, bytearray)):
+        return 6
+    if isinstance(value, ObjectId):
+        return 7
+    if isinstance(value, datetime):
+        return 9
+    return 10
+
+
+def _normalize(value: Any) -> Any:
+    if isinstance(value, datetime) and value.tzinfo is not None:
+        return value.astimezone(timezone.utc).replace(tzinfo=None)
+    return value
+
+
+def sort_key(value: Any) -> Tuple:
+    rank = _type_rank(value)
+    if rank == 1:
+        return (rank, 0)
+    if rank in (4, 5, 10):
+        return (rank, repr(value))
+    return (rank, _normalize(value))
+
+
+def _hash_key(value: Any) -> Any:
+    """
+    Key of value in a hash index. Equal BSON values share a key (1 == 1.0, aware
+    and naive datetimes of the same instant); unhashable values use their repr.
+    """
+    value = _normalize(value)
+    if value is _MISSING:
+        return None
+    if isinstance(value, bool):
+        return ("bool", value)
+    try:
+        hash(value)
+        return value
+    except TypeError:
+        return ("repr", repr(value))
+
+
+def _values_equal(a: Any, b: Any) -> bool:
+    if _type_rank(a) != _type_rank(b):
+        return False
+    return _normalize(a) == _normalize(b)
+
+
+def get_path(doc: Mapping, path: str) -> Any:
+    """
+    Value at a dotted path, _MISSING when absent. A path through an array of
+    sub-documents yields the list of their values.
+    """
+    value: Any = doc
+    for part in path.split("."):
+        if isinstance(value, Mapping):
+            value = value.get(part, _MISSING)
+        elif isinstance(value, list):
+            if part.isdigit():
+                index = int(part)
+                value = value[index] if index < len(value) else _MISSING
+            else:
+                value = [v.get(part, _MISSING) for v in value if isinstance(v, Mapping)]
+        else:
+            return _MISSING
+        if value is _MISSING:
+            return _MISSING
+    return value
+
+
+def _set_path(doc: Dict, path: str, value: Any):
+    parts = path.split(".")
+    for part in parts[:-1]:
+        doc = doc.setdefault(part, {})
+        if not isinstance(doc, dict):
+            raise OperationFailure(f"Cannot create field '{part}' in a non-document value", code=28)
+    doc[parts[-1]] = value
+
+
+def _unset_path(doc: Dict, path: str):
+    parts = path.split(".")
+    for part in parts[:-1]:
+        doc = doc.get(part)
+        if not isinstance(doc, dict):
+            return
+    doc.pop(parts[-1], None)
+
+
+def _copy(doc: Mapping) -> Dict:
+    return bson.decode(bson.encode(doc))
+
+
+# ---- filters ----
+
+def _candidates(value: Any) -> List[Any]:
+    # a field holding an array matches on the array itself or any of its elements
+    if isinstance(value, list):
+        return [value] + value
+    return [value]
+
+
+def _compare(value: Any, op: str, operand: Any) -> bool:
+    if _type_rank(value) != _type_rank(operand) or value is _MISSING:
+        return False
+    a, b = sort_key(value), sort_key(operand)
+    if op == "$gt":
+        return a > b
+    if op == "$gte":
+        return a >= b
+    if op == "$lt":
+        return a < b
+    return a <= b
+
+
+def _match_operator(value: Any, op: str, operand: Any) -> bool:
+    if op == "$eq":
+        if operand is None:
+            return value is _MISSING or any(v is None for v in _candidates(value))
+        return any(_values_equal(v, operand) for v in _candidates(value))
+    if op == "$ne":
+        return not _match_operator(value, "$eq", operand)
+    if op in RANGE_OPERATORS:
+        return any(_compare(v, op, operand) for v in _candidates(value))
+    if op == "$in":
+        return any(_match_operator(value, "$eq", o) for o in operand)
+    if op == "$nin":
+        return not _match_operator(value, "$in", operand)
+    if op == "$exists":
+        return (value is not _MISSING) == bool(operand)
+    raise OperationFailure(f"unknown operator: {op}", code=2)
+
+
+def _is_operator_dict(cond: Any) -> bool:
+    return isinstance(cond, Mapping) and bool(cond) and all(k.startswith("$") for k in cond)
+
+
+def matches(doc: Mapping, query: Mapping) -> bool:
+    for key, cond in query.items():
+        if key == "$and":
+            if not all(matches(doc, q) for q in cond):
+                return False
+        elif key == "$or":
+            if not any(matches(doc, q) for q in cond):
+                return False
+        elif key == "$nor":
+            if any(matches(doc, q) for q in cond):
+                return False
+        elif key.startswith("$"):
+            raise OperationFailure(f"unknown top level operator: {key}", code=2)
+        else:
+            value = get_path(doc, key)
+            if _is_operator_dict(cond):
+                if not all(_match_operator(value, op, operand) for op, operand in cond.items()):
+                    return False
+            elif not _match_operator(value, "$eq", cond):
+                return False
+    return True
+
+
+def _project(doc: Dict, projection: Mapping | None) -> Dict:
+    if not projection:
+        return doc
+    include_id = projection.get("_id", 1)
+    fields = {k: v for k, v in projection.items() if k != "_id"}
+    if fields and all(fields.values()):
+        out = {"_id": doc["_id"]} if include_id and "_id" in doc else {}
+        for path in fields:
+            value = get_path(doc, path)
+            if value is not _MISSING:
+                _set_path(out, path, value)
+        return out
+    out = dict(doc)
+    for path in fields:
+        _unset_path(out, path)
+    if not include_id:
+        out.pop("_id", None)
+    return out
+
+
+# ---- updates ----
+
+def _apply_update(doc: Dict, update: Mapping, inserting: bool):
+    if not update or not all(k.startswith("$") for k in update):
+        raise ValueError("update only works with $ operators")
+    for op, fields in update.items():
+        for path, operand in fields.items():
+            if path == "_id" and op != "$setOnInsert" and not (op == "$set" and _values_equal(doc.get("_id"), operand)):
+                raise OperationFailure("Performing an update on the path '_id' would modify the immutable field '_id'", code=66)
+            current = get_path(doc, path)
+            if op == "$set":
+                _set_path(doc, path, operand)
+            elif op == "$setOnInsert":
+                if inserting:
+                    _set_path(doc, path, operand)
+            elif op == "$unset":
+                _unset_path(doc, path)
+            elif op == "$inc":
+                if current is not _MISSING and (_type_rank(current) != 2 or isinstance(current, bool)):
+                    raise OperationFailure(f"Cannot apply $inc to a value of non-numeric type at '{path}'", code=14)
+                _set_path(doc, path, operand if current is _MISSING else current + operand)
+            elif op == "$push":
+                if current is _MISSING:
+                    current = []
+                elif not isinstance(current, list):
+                    raise OperationFailure(f"The field '{path}' must be an array", code=2)
+                items = operand["$each"] if isinstance(operand, Mapping) and "$each" in operand else [operand]
+                _set_path(doc, path, current + list(items))
+            elif op in ("$min", "$max"):
+                if current is _MISSING:
+                    _set_path(doc, path, operand)
+                else:
+                    new, old = sort_key(operand), sort_key(current)
+                    if (op == "$min" and new < old) or (op == "$max" and new > old):
+                        _set_path(doc, path, operand)
+            else:
+                raise OperationFailure(f"Unknown modifier: {op}", code=9)
+
+
+def _upsert_seed(query: Mapping) -> Dict:
+    """
+    The document an upsert starts from: the filter's equality conditions.
+    """
+    doc: Dict = {}
+    for key, cond in query.items():
+        if key == "$and":
+            for q in cond:
+                doc.update(_upsert_seed(q))
+        elif key.startswith("$"):
+            continue
+        elif _is_operator_dict(cond):
+            if "$eq" in cond:
+                _set_path(doc, key, cond["$eq"])
+        else:
+            _set_path(doc, key, cond)
+    return doc
+
+
+# ---- indexes ----
+
+class _Index:
+    """
+    Hash and sorted index over one field. Documents missing the field are
+    indexed under null, as in MongoDB.
+    """
+
+    def __init__(self, field: str, unique: bool = False):
+        self.field = field
+        self.unique = unique
+        self.hashed: Dict[Any, Set[Any]] = {}
+        self.ordered: List[Tuple[Tuple, Tuple, Any]] = []  # (sort key, _id sort key, _id)
+
+    def _values(self, doc: Mapping) -> List[Any]:
+        value = get_path(doc, self.field)
+        if value is _MISSING:
+            return [None]
+        if isinstance(value, list):
+            return value or [None]
+        return [value]
+
+    def check(self, doc: Mapping, doc_id: Any):
+        if not self.unique:
+            return
+        for value in self._values(doc):
+            holders = self.hashed.get(_hash_key(value), ())
+            if any(h != doc_id for h in holders):
+                raise DuplicateKeyError(
+                    f"E11000 duplicate key error index: {self.field}_1 dup key: {{ {self.field}: {value!r} }}",
+                    code=11000,
+                )
+
+    def add(self, doc: Mapping, doc_id: Any):
+        for value in self._values(doc):
+            self.hashed.setdefault(_hash_key(value), set()).add(doc_id)
+            insort(self.ordered, (sort_key(value), sort_key(doc_id), doc_id))
+
+    def remove(self, doc: Mapping, doc_id: Any):
+        for value in self._values(doc):
+            key = _hash_key(value)
+            ids = self.hashed.get(key)
+            if ids is not None:
+                ids.discard(doc_id)
+                if not ids:
+                    del self.hashed[key]
+            entry = (sort_key(value), sort_key(doc_id), doc_id)
+            i = bisect_left(self.ordered, entry)
+            if i < len(self.ordered) and self.ordered[i] == entry:
+                del self.ordered[i]
+
+    def lookup(self, cond: Any) -> Set[Any] | None:
+        """
+        Ids of documents that may match cond on this field, or None if the index
+        can't narrow it down.
+        """
+        if not _is_operator_dict(cond):
+            if cond is None or isinstance(cond, (list, Mapping)):
+                return None
+            return set(self.hashed.get(_hash_key(cond), ()))
+        if "$eq" in cond and cond["$eq"] is not None and not isinstance(cond["$eq"], (list, Mapping)):
+            return set(self.hashed.get(_hash_key(cond["$eq"]), ()))
+        if "$in" in cond and all(v is not None and not isinstance(v, (list, Mapping)) for v in cond["$in"]):
+            ids: Set[Any] = set()
+            for value in cond["$in"]:
+                ids |= self.hashed.get(_hash_key(value), set())
+            return ids
+        bounds = [op for op in RANGE_OPERATORS if op in cond]
+        if bounds:
+            rank = _type_rank(cond[bounds[0]])
+            lo = bisect_left(self.ordered, ((rank,),))
+            hi = bisect_left(self.ordered, ((rank + 1,),))
+            for op in bounds:
+                key = sort_key(cond[op])
+                if op == "$gt":
+                    lo = max(lo, bisect_right(self.ordered, (key, (99,))))
+                elif op == "$gte":
+                    lo = max(lo, bisect_left(self.ordered, (key,)))
+                elif op == "$lt":
+                    hi = min(hi, bisect_left(self.ordered, (key,)))
+                else:
+                    hi = min(hi, bisect_right(self.ordered, (key, (99,))))
+            return {entry[2] for entry in self.ordered[lo:hi]}
+        return None
+
+
+def _index_fields(keys: Any) -> List[Tuple[str, int]]:
+    if isinstance(keys, str):
+        return [(keys, 1)]
+    if isinstance(keys, Mapping):
+        return list(keys.items())
+    return [(k, 1) if isinstance(k, str) else tuple(k) for k in keys]
+
+
+# ---- cursor ----
+
+class MemoryCursor:
+    """
+    Lazy cursor over a filter's matches; sort/skip/limit/batch_size chain like
+    Motor's AsyncIOMotorCursor.
+    """
+
+    def __init__(self, collection: "MemoryCollection", query: Mapping | None, projection: Mapping | None):
+        self._collection = collection
+        self._query = dict(query or {})
+        self._projection = projection
+        self._sort: List[Tuple[str, int]] = []
+        self._skip = 0
+        self._limit = 0
+        self._results: Iterator[Dict] | None = None
+
+    def sort(self, key_or_list, direction: int | None = None) -> "MemoryCursor":
+        if isinstance(key_or_list, str):
+            self._sort = [(key_or_list, direction or 1)]
+        else:
+            self._sort = _index_fields(key_or_list)
+        return self
+
+    def skip(self, skip: int) -> "MemoryCursor":
+        self._skip = skip
+        return self
+
+    def limit(self, limit: int) -> "MemoryCursor":
+        self._limit = limit
+        return self
+
+    def batch_size(self, batch_size: int) -> "MemoryCursor":
+        return self
+
+    def _execute(self) -> Iterator[Dict]:
+        docs = self._collection._find(self._query)
+        for field, direction in reversed(self._sort):
+            docs.sort(key=lambda d: sort_key(_nullable(get_path(d, field))), reverse=direction < 0)
+        end = self._skip + self._limit if self._limit else None
+        return (_project(_copy(d), self._projection) for d in docs[self._skip:end])
+
+    def __aiter__(self):
+        return self
+
+    async def __anext__(self) -> Dict:
+        if self._results is None:
+            self._results = self._execute()
+        try:
+            return next(self._results)
+        except StopIteration:
+            raise StopAsyncIteration
+
+    async def next(self) -> Dict:
+        return await self.__anext__()
+
+    async def to_list(self, length: int | None = None) -> List[Dict]:
+        if self._results is None:
+            self._results = self._execute()
+        out = []
+        for doc in self._results:
+            out.append(doc)
+            if length and len(out) >= length:
+                break
+        return out
+
+    def close(self):
+        self._results = iter(())
+
+
+def _nullable(value: Any) -> Any:
+    return None if value is _MISSING else value
+
+
+# ---- collection, database, client ----
+
+class MemoryCollection:
+    def __init__(self, database: "MemoryDatabase", name: str):
+        self.database = database
+        self.name = name
+        self._docs: Dict[Any, Dict] = {}  # hash key of _id -> document
+        self._indexes: Dict[str, _Index] = {"_id_": _Index("_id")}
+
+    @property
+    def full_name(self) -> str:
+        return f"{self.database.name}.{self.name}"
+
+    def with_options(self, **kwargs) -> "MemoryCollection":
+        # write concerns and read preferences have no meaning in one process
+        return self
+
+    # -- indexes
+
+    async def create_index(self, keys, unique: bool = False, name: str | None = None, **kwargs) -> str:
+        fields = _index_fields(keys)
+        if fields == [("_id", 1)]:
+            return "_id_"
+        index_name = name or "_".join(f"{f}_{d}" for f, d in fields)
+        if index_name not in self._indexes:
+            index = _Index(fields[0][0], unique=unique and len(fields) == 1)
+            for doc in self._docs.values():
+                index.check(doc, doc["_id"])
+                index.add(doc, doc["_id"])
+            self._indexes[index_name] = index
+        return index_name
+
+    async def create_indexes(self, indexes) -> List[str]:
+        return [await self.create_index(i.document["key"], **{k: v for k, v in i.document.items() if k != "key"})
+                for i in indexes]
+
+    async def drop_index(self, name: str):
+        self._indexes.pop(name, None)
+
+    async def index_information(self) -> Dict[str, Dict]:
+        return {name: {"key": [(index.field, 1)], "unique": index.unique} for name, index in self._indexes.items()}
+
+    def _plan(self, query: Mapping) -> Set[Any] | None:
+        """
+        Candidate _id keys for query from the indexes, or None for a full scan.
+        """
+        best: Set[Any] | None = None
+        for key, cond in query.items():
+            if key == "$and":
+                for q in cond:
+                    ids = self._plan(q)
+                    if ids is not None and (best is None or len(ids) < len(best)):
+                        best = ids
+                continue
+            if key == "$or":
+                union: Set[Any] = set()
+                for q in cond:
+                    ids = self._plan(q)
+                    if ids is None:
+                        union = None
+                        break
+                    union |= ids
+                if union is not None and (best is None or len(union) < len(best)):
+                    best = union
+                continue
+            if key.startswith("$"):
+                continue
+            index = next((i for i in self._indexes.values() if i.field == key), None)
+            ids = index.lookup(cond) if index is not None else None
+            if ids is not None:
+                ids = {_hash_key(i) for i in ids}
+            if ids is not None and (best is None or len(ids) < len(best)):
+                best = ids
+        return best
+
+    def _find(self, query: Mapping) -> List[Dict]:
+        ids = self._plan(query)
+        if ids is None:
+            docs: Iterable[Dict] = list(self._docs.values())
+        else:
+            # index scans come back in _id order rather than in insertion order
+            docs = sorted((self._docs[i] for i in ids if i in self._docs), key=lambda d: sort_key(d["_id"]))
+        return [d for d in docs if matches(d, query)]
+
+    # -- storage primitives (synchronous)
+
+    def _insert(self, doc: Mapping) -> Any:
+        doc = dict(doc)
+        doc.setdefault("_id", ObjectId())
+        stored = _copy(doc)
+        key = _hash_key(stored["_id"])
+        if key in self._docs:
+            raise DuplicateKeyError(
+                f"E11000 duplicate key error collection: {self.full_name} index: _id_ dup key: {{ _id: {stored['_id']!r} }}",
+                code=11000,
+            )
+        for index in self._indexes.values():
+            index.check(stored, stored["_id"])
+        self._docs[key] = stored
+        for index in self._indexes.values():
+            index.add(stored, stored["_id"])
+        return doc["_id"]
+
+    def _replace_doc(self, old: Dict, new: Dict):
+        """
+        Swap a stored document for new, which must already be a stored copy.
+        """
+        for index in self._indexes.values():
+            index.check(new, new["_id"])
+        for index in self._indexes.values():
+            index.remove(old, old["_id"])
+            index.add(new, new["_id"])
+        self._docs[_hash_key(new["_id"])] = new
+
+    def _delete_doc(self, doc: Dict):
+        for index in self._indexes.values():
+            index.remove(doc, doc["_id"])
+        del self._docs[_hash_key(doc["_id"])]
+
+    def _update(self, query: Mapping, update: Mapping, upsert: bool, many: bool,
+                sort: Mapping | None = None) -> Tuple[int, int, Any, Dict | None, Dict | None]:
+        """
+        Returns (matched, modified, upserted _id, document before, document after).
+        """
+        docs = self._find(query)
+        if sort:
+            for field, direction in reversed(_index_fields(sort)):
+                docs.sort(key=lambda d: sort_key(_nullable(get_path(d, field))), reverse=direction < 0)
+        if not docs:
+            if not upsert:
+                return 0, 0, None, None, None
+            doc = _upsert_seed(query)
+            _apply_update(doc, update, inserting=True)
+            doc_id = self._insert(doc)
+            return 0, 0, doc_id, None, self._docs[_hash_key(doc_id)]
+
+        modified = 0
+        before = after = None
+        for old in docs if many else docs[:1]:
+            new = _copy(old)
+            _apply_update(new, update, inserting=False)
+            new = _copy(new)
+            if new != old:
+                self._replace_doc(old, new)
+                modified += 1
+            before, after = old, self._docs[_hash_key(old["_id"])]
+        return (len(docs) if many else 1), modified, None, before, after
+
+    def _replace(self, query: Mapping, replacement: Mapping, upsert: bool) -> Tuple[int, int, Any]:
+        if any(k.startswith("$") for k in replacement):
+            raise ValueError("replacement can not include $ operators")
+        docs = self._find(query)
+        if not docs:
+            if not upsert:
+                return 0, 0, None
+            doc = dict(replacement)
+            seed_id = _upsert_seed(query).get("_id", _MISSING)
+            if "_id" not in doc and seed_id is not _MISSING:
+                doc["_id"] = seed_id
+            return 0, 0, self._insert(doc)
+        old = docs[0]
+        new = dict(replacement)
+        if "_id" in new and not _values_equal(new["_id"], old["_id"]):
+            raise OperationFailure("The _id field cannot be changed", code=66)
+        new["_id"] = old["_id"]
+        new = _copy(new)
+        modified = int(new != old)
+        if modified:
+            self._replace_doc(old, new)
+        return 1, modified, None
+
+    def _delete(self, query: Mapping, many: bool) -> int:
+        docs = self._find(query)
+        if not many:
+            docs = docs[:1]
+        for doc in docs:
+            self._delete_doc(doc)
+        return len(docs)
+
+    # -- Motor API
+
+    def find(self, filter: Mapping | None = None, projection: Mapping | None = None, **kwargs) -> MemoryCursor:
+        cursor = MemoryCursor(self, filter, projection)
+        if kwargs.get("sort"):
+            cursor.sort(kwargs["sort"])
+        if kwargs.get("skip"):
+            cursor.skip(kwargs["skip"])
+        if kwargs.get("limit"):
+            cursor.limit(kwargs["limit"])
+        return cursor
+
+    async def find_one(self, filter: Mapping | Any = None, projection: Mapping | None = None, **kwargs) -> Dict | None:
+        if filter is not None and not isinstance(filter, Mapping):
+            filter = {"_id": filter}
+        docs = await self.find(filter, projection, **kwargs).limit(1).to_list(1)
+        return docs[0] if docs else None
+
+    async def count_documents(self, filter: Mapping, **kwargs) -> int:
+        return len(self._find(filter))
+
+    async def estimated_document_count(self, **kwargs) -> int:
+        return len(self._docs)
+
+    async def distinct(self, key: str, filter: Mapping | None = None) -> List[Any]:
+        seen: Dict[Any, Any] = {}
+        for doc in self._find(filter or {}):
+            value = get_path(doc, key)
+            if value is _MISSING:
+                continue
+            for v in value if isinstance(value, list) else [value]:
+                seen.setdefault(_hash_key(v), v)
+        return list(seen.values())
+
+    async def insert_one(self, document: Dict, **kwargs) -> InsertOneResult:
+        # like pymongo, a generated _id is added to the caller's document
+        document.setdefault("_id", ObjectId())
+        return InsertOneResult(self._insert(document), True)
+
+    async def insert_many(self, documents: Iterable[Dict], ordered: bool = True, **kwargs) -> InsertManyResult:
+        documents = list(documents)
+        if not documents:
+            raise TypeError("documents must be a non-empty list")
+        for d in documents:
+            d.setdefault("_id", ObjectId())
+        await self.bulk_write([InsertOne(d) for d in documents], ordered=ordered)
+        return InsertManyResult([d["_id"] for d in documents], True)
+
+    async def update_one(self, filter: Mapping, update: Mapping, upsert: bool = False, **kwargs) -> UpdateResult:
+        matched, modified, upserted, _, _ = self._update(filter, update, upsert, many=False, sort=kwargs.get("sort"))
+        return _update_result(matched, modified, upserted)
+
+    async def update_many(self, filter: Mapping, update: Mapping, upsert: bool = False, **kwargs) -> UpdateResult:
+        matched, modified, upserted, _, _ = self._update(filter, update, upsert, many=True)
+        return _update_result(matched, modified, upserted)
+
+    async def replace_one(self, filter: Mapping, replacement: Mapping, upsert: bool = False, **kwargs) -> UpdateResult:
+        matched, modified, upserted = self._replace(filter, replacement, upsert)
+        return _update_result(matched, modified, upserted)
+
+    async def find_one_and_update(self, filter: Mapping, update: Mapping, projection: Mapping | None = None,
+                                  sort=None, upsert: bool = False,
+                                  return_document: bool = ReturnDocument.BEFORE, **kwargs) -> Dict | None:
+        _, _, _, before, after = self._update(filter, update, upsert, many=False, sort=sort)
+        doc = after if return_document == ReturnDocument.AFTER else before
+        return _project(_copy(doc), projection) if doc is not None else None
+
+    async def find_one_and_delete(self, filter: Mapping, projection: Mapping | None = None, sort=None, **kwargs):
+        docs = await self.find(filter, projection, sort=sort).limit(1).to_list(1)
+        if docs:
+            self._delete({"_id": docs[0]["_id"]}, many=False)
+        return docs[0] if docs else None
+
+    async def delete_one(self, filter: Mapping, **kwargs) -> DeleteResult:
+        return DeleteResult({"n": self._delete(filter, many=False)}, True)
+
+    async def delete_many(self, filter: Mapping, **kwargs) -> DeleteResult:
+        return DeleteResult({"n": self._delete(filter, many=True)}, True)
+
+    async def bulk_write(self, requests: Iterable, ordered: bool = True, **kwargs) -> BulkWriteResult:
+        """
+        Apply write operations in order. Failed operations are reported like
+        MongoDB does: a BulkWriteError whose details hold writeErrors with the
+        index of each failed operation; ordered=True stops at the first one.
+        """
+        counts = {"nInserted": 0, "nUpserted": 0, "nMatched": 0, "nModified": 0, "nRemoved": 0}
+        upserted: List[Dict] = []
+        write_errors: List[Dict] = []
+
+        for i, op in enumerate(requests):
+            try:
+                if isinstance(op, InsertOne):
+                    self._insert(op._doc)
+                    counts["nInserted"] += 1
+                elif isinstance(op, (UpdateOne, UpdateMany)):
+                    matched, modified, upserted_id, _, _ = self._update(
+                        op._filter, op._doc, bool(op._upsert), many=isinstance(op, UpdateMany),
+                        sort=getattr(op, "_sort", None),
+                    )
+                    counts["nMatched"] += matched
+                    counts["nModified"] += modified
+                    if upserted_id is not None:
+                        counts["nUpserted"] += 1
+                        upserted.append({"index": i, "_id": upserted_id})
+                elif isinstance(op, ReplaceOne):
+                    matched, modified, upserted_id = self._replace(op._filter, op._doc, bool(op._upsert))
+                    counts["nMatched"] += matched
+                    counts["nModified"] += modified
+                    if upserted_id is not None:
+                        counts["nUpserted"] += 1
+                        upserted.append({"index": i, "_id": upserted_id})
+                elif isinstance(op, (DeleteOne, DeleteMany)):
+                    counts["nRemoved"] += self._delete(op._filter, many=isinstance(op, DeleteMany))
+                else:
+                    raise TypeError(f"{op!r} is not a valid request")
+            except (DuplicateKeyError, OperationFailure) as e:
+                write_errors.append({"index": i, "code": e.code, "errmsg": str(e), "op": getattr(op, "_doc", None)})
+                if ordered:
+                    break
+
+        details = dict(counts, upserted=upserted, writeErrors=write_errors, writeConcernErrors=[])
+        if write_errors:
+            raise BulkWriteError(details)
+        return BulkWriteResult(details, True)
+
+    async def drop(self):
+        self.database._collections.pop(self.name, None)
+        self._docs.clear()
+        self._indexes = {"_id_": _Index("_id")}
+
+
+def _update_result(matched: int, modified: int, upserted: Any) -> UpdateResult:
+    raw = {"n": matched + (1 if upserted is not None else 0), "nModified": modified}
+    if upserted is not None:
+        raw["upserted"] = upserted
+    return UpdateResult(raw, True)
+
+
+class MemoryDatabase:
+    def __init__(self, client: "MemoryClient", name: str):
+        self.client = client
+        self.name = name
+        self._collections: Dict[str, MemoryCollection] = {}
+
+    def __getitem__(self, name: str) -> MemoryCollection:
+        collection = self._collections.get(name)
+        if collection is None:
+            collection = self._collections[name] = MemoryCollection(self, name)
+        return collection
+
+    def __getattr__(self, name: str) -> MemoryCollection:
+        if name.startswith("_"):
+            raise AttributeError(name)
+        return self[name]
+
+    def get_collection(self, name: str, **kwargs) -> MemoryCollection:
+        return self[name]
+
+    async def list_collection_names(self, **kwargs) -> List[str]:
+        return list(self._collections)
+
+    async def drop_collection(self, name: str):
+        if name in self._collections:
+            await self._collections[name].drop()
+
+    async def command(self, command, *args, **kwargs) -> Dict:
+        name = command if isinstance(command, str) else next(iter(command))
+        if name == "ping":
+            return {"ok": 1.0}
+        raise OperationFailure(f"no such command: '{name}'", code=59)
+
+
+class MemoryClient:
+    """
+    Stand-in for AsyncIOMotorClient: databases live as long as the client.
+    """
+
+    def __init__(self):
+        self._databases: Dict[str, MemoryDatabase] = {}
+
+    def __getitem__(self, name: str) -> MemoryDatabase:
+        database = self._databases.get(name)
+        if database is None:
+            database = self._databases[name] = MemoryDatabase(self, name)
+        return database
+
+    def __getattr__(self, name: str) -> MemoryDatabase:
+        if name.startswith("_"):
+            raise AttributeError(name)
+        return self[name]
+
+    def get_database(self, name: str, **kwargs) -> MemoryDatabase:
+        return self[name]
+
+    async def drop_database(self, name: str):
+        self._databases.pop(name, None)
+
+    def close(self):
+        self._databases.clear()
+
+    def get_io_loop(self):
+        return asyncio.get_running_loop()
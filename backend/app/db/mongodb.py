@@ -4,14 +4,36 @@ from motor.motor_asyncio import AsyncIOMotorClient
 from pymongo.database import Database
 import os
 from app.config import MONGO_URI, DATABASE_NAME
+from app.db.memory import MemoryClient
+from app.timing import MongoTimingListener
 
-_client: AsyncIOMotorClient | None = None
+_client: AsyncIOMotorClient | MemoryClient | None = None
+
+# Indexes created on the in-memory store, which has nothing but _id otherwise:
+# the scheduler, scoring and reward queries' equality and range fields.
+MEMORY_INDEXES = {
+    "proposals": ["phase", "deadline"],
+    "votes": ["proposal_id", "address"],
+    "rewards": ["address", "proposal_id", "claimed_at"],
+    "label_outbox": ["status"],
+}
+
+
+def is_memory_uri(uri: str) -> bool:
+    return uri.startswith("memory:")
 
 
 async def connect_to_mongo():
     global _client
     if _client is None:
-        _client = AsyncIOMotorClient(MONGO_URI)
+        if is_memory_uri(MONGO_URI):
+            _client = MemoryClient()
+            db = _client[DATABASE_NAME]
+            for collection, fields in MEMORY_INDEXES.items():
+                for field in fields:
+                    await db[collection].create_index(field)
+        else:
+            _client = AsyncIOMotorClient(MONGO_URI, event_listeners=[MongoTimingListener()])
     # Optionally, ping to verify connection
     await _client.admin.command("ping")
 
@@ -25,7 +47,8 @@ async def close_mongo_connection():
 
 def get_database() -> Database:
     """
-    Return the Motor Database instance.
+    Return the Motor Database instance (an app.db.memory.MemoryDatabase for
+    MONGODB_URI=memory://).
     """
     if _client is None:
         raise RuntimeError("Mongo client not initialized. Call connect_to_mongo() first.")
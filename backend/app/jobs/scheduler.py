@@ -1,14 +1,33 @@
 import logging
-from datetime import datetime, timezone
+import time
+from datetime import datetime, timedelta, timezone
 from typing import List
 
 from pymongo.collection import Collection
 from app.db.mongodb import get_database
-from app.services.smart_contract_client import VoteContract
+from app.services.smart_contract_client import VoteContract, tx_manager
 from app.services.tee_client import TeeClient
+from app.services.archive import ArchiveStore
+from app.services.label_outbox import LabelOutbox
+from app.services.reveal import VoteReveals
+from app.services.finalizer import MIN_VOTE_COUNT, Finalizer
+from app.services.cache import cache
+from app.config import ARCHIVE_AFTER_DAYS, ARCHIVE_BATCH_SIZE, ARCHIVE_SWEEP_SECONDS, PROPOSAL_REVEAL_SECONDS
 
 logger = logging.getLogger(__name__)
 
+# time.monotonic() of the last claimed-reward sweep
+_last_sweep: float | None = None
+
+async def resume_transactions_job():
+    # a pending nonce nobody watches would hold up every later send; one short poll per tick
+    counts = await tx_manager.resume_pending()
+    if any(counts.values()):
+        logger.info(
+            f"[Tx Job] {counts['mined']} pending transactions mined, {counts['stuck']} still pending, "
+            f"{counts['failed']} failed."
+        )
+
 async def start_reveal_phase_job():
     db = get_database()
     proposals: Collection = db["proposals"]
@@ -23,7 +42,7 @@ async def start_reveal_phase_job():
 
     for p in to_start:
         proposal_id = p["_id"]
-        reveal_deadline = int((now.timestamp() + 3600))
+        reveal_deadline = int((now.timestamp() + PROPOSAL_REVEAL_SECONDS))
 
         logger.info(f"[Reveal Job] Processing proposal {proposal_id} — setting reveal deadline.")
 
@@ -41,11 +60,33 @@ async def start_reveal_phase_job():
                     "updated_at": now
                 }}
             )
+            await cache.invalidate("proposals")
             logger.info(f"[Reveal Job] Updated proposal {proposal_id} to 'Reveal' phase. TX: {tx_hash}")
         except Exception as e:
             logger.error(f"[Reveal Job] Failed for proposal {proposal_id}: {e}")
 
 
+async def reveal_votes_job():
+    db = get_database()
+    proposals: Collection = db["proposals"]
+
+    # revealVote only needs the Reveal phase, which lasts until finalize
+    to_reveal = await proposals.find({"phase": "Reveal"}).to_list(length=50)
+
+    for p in to_reveal:
+        proposal_id = p["_id"]
+        try:
+            counts = await VoteReveals.reveal(proposal_id)
+        except Exception as e:
+            logger.error(f"[Reveal Votes Job] Failed for proposal {proposal_id}: {e}")
+            continue
+        if any(counts.values()):
+            logger.info(
+                f"[Reveal Votes Job] Proposal {proposal_id}: {counts['revealed']} votes revealed, "
+                f"{counts['mismatched']} not matching their commit, {counts['failed']} failed."
+            )
+
+
 async def finalize_reward_job():
     db = get_database()
     proposals: Collection = db["proposals"]
@@ -71,33 +112,34 @@ async def finalize_reward_job():
             continue
 
         try:
-            tee_results = await TeeClient.compute_rewards_op_tee(proposal_id, voters)
+            tee_results = await TeeClient.score_proposal(proposal_id, voters)
             logger.info(f"[Finalize Job] Computed rewards for {len(tee_results)} voters on proposal {proposal_id}")
         except Exception as e:
             logger.error(f"[Finalize Job] TEE compute failed for proposal {proposal_id}: {e}")
             continue
 
+        if not tee_results:
+            logger.warning(f"[Finalize Job] No rewards computed for proposal {proposal_id}; retrying next tick.")
+            continue
+
         voter_list = [r["address"] for r in tee_results]
         reward_list = [r["score"] for r in tee_results]
 
         try:
-            tx_hash = await VoteContract.call_contract("finalize", {
-                "proposalId": proposal_id,
-                "voterList": voter_list,
-                "rewardList": reward_list
-            })
+            tx_hash = await Finalizer.finalize(proposal_id, voter_list, reward_list)
             logger.info(f"[Finalize Job] Finalize transaction sent for proposal {proposal_id}. TX: {tx_hash}")
         except Exception as e:
             logger.error(f"[Finalize Job] Finalize contract call failed for proposal {proposal_id}: {e}")
             continue
 
         docs = []
-        for r in tee_results:
+        for address, amount in zip(voter_list, reward_list):
             docs.append({
-                "_id": f"{proposal_id}:{r['address']}",
-                "address": r["address"],
+                "_id": f"{proposal_id}:{address}",
+                "address": address,
                 "proposal_id": proposal_id,
-                "amount": r["score"],
+                # token wei, beyond Mongo's int64
+                "amount": str(amount),
                 "tx_hash": tx_hash,
                 "claimed_at": None
             })
@@ -110,4 +152,63 @@ async def finalize_reward_job():
             {"_id": proposal_id},
             {"$set": {"phase": "Finished", "updated_at": now}}
         )
-        logger.info(f"[Finalize Job] Proposal {proposal_id} updated to 'Finished' phase.")
\ No newline at end of file
+        await cache.invalidate("proposals", "rewards")
+        logger.info(f"[Finalize Job] Proposal {proposal_id} updated to 'Finished' phase.")
+
+        if len(voters) >= MIN_VOTE_COUNT:
+            try:
+                target, malicious, description = (await VoteContract.proposal(proposal_id))[:3]
+                await LabelOutbox.enqueue(target, description, malicious, proposal_id, now)
+            except Exception as e:
+                logger.error(f"[Finalize Job] Could not queue label of proposal {proposal_id}: {e}")
+
+
+async def label_writeback_job():
+    counts = await LabelOutbox.flush()
+    if any(counts.values()):
+        logger.info(
+            f"[Label Job] {counts['sent']} labels written, {counts['unchanged']} already on chain, "
+            f"{counts['failed']} failed."
+        )
+
+
+async def archive_finished_job():
+    db = get_database()
+    proposals: Collection = db["proposals"]
+
+    cutoff = datetime.now(timezone.utc) - timedelta(days=ARCHIVE_AFTER_DAYS)
+    to_archive = await proposals.find({
+        "phase": "Finished",
+        "updated_at": {"$lte": cutoff}
+    }).to_list(length=ARCHIVE_BATCH_SIZE)
+
+    logger.info(f"[Archive Job] Found {len(to_archive)} finished proposals to archive.")
+
+    if to_archive:
+        await ArchiveStore.ensure_indexes()
+    for p in to_archive:
+        proposal_id = p["_id"]
+        try:
+            moved = await ArchiveStore.archive_proposal(p)
+            await cache.invalidate("proposals", "rewards")
+            logger.info(
+                f"[Archive Job] Archived proposal {proposal_id}: "
+                f"{moved['votes']} votes, {moved['rewards']} claimed rewards."
+            )
+        except Exception as e:
+            logger.error(f"[Archive Job] Failed for proposal {proposal_id}: {e}")
+
+    # late claims are rare; the sweep runs every ARCHIVE_SWEEP_SECONDS, not every tick
+    global _last_sweep
+    if _last_sweep is not None and time.monotonic() - _last_sweep < ARCHIVE_SWEEP_SECONDS:
+        return
+    _last_sweep = time.monotonic()
+    try:
+        await ArchiveStore.ensure_indexes()
+        swept = await ArchiveStore.sweep_claimed_rewards()
+    except Exception as e:
+        logger.error(f"[Archive Job] Failed to sweep claimed rewards: {e}")
+        return
+    if swept:
+        await cache.invalidate("rewards")
+        logger.info(f"[Archive Job] Archived {swept} rewards claimed after their proposal.")
@@ -10,6 +10,13 @@ from app.routes.vote import router as vote_router
 from app.routes.rewards import router as rewards_router
 from app.routes.scheduler import router as scheduler_router
 from app.routes.world import router as world_router
+from app.routes.metrics import router as metrics_router
+from app.routes.export import router as export_router
+from app.services.tee_client import TeeClient
+from app.services.rpc_governor import BACKGROUND, rpc_priority
+from app.timing import TimingMiddleware
+from app.services.signer import TransactionSigner
+from app.services.vote_ingest import vote_buffer
 
 logger = logging.getLogger("uvicorn.error")
 
@@ -26,15 +33,27 @@ app.add_middleware(
 
 # app.add_middleware(WorldIDMiddleware)
 
+# Outermost: Server-Timing header and request latency histograms
+app.add_middleware(TimingMiddleware)
+
 # Global background task handle
 background_task = None
 
 async def cronjob():
-    from app.jobs.scheduler import start_reveal_phase_job, finalize_reward_job
+    from app.jobs.scheduler import (
+        start_reveal_phase_job, reveal_votes_job, finalize_reward_job, label_writeback_job,
+        archive_finished_job, resume_transactions_job,
+    )
+    # chain calls of the jobs wait behind those of API requests
+    rpc_priority.set(BACKGROUND)
     while True:
         try:
+            await resume_transactions_job()
             await start_reveal_phase_job()
+            await reveal_votes_job()
             await finalize_reward_job()
+            await label_writeback_job()
+            await archive_finished_job()
         except Exception as e:
             logger.error(f"Error in cronjob: {e}")
         await asyncio.sleep(3)
@@ -55,6 +74,9 @@ async def on_shutdown():
             await background_task
         except asyncio.CancelledError:
             logger.info("Background scheduler cancelled.")
+    await vote_buffer.drain()
+    await TeeClient.close()
+    TransactionSigner.close()
     await close_mongo_connection()
     logger.info("Shutdown complete — MongoDB connection closed.")
 
@@ -63,4 +85,6 @@ app.include_router(propose_router)
 app.include_router(vote_router)
 app.include_router(rewards_router)
 app.include_router(scheduler_router)
-app.include_router(world_router)
\ No newline at end of file
+app.include_router(world_router)
+app.include_router(metrics_router)
+app.include_router(export_router)
\ No newline at end of file
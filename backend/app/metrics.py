@@ -0,0 +1,160 @@
+import bisect
+import threading
+from typing import Dict, List, Tuple
+
+DEFAULT_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120)
+
+
+class Counter:
+    """
+    Monotonic counter with optional labels, exported in Prometheus text format.
+    """
+
+    def __init__(self, name: str, documentation: str, labelnames: Tuple[str, ...] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = labelnames
+        self._values: Dict[Tuple[str, ...], float] = {}
+        self._lock = threading.Lock()
+        REGISTRY.append(self)
+
+    def inc(self, amount: float = 1, **labels: str):
+        key = tuple(str(labels.get(name, "")) for name in self.labelnames)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def value(self, **labels: str) -> float:
+        key = tuple(str(labels.get(name, "")) for name in self.labelnames)
+        return self._values.get(key, 0)
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} counter"]
+        with self._lock:
+            items = sorted(self._values.items())
+        for key, value in items:
+            lines.append(f"{self.name}{_format_labels(self.labelnames, key)} {value:g}")
+        return lines
+
+
+class Histogram:
+    """
+    Cumulative-bucket histogram with optional labels, exported in Prometheus text format.
+    """
+
+    def __init__(self, name: str, documentation: str, labelnames: Tuple[str, ...] = (),
+                 buckets: Tuple[float, ...] = DEFAULT_BUCKETS):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = labelnames
+        self.buckets = tuple(sorted(buckets))
+        # label values -> [count per bucket..., +Inf count, sum]
+        self._values: Dict[Tuple[str, ...], List[float]] = {}
+        self._lock = threading.Lock()
+        REGISTRY.append(self)
+
+    def observe(self, value: float, **labels: str):
+        key = tuple(str(labels.get(name, "")) for name in self.labelnames)
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._values.get(key)
+            if series is None:
+                series = self._values[key] = [0] * (len(self.buckets) + 2)
+            series[index] += 1
+            series[-1] += value
+
+    def count(self, **labels: str) -> int:
+        key = tuple(str(labels.get(name, "")) for name in self.labelnames)
+        series = self._values.get(key)
+        return int(sum(series[:-1])) if series else 0
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            items = sorted((key, list(series)) for key, series in self._values.items())
+        for key, series in items:
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float("inf"),), series[:-1]):
+                cumulative += count
+                le = "+Inf" if bound == float("inf") else f"{bound:g}"
+                labels = _format_labels(self.labelnames + ("le",), key + (le,))
+                lines.append(f"{self.name}_bucket{labels} {cumulative:g}")
+            labels = _format_labels(self.labelnames, key)
+            lines.append(f"{self.name}_sum{labels} {series[-1]:g}")
+            lines.append(f"{self.name}_count{labels} {cumulative:g}")
+        return lines
+
+
+def _format_labels(names: Tuple[str, ...], values: Tuple[str, ...]) -> str:
+    if not names:
+        return ""
+    pairs = ",".join(f'{n}="{_escape(v)}"' for n, v in zip(names, values))
+    return "{" + pairs + "}"
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+REGISTRY: List["Counter | Histogram"] = []
+
+
+def render_prometheus() -> str:
+    lines: List[str] = []
+    for metric in REGISTRY:
+        lines.extend(metric.render())
+    return "\n".join(lines) + "\n"
+
+
+TEE_RESULT_CACHE = Counter(
+    "trustag_tee_result_cache_total",
+    "TEE scoring requests served from / missing in the tee_results cache.",
+    ("result",),
+)
+
+CACHE_REQUESTS = Counter(
+    "trustag_cache_requests_total",
+    "Read-through cache lookups by namespace and result (hit, miss, coalesced).",
+    ("namespace", "result"),
+)
+
+REQUEST_SECONDS = Histogram(
+    "trustag_http_request_seconds",
+    "HTTP request latency by method, route template and status.",
+    ("method", "route", "status"),
+)
+
+DEPENDENCY_SECONDS = Histogram(
+    "trustag_dependency_seconds",
+    "Latency of calls to backing services (mongo, rpc, rpc_wait, worldid, tee).",
+    ("component",),
+)
+
+TX_FEE_BUMPS = Counter(
+    "trustag_tx_fee_bumps_total",
+    "Same-nonce replacements of stuck backend transactions, by contract method.",
+    ("method",),
+)
+
+REVEAL_MISMATCHES = Counter(
+    "trustag_reveal_mismatches_total",
+    "Stored votes not revealed because they can't match the on-chain commit, by reason.",
+    ("reason",),
+)
+
+LABEL_WRITES = Counter(
+    "trustag_label_writes_total",
+    "Label outbox entries processed, by outcome (sent, unchanged, failed).",
+    ("outcome",),
+)
+
+RPC_THROTTLES = Counter(
+    "trustag_rpc_throttles_total",
+    "JSON-RPC calls rejected with 429 or timed out, by endpoint and reason.",
+    ("endpoint", "reason"),
+)
+
+ADMISSION_REJECTIONS = Counter(
+    "trustag_admission_rejections_total",
+    "Write requests turned away by admission control, by route and limit hit.",
+    ("route", "reason"),
+)
@@ -0,0 +1,169 @@
+import hmac
+import json
+import zlib
+from datetime import datetime
+from typing import Any, AsyncIterator, Callable, Dict, List
+
+from fastapi import APIRouter, Depends, Header, HTTPException, Query
+from fastapi.responses import StreamingResponse
+
+from app.config import EXPORT_API_KEY, EXPORT_BATCH_SIZE
+from app.db.mongodb import get_database
+from app.services.archive import archive_name, unpack
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+router = APIRouter(prefix="/api/export", tags=["export"])
+
+# Exportable collections and the field their since/until time range applies to.
+EXPORT_COLLECTIONS = {
+    "proposals": "created_at",
+    "votes": "created_at",
+    "rewards": "claimed_at",
+}
+
+# Commit-reveal secrets of a vote, exported only once it is revealed or its
+# proposal finished
+SECRET_VOTE_FIELDS = ("vote", "prediction", "salt")
+
+# Encoded lines are collected into chunks of about this size before being sent.
+CHUNK_SIZE = 64 * 1024
+
+
+def _encode(doc: Dict) -> bytes:
+    if orjson is not None:
+        return orjson.dumps(doc, default=str, option=orjson.OPT_APPEND_NEWLINE)
+    return json.dumps(doc, default=str, separators=(",", ":")).encode() + b"\n"
+
+
+def require_export_key(authorization: str = Header("")):
+    """
+    Exports hold every vote and reward: only callers with EXPORT_API_KEY get them.
+    """
+    if not EXPORT_API_KEY:
+        raise HTTPException(403, "Export is disabled")
+    scheme, _, key = authorization.partition(" ")
+    if scheme.lower() != "bearer" or not hmac.compare_digest(key.encode(), EXPORT_API_KEY.encode()):
+        raise HTTPException(401, "Invalid export API key", headers={"WWW-Authenticate": "Bearer"})
+
+
+def build_export_query(collection: str, proposal_id: str | None, phase: str | None,
+                       since: datetime | None, until: datetime | None, after: str | None,
+                       phase_proposal_ids: List[str] | None = None) -> Dict:
+    """
+    phase filters proposals directly; votes and rewards through the ids of the
+    proposals in that phase (phase_proposal_ids).
+    """
+    query: Dict = {}
+    if proposal_id is not None:
+        query["_id" if collection == "proposals" else "proposal_id"] = proposal_id
+    if phase is not None:
+        if collection == "proposals":
+            query["phase"] = phase
+        else:
+            ids = phase_proposal_ids or []
+            if proposal_id is not None:
+                ids = [proposal_id] if proposal_id in ids else []
+            query["proposal_id"] = {"$in": ids}
+    time_field = EXPORT_COLLECTIONS[collection]
+    if since is not None or until is not None:
+        query[time_field] = {}
+        if since is not None:
+            query[time_field]["$gte"] = since
+        if until is not None:
+            query[time_field]["$lt"] = until
+    if after is not None:
+        if "_id" in query:
+            query["_id"] = {"$eq": query["_id"], "$gt": after}
+        else:
+            query["_id"] = {"$gt": after}
+    return query
+
+
+class VoteRedactor:
+    """
+    Drops SECRET_VOTE_FIELDS from votes that are not revealed and whose
+    proposal hasn't finished. Proposal phases are looked up once per proposal.
+    """
+
+    def __init__(self, db):
+        self.db = db
+        self._phases: Dict[str, str | None] = {}
+
+    async def __call__(self, vote: Dict) -> Dict:
+        if vote.get("reveal_status") == "revealed":
+            return vote
+        proposal_id = vote.get("proposal_id")
+        if proposal_id not in self._phases:
+            proposal = await self.db["proposals"].find_one({"_id": proposal_id}, {"phase": 1})
+            self._phases[proposal_id] = proposal.get("phase") if proposal else None
+        if self._phases[proposal_id] == "Finished":
+            return vote
+        return {k: v for k, v in vote.items() if k not in SECRET_VOTE_FIELDS}
+
+
+async def stream_ndjson(cursor, archived: bool, compress: bool,
+                        redact: Callable[[Dict], Any] | None = None) -> AsyncIterator[bytes]:
+    """
+    Encode documents from a Motor cursor as NDJSON, one chunk at a time, so memory
+    stays bounded by the cursor batch and CHUNK_SIZE whatever the export size.
+    """
+    compressor = zlib.compressobj(wbits=31) if compress else None  # wbits=31: gzip container
+    chunk = bytearray()
+    async for doc in cursor:
+        doc = unpack(doc) if archived else doc
+        if redact is not None:
+            doc = await redact(doc)
+        chunk += _encode(doc)
+        if len(chunk) >= CHUNK_SIZE:
+            out = compressor.compress(bytes(chunk)) if compressor else bytes(chunk)
+            chunk.clear()
+            if out:
+                yield out
+    if compressor:
+        yield compressor.compress(bytes(chunk)) + compressor.flush()
+    elif chunk:
+        yield bytes(chunk)
+
+
+@router.get("/{collection}", dependencies=[Depends(require_export_key)])
+async def export_collection(
+    collection: str,
+    proposal_id: str | None = None,
+    phase: str | None = None,
+    since: datetime | None = None,
+    until: datetime | None = None,
+    after: str | None = Query(None, description="Resume token: the _id of the last record received"),
+    archived: bool = Query(False, description="Export the archive tier instead of the live collection"),
+    gzip: bool = False,
+    db=Depends(get_database),
+):
+    """
+    Stream a whole collection as NDJSON, ordered by _id.
+
+    An interrupted export resumes with after=<_id of the last line received>.
+    Votes leave out vote, prediction and salt until they are revealed or their
+    proposal finished (archived proposals all have). With gzip, the body is a
+    .ndjson.gz file (application/gzip).
+    """
+    if collection not in EXPORT_COLLECTIONS:
+        raise HTTPException(404, f"Unknown export collection: {collection}")
+
+    phase_proposal_ids = None
+    if phase is not None and collection != "proposals":
+        proposals = db[archive_name("proposals") if archived else "proposals"]
+        phase_proposal_ids = await proposals.distinct("_id", {"phase": phase})
+    query = build_export_query(collection, proposal_id, phase, since, until, after, phase_proposal_ids)
+    source = db[archive_name(collection) if archived else collection]
+    cursor = source.find(query).sort("_id", 1).batch_size(EXPORT_BATCH_SIZE)
+    redact = VoteRedactor(db) if collection == "votes" and not archived else None
+
+    filename = f"{collection}.ndjson.gz" if gzip else f"{collection}.ndjson"
+    return StreamingResponse(
+        stream_ndjson(cursor, archived, gzip, redact),
+        media_type="application/gzip" if gzip else "application/x-ndjson",
+        headers={"Content-Disposition": f'attachment; filename="{filename}"'},
+    )
@@ -26,5 +26,8 @@ class WorldIDMiddleware(BaseHTTPMiddleware):
             if not ok:
                 logger.warning("WorldID verification failed")
                 raise HTTPException(400, "WorldID verification failed")
+            # admission control only rate limits verified nullifiers
+            if payload.get("nullifier_hash"):
+                request.state.verified_nullifier = str(payload["nullifier_hash"]).lower()
 
         return await call_next(request)
@@ -1,12 +1,17 @@
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Request
 from pydantic import BaseModel
 from datetime import datetime, timedelta, timezone
 import uuid
 from web3 import Web3
+from pymongo.errors import DuplicateKeyError
 
 from app.db.mongodb import get_database
 from pymongo.collection import Collection
-from app.services.smart_contract_client import w3
+from app.services.smart_contract_client import relay_transaction, view_cache
+from app.services.proposal_stats import ProposalStats
+from app.services.cache import cache
+from app.services.admission import admit
+from app.config import PROPOSAL_COMMIT_SECONDS
 
 router = APIRouter(prefix="/api", tags=["proposals"])
 
@@ -17,8 +22,10 @@ class ProposeRequest(BaseModel):
     malicious: bool
     # verifyPayload: dict
     signed_txn: str | None = None  # Optional signed transaction
+    proposalId: str | None = None  # The id used in signed_txn's createProposal; generated if omitted
 
 class ProposeResponse(BaseModel):
+    id: str
     message: str
     hash: str | None = None
 
@@ -30,66 +37,86 @@ class ProposalListItem(BaseModel):
     proof: str
     deadline: datetime
     phase: str
+    vote_count: int = 0
+    # Yes/no split is withheld while the proposal is still in its commit phase
+    yes_count: int | None = None
+    no_count: int | None = None
 
 class ProposalListResponse(BaseModel):
     list: list[ProposalListItem]
 
-@router.post("/propose", response_model=ProposeResponse)
+@router.post("/propose", response_model=ProposeResponse, dependencies=[Depends(admit("propose"))])
 async def propose_tag(req: ProposeRequest, db=Depends(get_database)):
-    proposal_id = str(uuid.uuid4())
-    deadline = datetime.now(timezone.utc) + timedelta(hours=24)
+    proposal_id = req.proposalId or str(uuid.uuid4())
+    deadline = datetime.now(timezone.utc) + timedelta(seconds=PROPOSAL_COMMIT_SECONDS)
 
     try:
         target_address = Web3.to_checksum_address(req.address)
     except Exception:
         raise HTTPException(400, f"Invalid address format: {req.address}")
 
+    coll: Collection = db["proposals"]
+    if req.proposalId and await coll.find_one({"_id": proposal_id}):
+        raise HTTPException(409, f"Proposal {proposal_id} already exists")
+
     tx_hex = None
 
     # Only submit the signed transaction if provided
     if req.signed_txn:
         try:
             signed_txn_bytes = bytes.fromhex(req.signed_txn.replace('0x', ''))
-            tx_hash = w3.eth.send_raw_transaction(signed_txn_bytes)
-            tx_hex = tx_hash.hex()
-            receipt = w3.eth.wait_for_transaction_receipt(tx_hash, timeout=120)
+            tx_hex, receipt = await relay_transaction(signed_txn_bytes)
             if receipt.status != 1:
                 raise RuntimeError(f"Transaction {tx_hex} failed: {receipt}")
+            view_cache.observe(receipt.blockNumber, proposal_id)
         except Exception as e:
             from traceback import format_exc
             print(format_exc())
             raise HTTPException(500, f"Transaction submission failed: {e}")
 
-    coll: Collection = db["proposals"]
-    await coll.insert_one({
-        "_id": proposal_id,
-        "id": proposal_id,
-        "address": target_address,
-        "description": req.tag,
-        "malicious": req.malicious,
-        "proof": req.proof,
-        "deadline": deadline,
-        "phase": "Commit",
-        "tx_hash": tx_hex,
-        "created_at": datetime.now(timezone.utc),
-        "updated_at": datetime.now(timezone.utc)
-    })
-
-    return ProposeResponse(message="success", hash=tx_hex)
+    try:
+        await coll.insert_one({
+            "_id": proposal_id,
+            "id": proposal_id,
+            "address": target_address,
+            "description": req.tag,
+            "malicious": req.malicious,
+            "proof": req.proof,
+            "deadline": deadline,
+            "phase": "Commit",
+            "tx_hash": tx_hex,
+            "created_at": datetime.now(timezone.utc),
+            "updated_at": datetime.now(timezone.utc)
+        })
+    except DuplicateKeyError:
+        # a concurrent request stored the same proposalId first
+        raise HTTPException(409, f"Proposal {proposal_id} already exists")
+    await cache.invalidate("proposals")
+
+    return ProposeResponse(id=proposal_id, message="success", hash=tx_hex)
 
 @router.get("/propose/list", response_model=ProposalListResponse)
-async def list_proposals(db=Depends(get_database)):
+async def list_proposals(request: Request, db=Depends(get_database)):
+    return await cache.json_response(request, "proposals", "list", lambda: _load_proposals(db))
+
+
+async def _load_proposals(db) -> ProposalListResponse:
     docs = await db["proposals"].find().to_list(length=100)
-    items = [
-        ProposalListItem(
+    stats = await ProposalStats.get_many([d["_id"] for d in docs])
+    items = []
+    for d in docs:
+        tally = stats.get(d["_id"], {})
+        revealed = d.get("phase", "Unknown") != "Commit"
+        items.append(ProposalListItem(
             id=str(d.get("id", d["_id"])),  # 自定義 ID 優先，否則 fallback 為 _id（轉字串）
             address=d["address"],
             tag=d.get("description", d.get("tag", "Unknown")),
             malicious=d["malicious"],
             deadline=d["deadline"],
             proof=d.get("proof", ""),
-            phase=d.get("phase", "Unknown")
-        )
-        for d in docs
-    ]
+            phase=d.get("phase", "Unknown"),
+            vote_count=tally.get("vote_count", 0),
+            yes_count=tally.get("yes_count", 0) if revealed else None,
+            no_count=tally.get("no_count", 0) if revealed else None,
+        ))
     return ProposalListResponse(list=items)
\ No newline at end of file
@@ -1,10 +1,12 @@
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Request
 from pydantic import BaseModel
 from datetime import datetime, timezone
 from typing import List
 from uuid import uuid4
 
 from app.db.mongodb import get_database
+from app.services.archive import ArchiveStore
+from app.services.cache import cache
 from pymongo.collection import Collection
 
 router = APIRouter(prefix="/api", tags=["rewards"])
@@ -23,9 +25,24 @@ class RewardsListResponse(BaseModel):
 
 
 @router.post("/rewards", response_model=RewardsListResponse)
-async def get_rewards(req: RewardsQuery, db=Depends(get_database)):
-    docs = await db["rewards"].find({"address": req.address}).to_list(length=100)
-    return RewardsListResponse(list=docs)
+async def get_rewards(req: RewardsQuery, request: Request):
+    return await _rewards_response(request, req.address)
+
+
+@router.get("/rewards/{address}", response_model=RewardsListResponse)
+async def get_rewards_by_address(address: str, request: Request):
+    """
+    GET form of /rewards, so clients can revalidate with If-None-Match.
+    """
+    return await _rewards_response(request, address)
+
+
+async def _rewards_response(request: Request, address: str):
+    async def load():
+        docs = await ArchiveStore.find_rewards(address, limit=100)
+        return RewardsListResponse(list=docs)
+
+    return await cache.json_response(request, "rewards", address, load)
 
 
 @router.post("/rewards/claim")
@@ -38,7 +55,8 @@ async def claim_rewards(req: ClaimRequest, db=Depends(get_database)):
 
     for reward_id in req.reward_ids:
         result = await rewards.update_one(
-            {"_id": reward_id, "claimed_at": {"$exists": False}},
+            # finalize stores claimed_at: None; matches null and missing
+            {"_id": reward_id, "claimed_at": None},
             {"$set": {"claimed_at": datetime.now(timezone.utc)}}
         )
         if result.modified_count:
@@ -47,4 +65,6 @@ async def claim_rewards(req: ClaimRequest, db=Depends(get_database)):
     if not updated_ids:
         raise HTTPException(404, "No rewards were updated (already claimed or not found)")
 
+    await cache.invalidate("rewards")
+
     return {"updated": updated_ids}
\ No newline at end of file
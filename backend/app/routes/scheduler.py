@@ -1,5 +1,8 @@
 from fastapi import APIRouter, HTTPException
-from app.jobs.scheduler import start_reveal_phase_job, finalize_reward_job
+from app.jobs.scheduler import (
+    start_reveal_phase_job, reveal_votes_job, finalize_reward_job, label_writeback_job, archive_finished_job,
+    resume_transactions_job,
+)
 
 router = APIRouter(prefix="/api/test", tags=["scheduler"])
 
@@ -14,6 +17,17 @@ async def trigger_start_reveal():
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error: {e}")
 
+@router.post("/reveal_votes")
+async def trigger_reveal_votes():
+    """
+    Endpoint to trigger the reveal_votes_job.
+    """
+    try:
+        await reveal_votes_job()
+        return {"message": "reveal_votes_job executed successfully"}
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error: {e}")
+
 @router.post("/finalize_reward")
 async def trigger_finalize_reward():
     """
@@ -23,4 +37,37 @@ async def trigger_finalize_reward():
         await finalize_reward_job()
         return {"message": "finalize_reward_job executed successfully"}
     except Exception as e:
-        raise HTTPException(status_code=500, detail=f"Error: {e}")
\ No newline at end of file
+        raise HTTPException(status_code=500, detail=f"Error: {e}")
+
+@router.post("/label_writeback")
+async def trigger_label_writeback():
+    """
+    Endpoint to trigger the label_writeback_job.
+    """
+    try:
+        await label_writeback_job()
+        return {"message": "label_writeback_job executed successfully"}
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error: {e}")
+
+@router.post("/archive")
+async def trigger_archive():
+    """
+    Endpoint to trigger the archive_finished_job.
+    """
+    try:
+        await archive_finished_job()
+        return {"message": "archive_finished_job executed successfully"}
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error: {e}")
+
+@router.post("/resume_transactions")
+async def trigger_resume_transactions():
+    """
+    Endpoint to trigger the resume_transactions_job.
+    """
+    try:
+        await resume_transactions_job()
+        return {"message": "resume_transactions_job executed successfully"}
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error: {e}")
@@ -2,10 +2,14 @@ from fastapi import APIRouter, Depends, HTTPException
 from pydantic import BaseModel
 from datetime import datetime, timezone
 import uuid
+from eth_account import Account
 
+from app.services.smart_contract_client import relay_transaction, view_cache
 from app.db.mongodb import get_database
-from pymongo.collection import Collection
-from app.services.smart_contract_client import VoteContract, w3
+from app.services.vote_ingest import IngestQueueFull, vote_buffer, vote_id
+from app.services.cache import cache
+from app.services.admission import admit
+from app.config import VOTE_RETRY_AFTER
 
 router = APIRouter(prefix="/api", tags=["votes"])
 
@@ -22,39 +26,53 @@ class VoteResponse(BaseModel):
     message: str
     hash: str | None = None
 
-@router.post("/vote", response_model=VoteResponse)
-async def cast_vote(req: SignedVoteRequest, db=Depends(get_database)):
+@router.post("/vote", response_model=VoteResponse, dependencies=[Depends(admit("vote"))])
+async def cast_vote(req: SignedVoteRequest):
     tx_hex = None
+    voter = None
+    # unsigned votes have no voter to key on
+    record_id = str(uuid.uuid4())
 
     # Only submit signed_txn if provided
     if req.signed_txn:
         try:
-            tx_hash = w3.eth.send_raw_transaction(
-                bytes.fromhex(req.signed_txn[2:] if req.signed_txn.startswith('0x') else req.signed_txn)
-            )
-            tx_hex = tx_hash.hex()
-            receipt = w3.eth.wait_for_transaction_receipt(tx_hash, timeout=120)
+            raw_txn = bytes.fromhex(req.signed_txn[2:] if req.signed_txn.startswith('0x') else req.signed_txn)
+            # the commitVote sender is the voter that getProposalVoters lists at finalize
+            voter = Account.recover_transaction(raw_txn)
+            record_id = vote_id(req.proposalId, voter)
+            # a retry of a vote whose write went unconfirmed: already stored and relayed
+            stored = await get_database()["votes"].find_one({"_id": record_id}, {"tx_hash": 1})
+            if stored is not None:
+                return VoteResponse(_id=record_id, message="success", hash=stored.get("tx_hash"))
+            tx_hex, receipt = await relay_transaction(raw_txn)
 
             if receipt.status != 1:
                 raise HTTPException(500, f"Transaction {tx_hex} failed: {receipt}")
+            # getProposalVoters changed
+            view_cache.observe(receipt.blockNumber, req.proposalId)
 
         except Exception as e:
             from traceback import format_exc
             print(format_exc())
             raise HTTPException(500, f"Contract call failed: {e}")
 
-    # Record the vote in the database regardless of signed_txn presence
-    coll: Collection = db["votes"]
-    record_id = str(uuid.uuid4())
-
-    await coll.insert_one({
-        "_id": record_id,
-        "proposal_id": req.proposalId,
-        "vote": req.vote,
-        "prediction": req.prediction,
-        "salt": req.salt,
-        "tx_hash": tx_hex,
-        "created_at": datetime.now(timezone.utc),
-    })
+    # Record the vote in the database regardless of signed_txn presence.
+    # Votes are group-committed with concurrent requests; this returns once written.
+    try:
+        await vote_buffer.submit({
+            "_id": record_id,
+            "proposal_id": req.proposalId,
+            "address": voter,
+            "vote": req.vote,
+            "prediction": req.prediction,
+            "salt": req.salt,
+            "tx_hash": tx_hex,
+            "created_at": datetime.now(timezone.utc),
+        })
+    except IngestQueueFull:
+        raise HTTPException(503, "Too many votes in flight, retry shortly",
+                            headers={"Retry-After": str(VOTE_RETRY_AFTER)})
+    # vote counts in /api/propose/list changed
+    await cache.invalidate("proposals")
 
     return VoteResponse(_id=record_id, message="success", hash=tx_hex)
@@ -1,13 +1,12 @@
-from fastapi import APIRouter, HTTPException, Body
+from fastapi import APIRouter, HTTPException
 from pydantic import BaseModel
-import time, re
+import time
 from eth_account import Account
 from eth_account.messages import encode_defunct
-import re
 from datetime import datetime
-from web3 import Web3
-from eth_account.messages import encode_defunct
 
+from app.config import SIWE_RPC_URL
+from app.services.safe_owners import owner_lookup_for
 from app.services.worldchain import Worldchain
 
 # Constants from TypeScript
@@ -22,17 +21,6 @@ NBF_TAG = 'Not Before: '
 RID_TAG = 'Request ID: '
 ERC_191_PREFIX = '\x19Ethereum Signed Message:\n'
 
-# SAFE contract ABI for isOwner function
-SAFE_CONTRACT_ABI = [
-    {
-        "inputs": [{"internalType": "address", "name": "owner", "type": "address"}],
-        "name": "isOwner",
-        "outputs": [{"internalType": "bool", "name": "", "type": "bool"}],
-        "stateMutability": "view",
-        "type": "function"
-    }
-]
-
 def tagged(line, tag):
     """Extract value from a tagged line."""
     if line and tag in line:
@@ -153,9 +141,6 @@ async def verify_siwe_message(payload, nonce, statement=None, request_id=None, r
     if request_id and siwe_message_data.get('request_id') != request_id:
         raise ValueError(f"Request ID mismatch. Got: {siwe_message_data.get('request_id')}, Expected: {request_id}")
     
-    # Initialize Web3 connection
-    w3 = Web3(Web3.HTTPProvider(rpc_url or 'https://4801.rpc.thirdweb.com'))
-    
     try:
         # Create a message object for signing
         message_obj = encode_defunct(text=message)
@@ -165,11 +150,10 @@ async def verify_siwe_message(payload, nonce, statement=None, request_id=None, r
             signature = '0x' + signature
         
         # Recover the signer's address
-        recovered_address = w3.eth.account.recover_message(message_obj, signature=signature)
+        recovered_address = Account.recover_message(message_obj, signature=signature)
         
-        # Check if recovered address is an owner using the Safe contract
-        contract = w3.eth.contract(address=Web3.to_checksum_address(address), abi=SAFE_CONTRACT_ABI)
-        is_owner = contract.functions.isOwner(recovered_address).call()
+        # Check if recovered address is an owner using the Safe contract (cached per (safe, signer))
+        is_owner = await owner_lookup_for(rpc_url or SIWE_RPC_URL).is_owner(address, recovered_address)
         
         if not is_owner:
             raise ValueError("Signature verification failed, invalid owner")
@@ -191,7 +175,7 @@ async def handle_siwe_auth(payload):
         result = await verify_siwe_message(
             payload=payload,
             nonce=stored_nonce,
-            rpc_url="https://4801.rpc.thirdweb.com"
+            rpc_url=SIWE_RPC_URL
         )
         
         if result['is_valid']:
@@ -0,0 +1,68 @@
+"""
+Benchmark the vectorized BTS scoring engine against the original per-vote loop.
+
+    python -m app.scripts.bench_bts
+"""
+import math
+import time
+
+import numpy as np
+
+from app.services.bts_scoring import EPSILON, bts_scores, fixed_point_scores, reward_amounts, segment_ids_for
+
+SIZES = [10, 10_000, 1_000_000]
+
+
+def loop_scores(votes, predictions):
+    n = len(votes)
+    count_yes = sum(1 for v in votes if v)
+    f_yes = max(count_yes / n, EPSILON)
+    f_no = max((n - count_yes) / n, EPSILON)
+
+    sum_log_yes = 0.0
+    sum_log_no = 0.0
+    for p in predictions:
+        sum_log_yes += math.log(max(p / 100.0, EPSILON))
+        sum_log_no += math.log(max(1 - p / 100.0, EPSILON))
+    pbar_yes = math.exp(sum_log_yes / n)
+    pbar_no = math.exp(sum_log_no / n)
+
+    scores = []
+    for v, p in zip(votes, predictions):
+        p_yes = max(p / 100.0, EPSILON)
+        p_no = max(1 - p / 100.0, EPSILON)
+        term_a = math.log(f_yes / pbar_yes) if v else math.log(f_no / pbar_no)
+        term_b = p_yes * math.log(pbar_yes / f_yes) + p_no * math.log(pbar_no / f_no)
+        scores.append(term_a + term_b)
+    return scores
+
+
+def timed(fn, repeat=3):
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main():
+    rng = np.random.default_rng(0)
+    print(f"{'votes':>10} {'loop (s)':>12} {'numpy (s)':>12} {'speedup':>9} {'batched 100 (s)':>16}")
+    for size in SIZES:
+        votes = rng.random(size) < 0.55
+        predictions = rng.integers(0, 101, size)
+        vote_list, prediction_list = votes.tolist(), predictions.tolist()
+
+        t_loop = timed(lambda: loop_scores(vote_list, prediction_list), repeat=1 if size >= 1_000_000 else 3)
+        t_numpy = timed(lambda: reward_amounts(fixed_point_scores(bts_scores(votes, predictions))))
+
+        # Same votes split over 100 proposals and scored in one call
+        segments = segment_ids_for(np.full(100, size // 100) + (np.arange(100) < size % 100))
+        t_batched = timed(lambda: bts_scores(votes, predictions, segments, 100))
+
+        print(f"{size:>10} {t_loop:>12.6f} {t_numpy:>12.6f} {t_loop / t_numpy:>8.1f}x {t_batched:>16.6f}")
+
+
+if __name__ == "__main__":
+    main()
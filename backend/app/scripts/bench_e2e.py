@@ -0,0 +1,344 @@
+"""
+End-to-end load benchmark: the real backend (uvicorn app.main:app in its own
+process) against local stand-ins for every external service
+(app/scripts/e2e_standins.py):
+
+  chain     eth-tester EVM with TrustTagToken/Storage/Voting deployed, over JSON-RPC
+  TEE       bts-op-tee/fastapi service on the simulated OP-TEE guest
+  World ID  stub verifier; WorldIDMiddleware is enabled for the run
+  Mongo     --mongo URI (a fresh trustag_bench_<time> database per run), by
+            default the in-process store of app/db/memory.py
+
+Each run drives the proposal lifecycle and reports p50/p99 latency and
+throughput per endpoint and the duration of each stage:
+
+  propose   one proposer per proposal signs createProposal and POSTs /api/propose
+  vote      burst: every voter commits a vote on every proposal via /api/vote,
+            while --readers clients poll /api/propose/list
+  reveal    /api/test/reveal_votes: the backend verifies the stored votes against
+            their commitments and reveals them, after the reveal job moves
+            proposals to Reveal
+  finalize  /api/test/finalize_reward: TEE scoring and the finalize transaction
+  claim     every voter reads /api/rewards/<address> and claims its rewards
+
+    python -m app.scripts.bench_e2e --proposals 4 --voters 10
+    python -m app.scripts.bench_e2e --mongo mongodb://localhost:27017 --readers 8
+"""
+import argparse
+import asyncio
+import os
+import secrets
+import subprocess
+import sys
+import time
+from collections import defaultdict
+from typing import Dict, List
+
+import httpx
+from eth_account import Account
+from web3 import Web3
+
+from app.scripts.e2e_standins import (
+    TOKEN,
+    LocalChain,
+    WorldIdStub,
+    wait_for_port,
+    free_port,
+    new_accounts,
+    start_tee,
+    stop_processes,
+)
+
+VOTE_GAS = 300_000
+PROPOSE_GAS = 400_000
+# Phase lengths the backend stores; the benchmark moves the chain clock instead of waiting
+COMMIT_SECONDS = 3600
+REVEAL_SECONDS = 0
+VERIFY_PAYLOAD = {
+    "nullifier_hash": "0x0", "merkle_root": "0x0", "proof": "0x0",
+    "verification_level": "orb", "action": "bench",
+}
+
+
+def verify_payload(account) -> Dict:
+    # one World ID per simulated user, as admission control buckets by nullifier
+    return dict(VERIFY_PAYLOAD, nullifier_hash=account.address.lower())
+
+
+def bench_app():
+    """
+    uvicorn factory for the backend under test: app.main:app with World ID
+    verification on.
+    """
+    from starlette.middleware import Middleware
+
+    from app.main import app
+    from app.routes.middleware import WorldIDMiddleware
+
+    # inside TimingMiddleware, so World ID time shows up in Server-Timing
+    app.user_middleware.insert(1, Middleware(WorldIDMiddleware))
+    return app
+
+
+# ---- measurements ----
+
+def percentile(sorted_values: List[float], q: float) -> float:
+    if not sorted_values:
+        return 0.0
+    return sorted_values[min(int(len(sorted_values) * q), len(sorted_values) - 1)]
+
+
+def parse_server_timing(header: str) -> Dict[str, float]:
+    timings = {}
+    for part in header.split(","):
+        fields = part.strip().split(";")
+        for field in fields[1:]:
+            if field.startswith("dur="):
+                timings[fields[0]] = float(field[4:])
+    return timings
+
+
+class Recorder:
+    def __init__(self):
+        self.requests: Dict[str, List[float]] = defaultdict(list)
+        self.errors: Dict[str, int] = defaultdict(int)
+        self.components: Dict[str, Dict[str, float]] = defaultdict(lambda: defaultdict(float))
+        self.windows: Dict[str, List[float]] = {}
+        self.stages: List[tuple[str, float, str]] = []
+
+    async def request(self, client: httpx.AsyncClient, method: str, url: str, endpoint: str, **kwargs):
+        start = time.perf_counter()
+        try:
+            response = await client.request(method, url, **kwargs)
+        except httpx.HTTPError:
+            self.errors[endpoint] += 1
+            raise
+        elapsed = time.perf_counter() - start
+        window = self.windows.setdefault(endpoint, [start, start])
+        window[1] = max(window[1], start + elapsed)
+        if response.status_code >= 400:
+            self.errors[endpoint] += 1
+            return response
+        self.requests[endpoint].append(elapsed)
+        for component, ms in parse_server_timing(response.headers.get("server-timing", "")).items():
+            self.components[endpoint][component] += ms
+        return response
+
+    def stage(self, name: str, seconds: float, detail: str = ""):
+        self.stages.append((name, seconds, detail))
+        print(f"  {name:<12} {seconds * 1000:>10.1f} ms  {detail}")
+
+    def report(self):
+        print()
+        print(f"{'endpoint':<32} {'ok':>6} {'err':>5} {'req/s':>8} {'p50 ms':>9} {'p99 ms':>9}  server-timing mean ms")
+        for endpoint in sorted(set(self.requests) | set(self.errors)):
+            latencies = sorted(self.requests[endpoint])
+            start, end = self.windows.get(endpoint, (0.0, 0.0))
+            rate = len(latencies) / (end - start) if end > start else 0.0
+            components = "  ".join(
+                f"{c}={total / len(latencies):.1f}"
+                for c, total in sorted(self.components[endpoint].items()) if latencies
+            )
+            print(
+                f"{endpoint:<32} {len(latencies):>6} {self.errors[endpoint]:>5} {rate:>8.1f} "
+                f"{percentile(latencies, 0.5) * 1000:>9.1f} {percentile(latencies, 0.99) * 1000:>9.1f}  {components}"
+            )
+        print()
+        print(f"{'stage':<12} {'seconds':>9}")
+        for name, seconds, detail in self.stages:
+            print(f"{name:<12} {seconds:>9.2f}  {detail}")
+
+
+# ---- workload ----
+
+def signed(account, fn, nonce: int, gas: int, chain_id: int) -> str:
+    txn = fn.build_transaction({
+        "from": account.address, "nonce": nonce, "gas": gas,
+        "gasPrice": 10 ** 9, "chainId": chain_id,
+    })
+    return "0x" + account.sign_transaction(txn).raw_transaction.hex()
+
+
+async def run_stage(recorder: Recorder, name: str, coro, detail: str = ""):
+    start = time.perf_counter()
+    result = await coro
+    recorder.stage(name, time.perf_counter() - start, detail)
+    return result
+
+
+async def workload(args, chain: LocalChain, owner: str, base_url: str, recorder: Recorder):
+    voting = chain.contracts["TrustTagVoting"]
+    chain_id = chain.w3.eth.chain_id
+
+    proposers = new_accounts(args.proposals)
+    voters = new_accounts(args.voters)
+    print(f"Staking for {len(proposers)} proposers and {len(voters)} voters ...")
+    for account in proposers:
+        chain.add_account(account.key.hex(), eth=10)
+        chain.stake(owner, account.address, 300 * TOKEN)
+    for account in voters:
+        chain.add_account(account.key.hex(), eth=10)
+        chain.stake(owner, account.address, 20 * TOKEN * args.proposals)
+
+    limits = httpx.Limits(max_connections=args.concurrency, max_keepalive_connections=args.concurrency)
+    async with httpx.AsyncClient(base_url=base_url, limits=limits, timeout=300.0) as client:
+        print("Stages:")
+
+        # propose
+        commit_deadline = chain.now() + COMMIT_SECONDS
+        proposal_ids = [f"bench-{secrets.token_hex(8)}" for _ in proposers]
+
+        async def propose(account, proposal_id):
+            target = Account.create().address
+            txn = signed(account, voting.functions.createProposal(
+                proposal_id, target, True, "bench tag", commit_deadline,
+            ), chain.w3.eth.get_transaction_count(account.address), PROPOSE_GAS, chain_id)
+            await recorder.request(client, "POST", "/api/propose", "POST /api/propose", json={
+                "address": target, "tag": "bench tag", "proof": "bench", "malicious": True,
+                "signed_txn": txn, "proposalId": proposal_id, "verifyPayload": verify_payload(account),
+            })
+
+        await run_stage(recorder, "propose", asyncio.gather(
+            *(propose(a, pid) for a, pid in zip(proposers, proposal_ids))
+        ), f"{len(proposal_ids)} proposals")
+
+        # vote burst, with concurrent readers of the proposal list
+        ballots: Dict[str, List[tuple]] = {pid: [] for pid in proposal_ids}
+        pending_votes = []
+        for account in voters:
+            nonce = chain.w3.eth.get_transaction_count(account.address)
+            votes = []
+            for i, pid in enumerate(proposal_ids):
+                vote = secrets.randbelow(4) != 0  # 3:1 majority for "malicious"
+                prediction = secrets.randbelow(101)
+                salt = "0x" + secrets.token_hex(32)
+                vote_hash = Web3.solidity_keccak(["bool", "uint8", "bytes32"], [vote, prediction, salt])
+                txn = signed(account, voting.functions.commitVote(pid, vote_hash), nonce + i, VOTE_GAS, chain_id)
+                votes.append({
+                    "proposalId": pid, "signed_txn": txn, "vote": vote, "prediction": prediction,
+                    "salt": salt, "verifyPayload": verify_payload(account),
+                })
+                ballots[pid].append((account.address, vote, prediction, salt))
+            pending_votes.append(votes)
+
+        voting_done = asyncio.Event()
+
+        async def voter(votes):
+            # one voter's transactions must reach the chain in nonce order
+            for body in votes:
+                await recorder.request(client, "POST", "/api/vote", "POST /api/vote", json=body)
+
+        async def reader():
+            etag = None
+            while not voting_done.is_set():
+                headers = {"If-None-Match": etag} if etag else {}
+                response = await recorder.request(client, "GET", "/api/propose/list",
+                                                  "GET /api/propose/list", headers=headers)
+                etag = response.headers.get("etag", etag)
+                await asyncio.sleep(args.read_interval)
+
+        readers = [asyncio.create_task(reader()) for _ in range(args.readers)]
+        await run_stage(recorder, "vote", asyncio.gather(*(voter(v) for v in pending_votes)),
+                        f"{sum(len(v) for v in pending_votes)} votes, {args.readers} readers")
+        voting_done.set()
+        await asyncio.gather(*readers)
+
+        # commit deadline passes; reveal phase job, then the backend reveals the stored votes
+        chain.time_travel(commit_deadline + 1)
+        await run_stage(recorder, "start_reveal", recorder.request(
+            client, "POST", "/api/test/start_reveal", "POST /api/test/start_reveal"))
+        await run_stage(recorder, "reveal", recorder.request(
+            client, "POST", "/api/test/reveal_votes", "POST /api/test/reveal_votes"),
+            f"{sum(len(e) for e in ballots.values())} votes")
+        # VoteRevealed(proposalId, voter, vote, prediction)
+        revealed = len(voting.events.VoteRevealed().get_logs(from_block=0))
+        print(f"  {revealed}/{sum(len(e) for e in ballots.values())} votes revealed on chain")
+
+        # reveal deadline passes (the job set it to now + PROPOSAL_REVEAL_SECONDS)
+        chain.time_travel(int(time.time()) + REVEAL_SECONDS + 1)
+        await run_stage(recorder, "finalize", recorder.request(
+            client, "POST", "/api/test/finalize_reward", "POST /api/test/finalize_reward"))
+
+        # proposals(id) -> (target, malicious, description, proposer, deadline, phase, ...); 2 = Finished
+        finished = sum(1 for pid in proposal_ids if voting.functions.proposals(pid).call()[5] == 2)
+        print(f"  {finished}/{len(proposal_ids)} proposals finalized on chain")
+
+        # claim
+        async def claim(account):
+            response = await recorder.request(client, "GET", f"/api/rewards/{account.address}",
+                                              "GET /api/rewards/{address}")
+            reward_ids = [r["_id"] for r in response.json()["list"] if r.get("claimed_at") is None]
+            if reward_ids:
+                await recorder.request(client, "POST", "/api/rewards/claim", "POST /api/rewards/claim",
+                                       json={"reward_ids": reward_ids})
+
+        await run_stage(recorder, "claim", asyncio.gather(*(claim(a) for a in voters)),
+                        f"{len(voters)} voters")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="End-to-end backend load benchmark")
+    parser.add_argument("--proposals", type=int, default=4)
+    parser.add_argument("--voters", type=int, default=10, help="voters per proposal (each votes on all)")
+    parser.add_argument("--readers", type=int, default=4, help="clients polling /api/propose/list during the vote burst")
+    parser.add_argument("--read-interval", type=float, default=0.05)
+    parser.add_argument("--concurrency", type=int, default=64, help="max open HTTP connections to the backend")
+    parser.add_argument("--mongo", default="memory://", help="MongoDB URI, or memory:// for the in-process store")
+    parser.add_argument("--worldid-latency-ms", type=float, default=50.0)
+    parser.add_argument("--scorer", default="tee", help="BTS_SCORER_MODE for the backend")
+    parser.add_argument("--rpc-rate", type=float, default=1000.0,
+                        help="RPC_RATE and RPC_MAX_RATE for the backend (the local chain never throttles)")
+    args = parser.parse_args()
+
+    backend_key = Account.create()
+    chain = LocalChain()
+    owner = chain.add_account(backend_key.key.hex())
+    addresses = chain.deploy_trusttag(owner)
+    rpc_url = chain.serve()
+    tee_url, processes = start_tee()
+    worldid = WorldIdStub(args.worldid_latency_ms)
+
+    port = free_port()
+    env = dict(
+        os.environ,
+        BACKEND_WALLET_PRIVATE_KEY="0x" + backend_key.key.hex(),
+        BLOCKCHAIN_RPC_URL=rpc_url,
+        VOTE_CONTRACT_ADDRESS=addresses["voting"],
+        LABEL_CONTRACT_ADDRESS=addresses["storage"],
+        TEE_CLIENT_URL=tee_url,
+        WORLDCOIN_API_URL=worldid.url,
+        MONGODB_URI=args.mongo,
+        MONGODB_DB_NAME=f"trustag_bench_{int(time.time())}",
+        BTS_SCORER_MODE=args.scorer,
+        PROPOSAL_COMMIT_SECONDS="0",
+        PROPOSAL_REVEAL_SECONDS=str(REVEAL_SECONDS),
+        RPC_RATE=str(args.rpc_rate),
+        RPC_MAX_RATE=str(args.rpc_rate),
+        RPC_BURST=str(args.rpc_rate),
+        # every simulated client connects from 127.0.0.1
+        ADMISSION_IP_RATE="1000000",
+        ADMISSION_IP_BURST="1000000",
+    )
+    backend = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "--factory", "app.scripts.bench_e2e:bench_app",
+         "--host", "127.0.0.1", "--port", str(port), "--log-level", "warning"],
+        cwd=os.path.abspath(os.path.join(os.path.dirname(__file__), os.pardir, os.pardir)),
+        env=env,
+    )
+    processes.insert(0, backend)
+
+    recorder = Recorder()
+    try:
+        wait_for_port(port, backend)
+        print(f"Backend on :{port}, chain {rpc_url}, TEE {tee_url}, World ID {worldid.url}, Mongo {args.mongo}")
+        asyncio.run(workload(args, chain, owner, f"http://127.0.0.1:{port}", recorder))
+    finally:
+        stop_processes(processes)
+        worldid.shutdown()
+        chain.shutdown()
+    recorder.report()
+    print(f"\nWorld ID verifications: {worldid.calls}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,53 @@
+"""
+Transactions signed per second: inline eth-account signing (the old
+call_contract) versus TransactionSigner's batched process pool.
+
+    python -m app.scripts.bench_signer
+"""
+import asyncio
+import time
+
+from eth_account import Account
+
+from app.config import BACKEND_WALLET_PRIVATE_KEY
+from app.services.signer import TransactionSigner
+
+COUNT = 500
+
+
+def make_txns(count):
+    return [
+        {
+            "to": "0x39CB184af026c05B6BcB507aA8365B2dbb377dcD",
+            "value": 0,
+            "data": "0x" + f"{i:064x}",
+            "nonce": i,
+            "gas": 500000,
+            "gasPrice": 1_000_000_000,
+            "chainId": 4801,
+        }
+        for i in range(count)
+    ]
+
+
+async def main():
+    txns = make_txns(COUNT)
+
+    start = time.perf_counter()
+    inline = [bytes(Account.sign_transaction(t, BACKEND_WALLET_PRIVATE_KEY).raw_transaction) for t in txns]
+    elapsed = time.perf_counter() - start
+    print(f"{'inline':<24} {COUNT / elapsed:>8.0f} tx/s")
+
+    # warm up the pool so worker start-up is not measured
+    await TransactionSigner.sign(txns[0])
+    try:
+        start = time.perf_counter()
+        pooled = await asyncio.gather(*(TransactionSigner.sign(t) for t in txns))
+        elapsed = time.perf_counter() - start
+    finally:
+        TransactionSigner.close()
+    print(f"{'process pool (batched)':<24} {COUNT / elapsed:>8.0f} tx/s   identical {pooled == inline}")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
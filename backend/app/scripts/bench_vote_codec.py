@@ -0,0 +1,57 @@
+"""
+Compare the JSON and binary vote payloads sent to the TEE: bytes per vote and
+encode / decode time.
+
+    python -m app.scripts.bench_vote_codec
+"""
+import json
+import time
+
+import numpy as np
+
+from app.services.vote_codec import decode_votes, encode_votes
+
+SIZES = [10, 1_000, 100_000]
+
+
+def make_votes(size, rng):
+    predictions = rng.integers(0, 101, size)
+    return [
+        {
+            "user": "0x" + rng.bytes(20).hex(),
+            "vote": "yes" if rng.random() < 0.55 else "no",
+            "prediction_yes": float(p) / 100.0,
+            "prediction_no": (100 - float(p)) / 100.0,
+        }
+        for p in predictions
+    ]
+
+
+def timed(fn, repeat=3):
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main():
+    rng = np.random.default_rng(0)
+    print(f"{'votes':>8} {'format':>8} {'bytes/vote':>11} {'encode (s)':>12} {'decode (s)':>12}")
+    for size in SIZES:
+        votes = make_votes(size, rng)
+        formats = {
+            "pretty": (lambda: json.dumps({"votes": votes}, indent=2).encode(), lambda b: json.loads(b)),
+            "json": (lambda: json.dumps({"votes": votes}, separators=(",", ":")).encode(), lambda b: json.loads(b)),
+            "binary": (lambda: encode_votes(votes), decode_votes),
+        }
+        for name, (encode, decode) in formats.items():
+            body = encode()
+            t_encode = timed(encode)
+            t_decode = timed(lambda: decode(body))
+            print(f"{size:>8} {name:>8} {len(body) / size:>11.1f} {t_encode:>12.6f} {t_decode:>12.6f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,97 @@
+"""
+Deadline spike: N votes submitted at once, written with one insert_one per vote
+(the old /api/vote) versus the group-commit VoteIngestBuffer.
+
+    python -m app.scripts.bench_vote_ingest --votes 20000
+    python -m app.scripts.bench_vote_ingest --mongo mongodb://localhost:27017
+
+Without --mongo a simulated collection is used: every call costs one round trip
+(--rtt-ms) plus a small per-document cost, over a pool of --pool connections
+like Motor's default maxPoolSize.
+"""
+import argparse
+import asyncio
+import time
+import uuid
+
+from app.services.vote_ingest import IngestQueueFull, VoteIngestBuffer
+
+
+class SimulatedCollection:
+    def __init__(self, rtt_ms: float, per_doc_us: float, pool: int):
+        self.rtt = rtt_ms / 1000.0
+        self.per_doc = per_doc_us / 1_000_000.0
+        self.pool = asyncio.Semaphore(pool)
+        self.calls = 0
+
+    async def _write(self, count):
+        async with self.pool:
+            self.calls += 1
+            await asyncio.sleep(self.rtt + self.per_doc * count)
+
+    async def insert_one(self, doc):
+        await self._write(1)
+
+    async def insert_many(self, docs, ordered=True):
+        await self._write(len(docs))
+
+
+def make_vote(i):
+    return {"_id": str(uuid.uuid4()), "proposal_id": "bench", "vote": i % 2 == 0, "prediction": i % 101, "salt": "0x00"}
+
+
+async def spike(label, submit, votes):
+    latencies = []
+    shed = 0
+
+    async def one(i):
+        nonlocal shed
+        start = time.perf_counter()
+        try:
+            await submit(make_vote(i))
+        except IngestQueueFull:
+            shed += 1
+            return
+        latencies.append(time.perf_counter() - start)
+
+    start = time.perf_counter()
+    await asyncio.gather(*(one(i) for i in range(votes)))
+    elapsed = time.perf_counter() - start
+    latencies.sort()
+    p50 = latencies[len(latencies) // 2] * 1000 if latencies else 0
+    p99 = latencies[int(len(latencies) * 0.99)] * 1000 if latencies else 0
+    print(f"{label:<16} {len(latencies) / elapsed:>10.0f} votes/s  p50 {p50:>8.1f} ms  p99 {p99:>8.1f} ms  shed {shed}")
+
+
+async def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--votes", type=int, default=20000)
+    parser.add_argument("--batch", type=int, default=500)
+    parser.add_argument("--delay-ms", type=float, default=5)
+    parser.add_argument("--queue", type=int, default=100000)
+    parser.add_argument("--rtt-ms", type=float, default=1.0)
+    parser.add_argument("--per-doc-us", type=float, default=10.0)
+    parser.add_argument("--pool", type=int, default=100)
+    parser.add_argument("--mongo", help="MongoDB URI; benchmark against a real server")
+    args = parser.parse_args()
+
+    if args.mongo:
+        from motor.motor_asyncio import AsyncIOMotorClient
+        from app.services.vote_ingest import VOTE_WRITE_CONCERN
+        client = AsyncIOMotorClient(args.mongo)
+        collection = client["trustag_bench"]["votes"].with_options(write_concern=VOTE_WRITE_CONCERN)
+        await collection.drop()
+    else:
+        collection = SimulatedCollection(args.rtt_ms, args.per_doc_us, args.pool)
+
+    await spike("insert_one", collection.insert_one, args.votes)
+    buffer = VoteIngestBuffer(lambda: collection, args.batch, args.delay_ms, args.queue)
+    await spike("group commit", buffer.submit, args.votes)
+
+    if args.mongo:
+        await collection.drop()
+        client.close()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
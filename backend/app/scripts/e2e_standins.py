@@ -0,0 +1,281 @@
+"""
+Local stand-ins for the backend's external services, used by bench_e2e:
+
+  LocalChain     an in-memory EVM (eth-tester + py-evm) with the TrustTag
+                 contracts deployed, served over JSON-RPC HTTP so the backend's
+                 own HTTPProvider talks to it unchanged
+  start_tee      the real TEE FastAPI service (bts-op-tee/fastapi) in a
+                 subprocess, backed by the simulated OP-TEE guest (guest_sim.py)
+  WorldIdStub    a /api/v2/verify/<app_id> endpoint that accepts every proof
+                 after a configurable delay
+
+The chain needs `pip install "eth-tester[py-evm]"`.
+"""
+import json
+import os
+import socket
+import subprocess
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, List
+
+from eth_account import Account
+from web3 import EthereumTesterProvider, Web3
+
+BASE_DIR = os.path.dirname(__file__)
+REPO_DIR = os.path.abspath(os.path.join(BASE_DIR, os.pardir, os.pardir, os.pardir))
+CONTRACT_OUT_DIR = os.path.join(REPO_DIR, "blockchain", "TrustTag-contract", "out")
+TEE_SERVICE_DIR = os.path.join(REPO_DIR, "bts-op-tee", "fastapi")
+
+TOKEN = 10 ** 18  # TrustTagToken has 18 decimals
+
+
+def free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def load_artifact(name: str) -> Dict:
+    with open(os.path.join(CONTRACT_OUT_DIR, f"{name}.sol", f"{name}.json")) as f:
+        data = json.load(f)
+    return {"abi": data["abi"], "bytecode": data["bytecode"]["object"]}
+
+
+def _json_default(value: Any):
+    if isinstance(value, (bytes, bytearray)):
+        return "0x" + bytes(value).hex()
+    if hasattr(value, "items"):  # AttributeDict
+        return dict(value)
+    raise TypeError(f"Cannot encode {type(value).__name__} as JSON")
+
+
+class _RpcHandler(BaseHTTPRequestHandler):
+    def do_POST(self):
+        request = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+        if isinstance(request, list):
+            response = [self.server.chain.handle(r) for r in request]
+        else:
+            response = self.server.chain.handle(request)
+        body = json.dumps(response, default=_json_default).encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+class LocalChain:
+    """
+    eth-tester chain (auto-mining: one block per transaction) served over HTTP.
+
+    The tester backend is not thread safe, so every request, from the RPC
+    server threads or from the benchmark itself, goes through one lock.
+    """
+
+    def __init__(self):
+        self.provider = EthereumTesterProvider()
+        self.tester = self.provider.ethereum_tester
+        self.w3 = Web3(self.provider)
+        self._request = self.provider.request_func(self.w3, self.w3.middleware_onion)
+        self._lock = threading.Lock()
+        self._server: ThreadingHTTPServer | None = None
+        self.contracts: Dict[str, Any] = {}
+
+    # ---- JSON-RPC server ----
+
+    def handle(self, request: Dict) -> Dict:
+        params = request.get("params", [])
+        if request["method"] == "eth_getStorageAt" and len(params) == 3 and str(params[2]).startswith("0x"):
+            # eth-tester takes only an integer block number here, unlike a node
+            params = [*params[:2], int(params[2], 16)]
+        with self._lock:
+            try:
+                response = self._request(request["method"], params)
+            except Exception as e:
+                response = {"error": {"code": -32000, "message": str(e)}}
+        response["id"] = request.get("id")
+        response["jsonrpc"] = "2.0"
+        return response
+
+    def serve(self, host: str = "127.0.0.1", port: int = 0) -> str:
+        self._server = ThreadingHTTPServer((host, port), _RpcHandler)
+        self._server.daemon_threads = True
+        self._server.chain = self
+        threading.Thread(target=self._server.serve_forever, daemon=True).start()
+        return f"http://{host}:{self._server.server_address[1]}"
+
+    def shutdown(self):
+        if self._server is not None:
+            self._server.shutdown()
+            self._server.server_close()
+            self._server = None
+
+    # ---- accounts, deployment and clock ----
+
+    def add_account(self, private_key: str, eth: int = 1000) -> str:
+        """
+        Unlock a key in the tester (so the benchmark can transact from it without
+        signing) and fund it with eth ether from the tester's coinbase account.
+        """
+        with self._lock:
+            address = self.tester.add_account(private_key)
+            self.w3.eth.send_transaction({
+                "from": self.w3.eth.accounts[0], "to": address, "value": eth * 10 ** 18,
+            })
+        return Web3.to_checksum_address(address)
+
+    def transact(self, sender: str, fn) -> Dict:
+        with self._lock:
+            tx_hash = fn.transact({"from": sender, "gas": 5_000_000})
+            receipt = self.w3.eth.wait_for_transaction_receipt(tx_hash)
+        if receipt.status != 1:
+            raise RuntimeError(f"Setup transaction failed: {receipt}")
+        return receipt
+
+    def deploy(self, name: str, owner: str, *args):
+        artifact = load_artifact(name)
+        factory = self.w3.eth.contract(abi=artifact["abi"], bytecode=artifact["bytecode"])
+        receipt = self.transact(owner, factory.constructor(*args))
+        contract = self.w3.eth.contract(address=receipt.contractAddress, abi=artifact["abi"])
+        self.contracts[name] = contract
+        return contract
+
+    def deploy_trusttag(self, owner: str) -> Dict[str, str]:
+        """
+        Deploy token, storage and voting as script/Deploy.s.sol does; owner is the
+        backend wallet, which owns the voting contract and the token supply.
+        """
+        token = self.deploy("TrustTagToken", owner, owner)
+        storage = self.deploy("TrustTagStorage", owner, owner, token.address)
+        voting = self.deploy("TrustTagVoting", owner, token.address, storage.address, owner)
+        self.transact(owner, storage.functions.grantUpdater(voting.address))
+        return {"token": token.address, "storage": storage.address, "voting": voting.address}
+
+    def stake(self, owner: str, account: str, amount: int):
+        """
+        Give account `amount` tokens from the owner's supply and stake them all in
+        the voting contract.
+        """
+        token = self.contracts["TrustTagToken"]
+        voting = self.contracts["TrustTagVoting"]
+        self.transact(owner, token.functions.transfer(account, amount))
+        self.transact(account, token.functions.approve(voting.address, amount))
+        self.transact(account, voting.functions.stake(amount))
+
+    def now(self) -> int:
+        with self._lock:
+            return self.w3.eth.get_block("latest")["timestamp"]
+
+    def time_travel(self, timestamp: int):
+        """
+        Move the chain clock forward to timestamp (mines a block).
+        """
+        with self._lock:
+            if timestamp > self.w3.eth.get_block("latest")["timestamp"]:
+                self.tester.time_travel(timestamp)
+
+
+def new_accounts(count: int) -> List:
+    return [Account.create() for _ in range(count)]
+
+
+# ---- TEE service ----
+
+def wait_for_port(port: int, proc: subprocess.Popen, timeout: float = 30.0):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if proc.poll() is not None:
+            raise RuntimeError(f"Process exited with {proc.returncode} before listening on {port}")
+        try:
+            with socket.create_connection(("127.0.0.1", port), timeout=0.5):
+                return
+        except OSError:
+            time.sleep(0.1)
+    raise RuntimeError(f"Nothing listening on {port} after {timeout}s")
+
+
+def start_tee() -> tuple[str, List[subprocess.Popen]]:
+    """
+    Start the simulated guest and the TEE service, each in its own process.
+    Returns the service URL and the processes to terminate afterwards.
+    """
+    guest_port = free_port()
+    guest = subprocess.Popen(
+        [sys.executable, "guest_sim.py", "--port", str(guest_port)],
+        cwd=TEE_SERVICE_DIR, stdout=subprocess.DEVNULL,
+    )
+    wait_for_port(guest_port, guest)
+
+    tee_port = free_port()
+    env = dict(os.environ, GUEST_HOST="127.0.0.1", GUEST_PORT=str(guest_port))
+    tee = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "main:app", "--host", "127.0.0.1", "--port", str(tee_port),
+         "--log-level", "warning"],
+        cwd=TEE_SERVICE_DIR, env=env,
+    )
+    try:
+        wait_for_port(tee_port, tee)
+    except Exception:
+        guest.terminate()
+        raise
+    return f"http://127.0.0.1:{tee_port}", [tee, guest]
+
+
+def stop_processes(processes: List[subprocess.Popen]):
+    for proc in processes:
+        proc.terminate()
+    for proc in processes:
+        try:
+            proc.wait(timeout=10)
+        except subprocess.TimeoutExpired:
+            proc.kill()
+
+
+# ---- World ID ----
+
+class _WorldIdHandler(BaseHTTPRequestHandler):
+    def do_POST(self):
+        self.rfile.read(int(self.headers.get("Content-Length", 0)))
+        self.server.calls += 1
+        time.sleep(self.server.latency)
+        body = json.dumps({"success": True, "action": "bench", "nullifier_hash": "0x0"}).encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+class WorldIdStub:
+    """
+    Accepts every proof after latency_ms, like a healthy Developer API.
+    """
+
+    def __init__(self, latency_ms: float = 0.0):
+        self._server = ThreadingHTTPServer(("127.0.0.1", 0), _WorldIdHandler)
+        self._server.daemon_threads = True
+        self._server.latency = latency_ms / 1000.0
+        self._server.calls = 0
+        threading.Thread(target=self._server.serve_forever, daemon=True).start()
+
+    @property
+    def url(self) -> str:
+        return f"http://127.0.0.1:{self._server.server_address[1]}"
+
+    @property
+    def calls(self) -> int:
+        return self._server.calls
+
+    def shutdown(self):
+        self._server.shutdown()
+        self._server.server_close()
+
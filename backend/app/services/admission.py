@@ -0,0 +1,262 @@
+import json
+import time
+import uuid
+from collections import OrderedDict
+from typing import Any, Dict, List, Tuple
+
+from eth_account import Account
+from eth_utils import keccak
+from fastapi import HTTPException, Request
+
+from app.config import (
+    ADMISSION_BACKEND,
+    ADMISSION_BURST,
+    ADMISSION_CHAIN_CONCURRENCY,
+    ADMISSION_CHAIN_SLOT_TTL,
+    ADMISSION_IP_BURST,
+    ADMISSION_IP_RATE,
+    ADMISSION_MAX_KEYS,
+    ADMISSION_RATE,
+    ADMISSION_REDIS_URL,
+    ADMISSION_SEEN_TX_TTL,
+    ADMISSION_TRUST_FORWARDED,
+)
+from app.metrics import ADMISSION_REJECTIONS
+from app.utils import get_logger
+
+logger = get_logger(__name__)
+
+
+class MemoryAdmissionBackend:
+    """
+    Per-process buckets and chain slots: with several workers, each enforces
+    the limits on its own share of the traffic.
+    """
+
+    def __init__(self, max_keys: int = ADMISSION_MAX_KEYS):
+        self.max_keys = max_keys
+        self._buckets: "OrderedDict[str, Tuple[float, float]]" = OrderedDict()
+        self._slots: Dict[str, set] = {}
+        self._seen: "OrderedDict[str, float]" = OrderedDict()
+
+    async def take(self, key: str, rate: float, burst: float) -> float:
+        """
+        Take a token from key's bucket. Returns 0 if one was available, else the
+        seconds until there is one.
+        """
+        now = time.monotonic()
+        tokens, updated = self._buckets.pop(key, (burst, now))
+        tokens = min(burst, tokens + (now - updated) * rate)
+        wait = 0.0
+        if tokens >= 1:
+            tokens -= 1
+        else:
+            wait = (1 - tokens) / rate
+        self._buckets[key] = (tokens, now)
+        # the least recently used bucket has refilled the longest; dropping it
+        # only forgets a (nearly) full bucket
+        while len(self._buckets) > self.max_keys:
+            self._buckets.popitem(last=False)
+        return wait
+
+    async def first_seen(self, key: str, ttl: float) -> bool:
+        """
+        Whether key wasn't seen in the last ttl seconds; remembers it either way.
+        """
+        now = time.monotonic()
+        expires = self._seen.pop(key, None)
+        self._seen[key] = now + ttl
+        while len(self._seen) > self.max_keys:
+            self._seen.popitem(last=False)
+        return expires is None or expires <= now
+
+    async def acquire_slot(self, name: str, limit: int, ttl: float) -> str | None:
+        slots = self._slots.setdefault(name, set())
+        if len(slots) >= limit:
+            return None
+        slot = uuid.uuid4().hex
+        slots.add(slot)
+        return slot
+
+    async def release_slot(self, name: str, slot: str):
+        self._slots.get(name, set()).discard(slot)
+
+
+# Token bucket in a hash {tokens, ts}, on the Redis clock so workers agree.
+# Returns the wait as a string: Lua numbers come back as truncated integers.
+TAKE_SCRIPT = """
+local rate = tonumber(ARGV[1])
+local burst = tonumber(ARGV[2])
+local t = redis.call('TIME')
+local now = tonumber(t[1]) + tonumber(t[2]) / 1000000
+local state = redis.call('HMGET', KEYS[1], 'tokens', 'ts')
+local tokens = tonumber(state[1]) or burst
+local ts = tonumber(state[2]) or now
+tokens = math.min(burst, tokens + (now - ts) * rate)
+local wait = 0
+if tokens >= 1 then
+    tokens = tokens - 1
+else
+    wait = (1 - tokens) / rate
+end
+redis.call('HSET', KEYS[1], 'tokens', tostring(tokens), 'ts', tostring(now))
+redis.call('PEXPIRE', KEYS[1], math.ceil(burst / rate * 1000) + 1000)
+return tostring(wait)
+"""
+
+# Slots are sorted-set members scored by expiry, so those of a crashed worker
+# free themselves after the slot TTL.
+ACQUIRE_SLOT_SCRIPT = """
+local t = redis.call('TIME')
+local now = tonumber(t[1]) + tonumber(t[2]) / 1000000
+redis.call('ZREMRANGEBYSCORE', KEYS[1], '-inf', now)
+if redis.call('ZCARD', KEYS[1]) >= tonumber(ARGV[1]) then
+    return 0
+end
+redis.call('ZADD', KEYS[1], now + tonumber(ARGV[2]), ARGV[3])
+redis.call('PEXPIRE', KEYS[1], math.ceil(tonumber(ARGV[2]) * 1000))
+return 1
+"""
+
+
+class RedisAdmissionBackend:
+    """
+    Buckets and chain slots shared by all backend processes.
+    """
+
+    def __init__(self, url: str = ADMISSION_REDIS_URL):
+        try:
+            import redis.asyncio as redis
+        except ImportError:
+            raise RuntimeError("ADMISSION_BACKEND=redis requires the 'redis' package")
+        self._redis = redis.from_url(url)
+        self._take = self._redis.register_script(TAKE_SCRIPT)
+        self._acquire = self._redis.register_script(ACQUIRE_SLOT_SCRIPT)
+
+    async def take(self, key: str, rate: float, burst: float) -> float:
+        return float(await self._take(keys=[f"admission:{key}"], args=[rate, burst]))
+
+    async def first_seen(self, key: str, ttl: float) -> bool:
+        return bool(await self._redis.set(f"admission-seen:{key}", 1, nx=True, px=int(ttl * 1000)))
+
+    async def acquire_slot(self, name: str, limit: int, ttl: float) -> str | None:
+        slot = uuid.uuid4().hex
+        acquired = await self._acquire(keys=[f"admission-slots:{name}"], args=[limit, ttl, slot])
+        return slot if acquired else None
+
+    async def release_slot(self, name: str, slot: str):
+        await self._redis.zrem(f"admission-slots:{name}", slot)
+
+
+class AdmissionControl:
+    """
+    Admission control for the write endpoints, checked before a request does
+    any work.
+
+    Each request takes a token from the bucket of its client IP and, when it
+    carries one, of its World ID nullifier and of the wallet that signed its
+    signed_txn. Only a nullifier WorldIDMiddleware verified counts (anyone can
+    send someone else's), and a signed_txn only charges its wallet the first
+    time it is seen (signed transactions are public once sent, and replaying
+    one must not drain its signer's bucket). An empty bucket answers 429 with
+    Retry-After. Requests carrying
+    a signed_txn also need one of ADMISSION_CHAIN_CONCURRENCY slots for their
+    whole duration (they wait up to 120 s for a receipt); with none free they
+    get a 503. If the backend fails, requests are admitted.
+    """
+
+    def __init__(self, backend=None):
+        self._backend = backend
+
+    @property
+    def backend(self):
+        if self._backend is None:
+            self._backend = RedisAdmissionBackend() if ADMISSION_BACKEND == "redis" else MemoryAdmissionBackend()
+        return self._backend
+
+    @staticmethod
+    def client_ip(request: Request) -> str:
+        if ADMISSION_TRUST_FORWARDED:
+            forwarded = request.headers.get("x-forwarded-for")
+            if forwarded:
+                return forwarded.split(",")[0].strip()
+        return request.client.host if request.client else "unknown"
+
+    async def buckets(self, request: Request, body: Dict[str, Any]) -> List[Tuple[str, str, float, float]]:
+        """
+        (kind, bucket key, rate, burst) of each identity the request is charged to.
+        """
+        buckets = [("ip", f"ip:{self.client_ip(request)}", ADMISSION_IP_RATE, ADMISSION_IP_BURST)]
+        nullifier = getattr(request.state, "verified_nullifier", None)
+        if nullifier:
+            buckets.append(("nullifier", f"nullifier:{nullifier}", ADMISSION_RATE, ADMISSION_BURST))
+        signed_txn = body.get("signed_txn")
+        if signed_txn:
+            try:
+                wallet = Account.recover_transaction(signed_txn)
+                tx_hash = keccak(hexstr=signed_txn).hex()
+            except Exception:
+                return buckets  # not a transaction: the route rejects it
+            if await self.backend.first_seen(f"tx:{tx_hash}", ADMISSION_SEEN_TX_TTL):
+                buckets.append(("wallet", f"wallet:{wallet.lower()}", ADMISSION_RATE, ADMISSION_BURST))
+        return buckets
+
+    async def check(self, route: str, request: Request, body: Dict[str, Any]):
+        wait, limited_by = 0.0, None
+        try:
+            for kind, key, rate, burst in await self.buckets(request, body):
+                kind_wait = await self.backend.take(f"{route}:{key}", rate, burst)
+                if kind_wait > wait:
+                    wait, limited_by = kind_wait, kind
+        except Exception as e:
+            logger.error(f"Admission backend failed, admitting request: {e}")
+            return
+        if limited_by is not None:
+            ADMISSION_REJECTIONS.inc(route=route, reason=limited_by)
+            raise HTTPException(429, f"Too many requests for this {limited_by}",
+                                headers={"Retry-After": str(max(1, round(wait + 0.5)))})
+
+    async def acquire_chain_slot(self, route: str) -> str | None:
+        try:
+            slot = await self.backend.acquire_slot("chain", ADMISSION_CHAIN_CONCURRENCY, ADMISSION_CHAIN_SLOT_TTL)
+        except Exception as e:
+            logger.error(f"Admission backend failed, admitting request: {e}")
+            return None
+        if slot is None:
+            ADMISSION_REJECTIONS.inc(route=route, reason="chain_concurrency")
+            raise HTTPException(503, "Too many transactions in flight, retry shortly",
+                                headers={"Retry-After": "1"})
+        return slot
+
+    async def release_chain_slot(self, slot: str | None):
+        if slot is None:
+            return
+        try:
+            await self.backend.release_slot("chain", slot)
+        except Exception as e:
+            logger.error(f"Failed to release chain slot {slot}: {e}")
+
+
+admission = AdmissionControl()
+
+
+def admit(route: str):
+    """
+    FastAPI dependency applying admission control to a JSON write endpoint.
+    """
+    async def dependency(request: Request):
+        try:
+            body = json.loads(await request.body() or b"{}")
+        except ValueError:
+            body = {}
+        if not isinstance(body, dict):
+            body = {}
+
+        await admission.check(route, request, body)
+        slot = await admission.acquire_chain_slot(route) if body.get("signed_txn") else None
+        try:
+            yield
+        finally:
+            await admission.release_chain_slot(slot)
+
+    return dependency
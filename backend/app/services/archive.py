@@ -0,0 +1,153 @@
+import zlib
+from typing import Dict, List
+
+import bson
+from bson.binary import Binary
+from pymongo import ReplaceOne
+
+from app.config import ARCHIVE_COMPRESS, BTS_SHARD_SIZE
+from app.db.mongodb import get_database
+from app.utils import get_logger
+
+logger = get_logger(__name__)
+
+# Fields kept outside the compressed blob so archived documents stay queryable
+# (read-through lookups and the time-range filters of /api/export).
+ARCHIVE_KEYS = {
+    "proposals": ("phase", "created_at"),
+    "votes": ("proposal_id", "address", "created_at"),
+    "rewards": ("proposal_id", "address", "claimed_at"),
+}
+
+# Hot collection fields the archive queries filter on
+HOT_KEYS = {
+    "rewards": ("claimed_at",),
+}
+
+
+def archive_name(collection: str) -> str:
+    return f"{collection}_archive"
+
+
+def pack(collection: str, doc: Dict, compress: bool = ARCHIVE_COMPRESS) -> Dict:
+    """
+    Archive form of a document: as-is, or its query keys plus a zlib-compressed BSON blob.
+    """
+    if not compress:
+        return doc
+    packed = {"_id": doc["_id"], "z": Binary(zlib.compress(bson.encode(doc)))}
+    for key in ARCHIVE_KEYS[collection]:
+        if key in doc:
+            packed[key] = doc[key]
+    return packed
+
+
+def unpack(doc: Dict) -> Dict:
+    if "z" not in doc:
+        return doc
+    return bson.decode(zlib.decompress(doc["z"]))
+
+
+class ArchiveStore:
+    """
+    Cold tier for finished proposals.
+
+    Finished proposals, their votes and their claimed rewards move from the hot
+    collections to `<name>_archive`, so the hot working sets only hold live
+    proposals and unclaimed rewards; rewards claimed after their proposal was
+    archived follow with sweep_claimed_rewards. find_rewards reads through
+    both tiers for /api/rewards.
+    """
+
+    @staticmethod
+    async def ensure_indexes():
+        db = get_database()
+        for collection, keys in ARCHIVE_KEYS.items():
+            for key in keys:
+                await db[archive_name(collection)].create_index(key)
+        for collection, keys in HOT_KEYS.items():
+            for key in keys:
+                await db[collection].create_index(key)
+
+    @staticmethod
+    async def archive_proposal(proposal: Dict) -> Dict[str, int]:
+        """
+        Move one finished proposal with its votes and claimed rewards to the archive.
+
+        Documents are upserted into the archive before being deleted from the hot
+        collection, and the proposal itself goes last, so an interrupted run is
+        simply repeated by the next one.
+        """
+        db = get_database()
+        proposal_id = proposal["_id"]
+        moved = {
+            "votes": await ArchiveStore._move(
+                "votes", db["votes"].find({"proposal_id": proposal_id}).batch_size(BTS_SHARD_SIZE)
+            ),
+            "rewards": await ArchiveStore._move(
+                "rewards", db["rewards"].find({"proposal_id": proposal_id, "claimed_at": {"$ne": None}})
+            ),
+        }
+        await ArchiveStore._write_archive("proposals", [proposal])
+        await db["proposals"].delete_one({"_id": proposal_id})
+        moved["proposals"] = 1
+        return moved
+
+    @staticmethod
+    async def sweep_claimed_rewards() -> int:
+        """
+        Move the claimed rewards whose proposal is already archived, i.e. those
+        claimed after archive_proposal ran. Returns how many were moved.
+        """
+        db = get_database()
+        claimed = {"claimed_at": {"$ne": None}}
+        proposal_ids = await db["rewards"].distinct("proposal_id", claimed)
+        if not proposal_ids:
+            return 0
+        # the proposal is archived last, so its other documents have been moved
+        archived = await db[archive_name("proposals")].distinct("_id", {"_id": {"$in": proposal_ids}})
+        if not archived:
+            return 0
+        return await ArchiveStore._move(
+            "rewards", db["rewards"].find({"proposal_id": {"$in": archived}, **claimed})
+        )
+
+    @staticmethod
+    async def _move(collection: str, cursor) -> int:
+        moved = 0
+        batch: List[Dict] = []
+        async for doc in cursor:
+            batch.append(doc)
+            if len(batch) >= 1000:
+                moved += await ArchiveStore._move_batch(collection, batch)
+                batch = []
+        if batch:
+            moved += await ArchiveStore._move_batch(collection, batch)
+        return moved
+
+    @staticmethod
+    async def _move_batch(collection: str, docs: List[Dict]) -> int:
+        await ArchiveStore._write_archive(collection, docs)
+        db = get_database()
+        await db[collection].delete_many({"_id": {"$in": [d["_id"] for d in docs]}})
+        return len(docs)
+
+    @staticmethod
+    async def _write_archive(collection: str, docs: List[Dict]):
+        db = get_database()
+        await db[archive_name(collection)].bulk_write(
+            [ReplaceOne({"_id": d["_id"]}, pack(collection, d), upsert=True) for d in docs],
+            ordered=False,
+        )
+
+    @staticmethod
+    async def find_rewards(address: str, limit: int = 100) -> List[Dict]:
+        """
+        An address's rewards, unclaimed (hot) first, then archived history.
+        """
+        db = get_database()
+        rewards = await db["rewards"].find({"address": address}).to_list(length=limit)
+        if len(rewards) < limit:
+            archived = await db[archive_name("rewards")].find({"address": address}).to_list(length=limit - len(rewards))
+            rewards += [unpack(d) for d in archived]
+        return rewards
@@ -0,0 +1,171 @@
+import numpy as np
+from dataclasses import dataclass
+from typing import Dict, Iterable, List, Sequence
+
+# Predictions and frequencies are clamped to EPSILON before taking logs,
+# matching the original per-vote implementation in TeeClient.
+EPSILON = 1e-6
+
+# Scores are rounded to micro-units before being turned into token amounts so
+# that the same votes always produce the same integers regardless of platform.
+SCORE_SCALE = 10**6
+
+# rewardList is denominated in token wei (18 decimals): 1.0 score == 1 token.
+# Amounts can exceed int64, so the rewards collection stores them as strings.
+REWARD_UNIT = 10**18 // SCORE_SCALE
+
+
+def vote_arrays(votes: Sequence[Dict]):
+    """
+    Return (vote, prediction) numpy arrays for a list of vote documents.
+    """
+    n = len(votes)
+    vote_arr = np.fromiter((v.get("vote") is True for v in votes), dtype=bool, count=n)
+    prediction_arr = np.fromiter((v.get("prediction", 50) for v in votes), dtype=np.float64, count=n)
+    return vote_arr, prediction_arr
+
+
+def prediction_logs(predictions: np.ndarray):
+    """
+    Return (p_yes, p_no, log p_yes, log p_no) for predictions given in percent (0~100).
+    """
+    pred_fraction = np.asarray(predictions, dtype=np.float64) / 100.0
+    p_yes = np.maximum(pred_fraction, EPSILON)
+    p_no = np.maximum(1.0 - pred_fraction, EPSILON)
+    return p_yes, p_no, np.log(p_yes), np.log(p_no)
+
+
+def bts_scores(
+    votes: np.ndarray,
+    predictions: np.ndarray,
+    segment_ids: np.ndarray | None = None,
+    num_segments: int | None = None,
+) -> np.ndarray:
+    """
+    Vectorized Bayesian Truth Serum scores.
+
+    Args:
+        votes: bool array, True for a YES vote
+        predictions: predicted YES percentage (0~100) of each voter
+        segment_ids: optional int array assigning every vote to a proposal (0..k-1)
+        num_segments: number of proposals when segment_ids is given
+
+    Returns:
+        float64 array with one score per vote, in input order
+    """
+    votes = np.asarray(votes, dtype=bool)
+    n_votes = votes.shape[0]
+    if segment_ids is None:
+        segment_ids = np.zeros(n_votes, dtype=np.intp)
+        num_segments = 1
+    else:
+        segment_ids = np.asarray(segment_ids, dtype=np.intp)
+        if num_segments is None:
+            num_segments = int(segment_ids.max()) + 1 if n_votes else 0
+
+    if n_votes == 0:
+        return np.zeros(0, dtype=np.float64)
+
+    p_yes, p_no, log_p_yes, log_p_no = prediction_logs(predictions)
+
+    # Per-proposal population aggregates
+    n = np.bincount(segment_ids, minlength=num_segments).astype(np.float64)
+    count_yes = np.bincount(segment_ids, weights=votes, minlength=num_segments)
+    sum_log_yes = np.bincount(segment_ids, weights=log_p_yes, minlength=num_segments)
+    sum_log_no = np.bincount(segment_ids, weights=log_p_no, minlength=num_segments)
+
+    return _score_against(votes, p_yes, p_no, segment_ids, n, count_yes, sum_log_yes, sum_log_no)
+
+
+def _score_against(votes, p_yes, p_no, segment_ids, n, count_yes, sum_log_yes, sum_log_no) -> np.ndarray:
+    """
+    Score votes against per-segment population aggregates (arrays indexed by segment id).
+    """
+    safe_n = np.maximum(n, 1.0)
+    log_f_yes = np.log(np.maximum(count_yes / safe_n, EPSILON))
+    log_f_no = np.log(np.maximum((n - count_yes) / safe_n, EPSILON))
+    # log of the geometric mean of the predictions
+    log_pbar_yes = sum_log_yes / safe_n
+    log_pbar_no = sum_log_no / safe_n
+
+    # Information score: log(f / pbar) of the option the voter picked
+    info_yes = (log_f_yes - log_pbar_yes)[segment_ids]
+    info_no = (log_f_no - log_pbar_no)[segment_ids]
+    term_a = np.where(votes, info_yes, info_no)
+
+    # Prediction score: p_yes * log(pbar_yes / f_yes) + p_no * log(pbar_no / f_no)
+    term_b = -(p_yes * info_yes + p_no * info_no)
+
+    return term_a + term_b
+
+
+@dataclass
+class BtsAggregate:
+    """
+    Decomposable population statistics of one proposal.
+
+    Partial aggregates computed over disjoint chunks of votes can be merged, so a
+    proposal with any number of voters can be scored chunk by chunk.
+    """
+    n: int = 0
+    yes_count: int = 0
+    sum_log_yes: float = 0.0
+    sum_log_no: float = 0.0
+
+    @classmethod
+    def from_chunk(cls, votes: np.ndarray, predictions: np.ndarray) -> "BtsAggregate":
+        votes = np.asarray(votes, dtype=bool)
+        _, _, log_p_yes, log_p_no = prediction_logs(predictions)
+        return cls(
+            n=int(votes.shape[0]),
+            yes_count=int(np.count_nonzero(votes)),
+            sum_log_yes=float(log_p_yes.sum()),
+            sum_log_no=float(log_p_no.sum()),
+        )
+
+    def merge(self, other: "BtsAggregate") -> "BtsAggregate":
+        return BtsAggregate(
+            n=self.n + other.n,
+            yes_count=self.yes_count + other.yes_count,
+            sum_log_yes=self.sum_log_yes + other.sum_log_yes,
+            sum_log_no=self.sum_log_no + other.sum_log_no,
+        )
+
+    def score_chunk(self, votes: np.ndarray, predictions: np.ndarray) -> np.ndarray:
+        """
+        Score a chunk of votes against this (complete) population aggregate.
+        """
+        votes = np.asarray(votes, dtype=bool)
+        if votes.shape[0] == 0:
+            return np.zeros(0, dtype=np.float64)
+        p_yes, p_no, _, _ = prediction_logs(predictions)
+        segment_ids = np.zeros(votes.shape[0], dtype=np.intp)
+        return _score_against(
+            votes, p_yes, p_no, segment_ids,
+            np.array([self.n], dtype=np.float64),
+            np.array([self.yes_count], dtype=np.float64),
+            np.array([self.sum_log_yes]),
+            np.array([self.sum_log_no]),
+        )
+
+
+def fixed_point_scores(scores: np.ndarray) -> np.ndarray:
+    """
+    Round float scores to signed int64 micro-units (SCORE_SCALE).
+    """
+    return np.rint(np.asarray(scores, dtype=np.float64) * SCORE_SCALE).astype(np.int64)
+
+
+def reward_amounts(fixed_scores: Iterable[int]) -> List[int]:
+    """
+    Convert fixed-point scores to uint256 reward amounts for finalize's rewardList.
+    Negative scores earn nothing.
+    """
+    return [max(int(s), 0) * REWARD_UNIT for s in fixed_scores]
+
+
+def segment_ids_for(counts: Sequence[int]) -> np.ndarray:
+    """
+    Build segment ids for consecutive groups of the given sizes, e.g. [2, 3] -> [0, 0, 1, 1, 1].
+    """
+    return np.repeat(np.arange(len(counts), dtype=np.intp), counts)
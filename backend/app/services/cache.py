@@ -0,0 +1,182 @@
+import asyncio
+import base64
+import hashlib
+import json
+import time
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict
+
+from fastapi import Request, Response
+from fastapi.encoders import jsonable_encoder
+
+from app.config import CACHE_BACKEND, CACHE_MAX_ENTRIES, CACHE_REDIS_URL, CACHE_TTL
+from app.metrics import CACHE_REQUESTS
+from app.utils import get_logger
+
+logger = get_logger(__name__)
+
+
+class MemoryBackend:
+    """
+    In-process LRU with per-entry TTL. Invalidation is per process, so with
+    several workers a stale entry lives at most CACHE_TTL on the others.
+    """
+
+    def __init__(self, max_entries: int = CACHE_MAX_ENTRIES):
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[str, tuple[float, Any]]" = OrderedDict()
+        self._versions: Dict[str, int] = {}
+
+    async def get(self, key: str) -> Any:
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        expires_at, value = entry
+        if expires_at < time.monotonic():
+            del self._entries[key]
+            return None
+        self._entries.move_to_end(key)
+        return value
+
+    async def set(self, key: str, value: Any, ttl: float):
+        self._entries[key] = (time.monotonic() + ttl, value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    async def version(self, namespace: str) -> int:
+        return self._versions.get(namespace, 0)
+
+    async def bump(self, namespace: str):
+        self._versions[namespace] = self._versions.get(namespace, 0) + 1
+
+
+def dumps(value: Any) -> bytes:
+    """
+    Serialize a cached value for Redis: JSON, with bytes (response bodies) as
+    {"$b64": ...}. Unlike pickle, loading it can't run code.
+    """
+    def encode_bytes(obj):
+        if isinstance(obj, bytes):
+            return {"$b64": base64.b64encode(obj).decode()}
+        raise TypeError(f"Cannot cache a {type(obj).__name__} in Redis")
+
+    return json.dumps(value, default=encode_bytes, separators=(",", ":")).encode()
+
+
+def loads(raw: bytes) -> Any:
+    def decode_bytes(obj):
+        if len(obj) == 1 and "$b64" in obj:
+            return base64.b64decode(obj["$b64"])
+        return obj
+
+    return json.loads(raw, object_hook=decode_bytes)
+
+
+class RedisBackend:
+    """
+    Shared backend for several backend processes. Namespace versions live in
+    Redis, so an invalidation in one process is seen by all of them. Values
+    are stored with dumps(), so they must be JSON-serializable apart from bytes.
+    """
+
+    def __init__(self, url: str = CACHE_REDIS_URL):
+        try:
+            import redis.asyncio as redis
+        except ImportError:
+            raise RuntimeError("CACHE_BACKEND=redis requires the 'redis' package")
+        self._redis = redis.from_url(url)
+
+    async def get(self, key: str) -> Any:
+        raw = await self._redis.get(f"cache:{key}")
+        return loads(raw) if raw is not None else None
+
+    async def set(self, key: str, value: Any, ttl: float):
+        await self._redis.set(f"cache:{key}", dumps(value), px=int(ttl * 1000))
+
+    async def version(self, namespace: str) -> int:
+        return int(await self._redis.get(f"cache-version:{namespace}") or 0)
+
+    async def bump(self, namespace: str):
+        await self._redis.incr(f"cache-version:{namespace}")
+
+
+class Cache:
+    """
+    Read-through cache for hot read endpoints.
+
+    Entries are grouped in namespaces ("proposals", "rewards", ...). Writers call
+    invalidate(namespace), which bumps the namespace version and so orphans every
+    entry in it at once. Concurrent misses on the same key share one load.
+    """
+
+    def __init__(self, backend=None, ttl: float = CACHE_TTL):
+        self._backend = backend
+        self.ttl = ttl
+        self._loading: Dict[str, asyncio.Future] = {}
+
+    @property
+    def backend(self):
+        if self._backend is None:
+            self._backend = RedisBackend() if CACHE_BACKEND == "redis" else MemoryBackend()
+        return self._backend
+
+    async def get_or_load(self, namespace: str, key: str, loader: Callable[[], Awaitable[Any]],
+                          ttl: float | None = None) -> Any:
+        version = await self.backend.version(namespace)
+        full_key = f"{namespace}:{version}:{key}"
+
+        value = await self.backend.get(full_key)
+        if value is not None:
+            CACHE_REQUESTS.inc(namespace=namespace, result="hit")
+            return value
+
+        loading = self._loading.get(full_key)
+        if loading is not None:
+            CACHE_REQUESTS.inc(namespace=namespace, result="coalesced")
+            return await asyncio.shield(loading)
+
+        CACHE_REQUESTS.inc(namespace=namespace, result="miss")
+        future = asyncio.get_running_loop().create_future()
+        self._loading[full_key] = future
+        try:
+            value = await loader()
+            await self.backend.set(full_key, value, self.ttl if ttl is None else ttl)
+            future.set_result(value)
+            return value
+        except BaseException as e:
+            future.set_exception(e)
+            # nobody else may be waiting; don't warn about an unretrieved exception
+            future.exception()
+            raise
+        finally:
+            del self._loading[full_key]
+
+    async def invalidate(self, *namespaces: str):
+        for namespace in namespaces:
+            try:
+                await self.backend.bump(namespace)
+            except Exception as e:
+                logger.error(f"Failed to invalidate cache namespace '{namespace}': {e}")
+
+    async def json_response(self, request: Request, namespace: str, key: str,
+                            loader: Callable[[], Awaitable[Any]]) -> Response:
+        """
+        Serve loader()'s result as JSON from the cache, with an ETag. A GET whose
+        If-None-Match carries the current ETag gets an empty 304.
+        """
+        async def load_body():
+            body = json.dumps(jsonable_encoder(await loader()), separators=(",", ":")).encode()
+            return {"body": body, "etag": f'"{hashlib.sha256(body).hexdigest()[:32]}"'}
+
+        entry = await self.get_or_load(namespace, key, load_body)
+        headers = {"ETag": entry["etag"], "Cache-Control": "no-cache"}
+
+        if request.method in ("GET", "HEAD"):
+            if_none_match = request.headers.get("if-none-match", "")
+            if entry["etag"] in (tag.strip() for tag in if_none_match.split(",")) or if_none_match.strip() == "*":
+                return Response(status_code=304, headers=headers)
+        return Response(entry["body"], media_type="application/json", headers=headers)
+
+
+cache = Cache()
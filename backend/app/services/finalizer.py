@@ -0,0 +1,43 @@
+from typing import List
+
+from app.config import FINALIZE_BASE_GAS, FINALIZE_GAS_PER_VOTER, FINALIZE_MAX_GAS
+from app.services.smart_contract_client import HARDCODED_GAS, VoteContract
+from app.utils import get_logger
+
+logger = get_logger(__name__)
+
+# TrustTagVoting.MIN_VOTE_COUNT: below it finalize() refunds stakes and decides no label
+MIN_VOTE_COUNT = 3
+
+
+def finalize_gas(voters: int) -> int:
+    return FINALIZE_BASE_GAS + voters * FINALIZE_GAS_PER_VOTER
+
+
+class ProposalTooLarge(Exception):
+    pass
+
+
+class Finalizer:
+    """
+    Settles a proposal's rewards on chain with a single finalize, its gas
+    limit sized to the voter list.
+
+    finalize settles every voter in one transaction, so a proposal whose list
+    needs more than FINALIZE_MAX_GAS can't be finalized by this contract. It
+    is refused before sending rather than left to run out of gas (or be
+    rejected over the block gas limit) on every run.
+    """
+
+    @staticmethod
+    async def finalize(proposal_id: str, voter_list: List[str], reward_list: List[int]) -> str:
+        gas = max(HARDCODED_GAS, finalize_gas(len(voter_list)))
+        if gas > FINALIZE_MAX_GAS:
+            raise ProposalTooLarge(
+                f"Finalizing {len(voter_list)} voters needs about {gas} gas, over FINALIZE_MAX_GAS={FINALIZE_MAX_GAS}"
+            )
+        return await VoteContract.call_contract("finalize", {
+            "proposalId": proposal_id,
+            "voterList": voter_list,
+            "rewardList": reward_list,
+        }, gas=gas)
@@ -0,0 +1,147 @@
+import asyncio
+from datetime import datetime, timedelta, timezone
+from typing import Dict, List
+
+from pymongo.errors import DuplicateKeyError
+from web3 import Web3
+
+from app.config import (
+    LABEL_RETRY_BASE_SECONDS,
+    LABEL_RETRY_MAX_SECONDS,
+    LABEL_WRITE_BATCH_SIZE,
+    LABEL_WRITE_MAX_ATTEMPTS,
+)
+from app.db.mongodb import get_database
+from app.metrics import LABEL_WRITES
+from app.services.smart_contract_client import LabelContract
+from app.utils import get_logger
+
+logger = get_logger(__name__)
+
+
+def hashed_address(address: str) -> str:
+    """
+    The TrustTagStorage key of an address: keccak256(abi.encodePacked(address)).
+    """
+    return "0x" + Web3.solidity_keccak(["address"], [Web3.to_checksum_address(address)]).hex()
+
+
+class LabelOutbox:
+    """
+    Write-back queue from finished proposals to TrustTagStorage.updateLabel.
+
+    The `label_outbox` collection holds one entry per hashed address, so any
+    number of outcomes for the same target coalesce into its latest label (by
+    finalization time) and cost one transaction. flush() sends up to
+    LABEL_WRITE_BATCH_SIZE pending entries at once: the transaction manager
+    hands them consecutive nonces, so the whole batch is broadcast before the
+    first receipt is awaited. Entries stay pending until their write is mined,
+    so they survive restarts; one re-queued while its write was in flight
+    (version changed) is sent again with the newer label.
+
+    A failed write is retried with exponential backoff (next_attempt_at), so
+    entries that keep failing don't hold up the labels behind them, and is
+    marked failed after LABEL_WRITE_MAX_ATTEMPTS attempts. Enqueueing a new
+    outcome for the address starts its attempts over.
+
+        {_id: "<hashed address>", address, description, malicious, proposal_id,
+         finalized_at, status: "pending" | "written" | "failed", version,
+         attempts, next_attempt_at, last_error, tx_hash, ...}
+    """
+
+    @staticmethod
+    async def enqueue(address: str, description: str, malicious: bool, proposal_id: str,
+                      finalized_at: datetime | None = None):
+        now = datetime.now(timezone.utc)
+        finalized_at = finalized_at or now
+        key = hashed_address(address)
+        try:
+            await get_database()["label_outbox"].update_one(
+                {"_id": key, "finalized_at": {"$lte": finalized_at}},
+                {
+                    "$set": {
+                        "address": Web3.to_checksum_address(address),
+                        "description": description,
+                        "malicious": malicious,
+                        "proposal_id": proposal_id,
+                        "finalized_at": finalized_at,
+                        "status": "pending",
+                        "attempts": 0,
+                        "next_attempt_at": None,
+                        "updated_at": now,
+                    },
+                    "$inc": {"version": 1},
+                },
+                upsert=True,
+            )
+        except DuplicateKeyError:
+            # the entry holds a later outcome for this address
+            logger.info(f"Label from proposal {proposal_id} superseded for {address}")
+
+    @staticmethod
+    async def pending(limit: int = LABEL_WRITE_BATCH_SIZE) -> List[Dict]:
+        now = datetime.now(timezone.utc)
+        return await get_database()["label_outbox"].find({
+            "status": "pending",
+            "$or": [{"next_attempt_at": None}, {"next_attempt_at": {"$lte": now}}],
+        }).sort("finalized_at", 1).limit(limit).to_list(None)
+
+    @classmethod
+    async def flush(cls, batch_size: int = LABEL_WRITE_BATCH_SIZE) -> Dict[str, int]:
+        """
+        Write one batch of pending labels. Returns how many were sent,
+        already on chain (unchanged) or failed.
+        """
+        entries = await cls.pending(batch_size)
+        outcomes = await asyncio.gather(*(cls._write(entry) for entry in entries))
+        counts = {"sent": 0, "unchanged": 0, "failed": 0}
+        for outcome in outcomes:
+            counts[outcome] += 1
+        return counts
+
+    @staticmethod
+    async def _write(entry: Dict) -> str:
+        outbox = get_database()["label_outbox"]
+        key = bytes.fromhex(entry["_id"][2:])
+        try:
+            # finalize() of the voting contract writes the label itself when it holds UPDATER_ROLE
+            fn = LabelContract.contract.functions.tags(key)
+            description, malicious = await asyncio.to_thread(fn.call)
+            if description == entry["description"] and malicious == entry["malicious"]:
+                tx_hash, outcome = None, "unchanged"
+            else:
+                tx_hash = await LabelContract.call_contract("updateLabel", {
+                    "hashedAddress": key,
+                    "description": entry["description"],
+                    "malicious": entry["malicious"],
+                })
+                outcome = "sent"
+        except Exception as e:
+            LABEL_WRITES.inc(outcome="failed")
+            await LabelOutbox._failed(entry, e)
+            return "failed"
+
+        LABEL_WRITES.inc(outcome=outcome)
+        await outbox.update_one(
+            {"_id": entry["_id"], "version": entry["version"]},
+            {"$set": {"status": "written", "tx_hash": tx_hash, "written_at": datetime.now(timezone.utc)}},
+        )
+        logger.info(f"Label for {entry['address']} ({entry['proposal_id']}) {outcome}: {tx_hash}")
+        return outcome
+
+    @staticmethod
+    async def _failed(entry: Dict, error: Exception):
+        attempts = entry.get("attempts", 0) + 1
+        now = datetime.now(timezone.utc)
+        update = {"attempts": attempts, "last_error": str(error), "updated_at": now}
+        if attempts >= LABEL_WRITE_MAX_ATTEMPTS:
+            update["status"] = "failed"
+            logger.error(f"Label write for {entry['address']} failed {attempts} times, giving up: {error}")
+        else:
+            delay = min(LABEL_RETRY_BASE_SECONDS * 2 ** (attempts - 1), LABEL_RETRY_MAX_SECONDS)
+            update["next_attempt_at"] = now + timedelta(seconds=delay)
+            logger.error(f"Label write for {entry['address']} failed (attempt {attempts}), retrying in {delay:.0f}s: {error}")
+        # a newer outcome queued meanwhile starts over instead
+        await get_database()["label_outbox"].update_one(
+            {"_id": entry["_id"], "version": entry["version"]}, {"$set": update},
+        )
@@ -0,0 +1,140 @@
+from collections import defaultdict
+from datetime import datetime, timezone
+from typing import Dict, Iterable, List
+
+from pymongo import UpdateOne
+
+from app.config import BTS_SHARD_SIZE
+from app.db.mongodb import get_database
+from app.services.bts_scoring import BtsAggregate, vote_arrays
+from app.utils import get_logger
+
+logger = get_logger(__name__)
+
+# Votes VoteReveals found not to match their on-chain commit were never
+# accepted by the chain: they are neither tallied nor scored.
+NOT_MISMATCHED = {"reveal_status": {"$ne": "mismatch"}}
+
+
+class ProposalStats:
+    """
+    Per-proposal vote tallies in the `proposal_stats` collection, kept current
+    with $inc as votes are written:
+
+        {_id: proposal_id, vote_count, yes_count, no_count, sum_log_yes, sum_log_no, updated_at}
+
+    Only signed votes (with the voter `address` recovered from their
+    commitVote) are tallied, as only those can be scored; votes later found
+    to mismatch their commit are taken out again with remove_votes. The log
+    sums use the same clamping as the BTS scorer, so a stats document is the
+    proposal's BtsAggregate over its stored signed, unmismatched votes.
+    """
+
+    @staticmethod
+    async def record_votes(votes: Iterable[Dict]) -> None:
+        """
+        Add written vote documents to their proposals' tallies, one $inc per proposal.
+        """
+        await _update_tallies(votes, 1)
+
+    @staticmethod
+    async def remove_votes(votes: Iterable[Dict]) -> None:
+        """
+        Take tallied vote documents out of their proposals' tallies again.
+        """
+        await _update_tallies(votes, -1)
+
+    @staticmethod
+    async def get_many(proposal_ids: List[str]) -> Dict[str, Dict]:
+        if not proposal_ids:
+            return {}
+        db = get_database()
+        docs = await db["proposal_stats"].find({"_id": {"$in": proposal_ids}}).to_list(None)
+        return {d["_id"]: d for d in docs}
+
+    @staticmethod
+    async def aggregate(proposal_id: str) -> BtsAggregate | None:
+        """
+        The proposal's population aggregate in O(1), or None without any votes.
+        """
+        db = get_database()
+        doc = await db["proposal_stats"].find_one({"_id": proposal_id})
+        if not doc or not doc.get("vote_count"):
+            return None
+        return BtsAggregate(
+            n=doc["vote_count"],
+            yes_count=doc["yes_count"],
+            sum_log_yes=doc["sum_log_yes"],
+            sum_log_no=doc["sum_log_no"],
+        )
+
+    @staticmethod
+    async def rebuild(proposal_id: str) -> BtsAggregate:
+        """
+        Recompute a proposal's tallies from its votes, e.g. after a crash between a
+        vote insert and its $inc.
+        """
+        db = get_database()
+        aggregate = BtsAggregate()
+        cursor = db["votes"].find(
+            {"proposal_id": proposal_id, "address": {"$ne": None}, **NOT_MISMATCHED}, {"vote": 1, "prediction": 1}
+        ).batch_size(BTS_SHARD_SIZE)
+        chunk = []
+        async for vote in cursor:
+            chunk.append(vote)
+            if len(chunk) >= BTS_SHARD_SIZE:
+                aggregate = aggregate.merge(_aggregate(chunk))
+                chunk = []
+        aggregate = aggregate.merge(_aggregate(chunk))
+
+        await db["proposal_stats"].replace_one(
+            {"_id": proposal_id},
+            {
+                "vote_count": aggregate.n,
+                "yes_count": aggregate.yes_count,
+                "no_count": aggregate.n - aggregate.yes_count,
+                "sum_log_yes": aggregate.sum_log_yes,
+                "sum_log_no": aggregate.sum_log_no,
+                "updated_at": datetime.now(timezone.utc),
+            },
+            upsert=True,
+        )
+        logger.info(f"Rebuilt proposal_stats for {proposal_id} from {aggregate.n} votes")
+        return aggregate
+
+
+def _aggregate(votes: List[Dict]) -> BtsAggregate:
+    if not votes:
+        return BtsAggregate()
+    return BtsAggregate.from_chunk(*vote_arrays(votes))
+
+
+async def _update_tallies(votes: Iterable[Dict], sign: int) -> None:
+    by_proposal: Dict[str, List[Dict]] = defaultdict(list)
+    for v in votes:
+        if v.get("address"):
+            by_proposal[v["proposal_id"]].append(v)
+    if not by_proposal:
+        return
+
+    now = datetime.now(timezone.utc)
+    ops = []
+    for proposal_id, proposal_votes in by_proposal.items():
+        aggregate = _aggregate(proposal_votes)
+        ops.append(UpdateOne(
+            {"_id": proposal_id},
+            {
+                "$inc": {
+                    "vote_count": sign * aggregate.n,
+                    "yes_count": sign * aggregate.yes_count,
+                    "no_count": sign * (aggregate.n - aggregate.yes_count),
+                    "sum_log_yes": sign * aggregate.sum_log_yes,
+                    "sum_log_no": sign * aggregate.sum_log_no,
+                },
+                "$set": {"updated_at": now},
+            },
+            upsert=True,
+        ))
+
+    db = get_database()
+    await db["proposal_stats"].bulk_write(ops, ordered=False)
@@ -0,0 +1,216 @@
+import asyncio
+from collections import Counter
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, List, Tuple
+
+from eth_utils import keccak
+
+from app.config import (
+    REVEAL_MAX_ATTEMPTS,
+    REVEAL_READ_BATCH_SIZE,
+    REVEAL_RETRY_BASE_SECONDS,
+    REVEAL_RETRY_MAX_SECONDS,
+    REVEAL_TX_BATCH_SIZE,
+)
+from app.db.mongodb import get_database
+from app.metrics import REVEAL_MISMATCHES
+from app.services.cache import cache
+from app.services.proposal_stats import ProposalStats
+from app.services.smart_contract_client import VoteContract, view_cache, w3
+from app.utils import get_logger
+
+logger = get_logger(__name__)
+
+# TrustTagVoting storage layout: `proposals` is slot 3 (after Ownable._owner,
+# token and tagStorage); in a Proposal, `commits` is word 5; in a VoterCommit,
+# voteHash is word 0 and `revealed` the low byte of word 1.
+PROPOSALS_SLOT = 3
+COMMITS_OFFSET = 5
+
+
+def commit_hash(vote: Any, prediction: Any, salt: Any) -> bytes | None:
+    """
+    keccak256(abi.encodePacked(bool vote, uint8 prediction, bytes32 salt)) as
+    revealVote computes it, or None if the values can't be revealed at all.
+    """
+    if not isinstance(vote, bool) or not isinstance(prediction, int) or not 0 <= prediction <= 255:
+        return None
+    try:
+        salt_bytes = bytes.fromhex(salt[2:] if salt.startswith("0x") else salt)
+    except (AttributeError, ValueError):
+        return None
+    if len(salt_bytes) != 32:
+        return None
+    return keccak(bytes((vote, prediction)) + salt_bytes)
+
+
+def commit_slot(proposal_id: str, voter: str) -> int:
+    """
+    Storage slot of proposals[proposal_id].commits[voter].voteHash.
+    """
+    proposal = int.from_bytes(keccak(proposal_id.encode() + PROPOSALS_SLOT.to_bytes(32, "big")), "big")
+    commits = (proposal + COMMITS_OFFSET) % 2 ** 256
+    return int.from_bytes(keccak(bytes.fromhex(voter[2:]).rjust(32, b"\0") + commits.to_bytes(32, "big")), "big")
+
+
+class VoteReveals:
+    """
+    Reveals the stored votes of proposals in their reveal phase.
+
+    revealVote reverts (spending gas and a nonce) on a vote whose
+    (vote, prediction, salt) doesn't hash to the voter's on-chain commit, so
+    the votes of a proposal are verified first: their hashes are computed
+    locally in one pass, and the on-chain commits read straight from storage,
+    REVEAL_READ_BATCH_SIZE voters per JSON-RPC batch, all at one block. Only
+    matching votes are sent, REVEAL_TX_BATCH_SIZE at a time. Each vote ends up
+    with a reveal_status:
+
+        "revealed"   revealVote mined (or the commit was already revealed)
+        "mismatch"   not sent; reveal_error says why: unsigned (no commitVote
+                     was relayed), malformed, no_commit, hash_mismatch or
+                     duplicate (another stored vote of that voter matched).
+                     These are taken out of proposal_stats and not scored.
+        "failed"     revealVote failed REVEAL_MAX_ATTEMPTS times (last_error).
+
+    A vote whose revealVote fails keeps no status until then: it is retried
+    with exponential backoff, counting reveal_attempts, not before
+    next_attempt_at.
+    """
+
+    @staticmethod
+    async def read_commits(proposal_id: str, voters: List[str]) -> Dict[str, Tuple[bytes, bool]]:
+        """
+        {voter (lowercase): (voteHash, revealed)} from contract storage.
+        """
+        block = await view_cache.head()
+        address = VoteContract.contract.address
+
+        def read(chunk: List[str]) -> List[bytes]:
+            with w3.batch_requests() as batch:
+                for voter in chunk:
+                    slot = commit_slot(proposal_id, voter)
+                    batch.add(w3.eth.get_storage_at(address, slot, block))
+                    batch.add(w3.eth.get_storage_at(address, slot + 1, block))
+                return batch.execute()
+
+        commits = {}
+        for i in range(0, len(voters), REVEAL_READ_BATCH_SIZE):
+            chunk = voters[i:i + REVEAL_READ_BATCH_SIZE]
+            words = await asyncio.to_thread(read, chunk)
+            for j, voter in enumerate(chunk):
+                vote_hash, flags = bytes(words[2 * j]), bytes(words[2 * j + 1])
+                commits[voter.lower()] = (vote_hash, flags[-1] != 0)
+        return commits
+
+    @classmethod
+    async def verify(cls, proposal_id: str, votes: List[Dict]) -> Dict[str, List[Dict]]:
+        """
+        Sort stored votes into "matching" (to reveal), "revealed" (already on
+        chain) and "mismatches" (each with a "reason").
+        """
+        hashes = await asyncio.to_thread(
+            lambda: [commit_hash(v.get("vote"), v.get("prediction"), v.get("salt")) for v in votes]
+        )
+        voters = sorted({v["address"].lower() for v in votes if v.get("address")})
+        commits = await cls.read_commits(proposal_id, voters) if voters else {}
+
+        report = {"matching": [], "revealed": [], "mismatches": []}
+        settled = set()
+        for vote, computed in zip(votes, hashes):
+            voter = (vote.get("address") or "").lower()
+            vote_hash, revealed = commits.get(voter, (b"\0" * 32, False))
+            if not voter:
+                reason = "unsigned"
+            elif computed is None:
+                reason = "malformed"
+            elif vote_hash == b"\0" * 32:
+                reason = "no_commit"
+            elif computed != vote_hash:
+                reason = "hash_mismatch"
+            elif voter in settled:
+                reason = "duplicate"
+            else:
+                settled.add(voter)
+                report["revealed" if revealed else "matching"].append(vote)
+                continue
+            report["mismatches"].append({**vote, "reason": reason})
+        return report
+
+    @classmethod
+    async def reveal(cls, proposal_id: str) -> Dict[str, int]:
+        """
+        Verify and reveal the proposal's votes without a reveal_status that
+        are due. Returns how many were revealed, mismatched or failed.
+        """
+        votes = get_database()["votes"]
+        pending = await votes.find({
+            "proposal_id": proposal_id,
+            "reveal_status": {"$exists": False},
+            "$or": [{"next_attempt_at": None}, {"next_attempt_at": {"$lte": datetime.now(timezone.utc)}}],
+        }).to_list(None)
+        counts = {"revealed": 0, "mismatched": 0, "failed": 0}
+        if not pending:
+            return counts
+
+        report = await cls.verify(proposal_id, pending)
+        now = datetime.now(timezone.utc)
+        for mismatch in report["mismatches"]:
+            REVEAL_MISMATCHES.inc(reason=mismatch["reason"])
+            await votes.update_one({"_id": mismatch["_id"]}, {"$set": {
+                "reveal_status": "mismatch", "reveal_error": mismatch["reason"], "updated_at": now,
+            }})
+        if report["mismatches"]:
+            await ProposalStats.remove_votes(report["mismatches"])
+            await cache.invalidate("proposals")
+            reasons = Counter(m["reason"] for m in report["mismatches"])
+            logger.warning(f"Proposal {proposal_id}: {len(report['mismatches'])} votes not revealed {dict(reasons)}")
+        if report["revealed"]:
+            await votes.update_many({"_id": {"$in": [v["_id"] for v in report["revealed"]]}}, {"$set": {
+                "reveal_status": "revealed", "updated_at": now,
+            }})
+
+        matching = report["matching"]
+        for i in range(0, len(matching), REVEAL_TX_BATCH_SIZE):
+            batch = matching[i:i + REVEAL_TX_BATCH_SIZE]
+            # the transaction manager hands concurrent sends consecutive nonces
+            outcomes = await asyncio.gather(*(cls._send(proposal_id, vote) for vote in batch))
+            counts["failed"] += outcomes.count(False)
+        counts["revealed"] = len(report["revealed"]) + len(matching) - counts["failed"]
+        counts["mismatched"] = len(report["mismatches"])
+        return counts
+
+    @staticmethod
+    async def _send(proposal_id: str, vote: Dict) -> bool:
+        salt = vote["salt"]
+        try:
+            tx_hash = await VoteContract.call_contract("revealVote", {
+                "proposalId": proposal_id,
+                "voter": w3.to_checksum_address(vote["address"]),
+                "vote": vote["vote"],
+                "prediction": vote["prediction"],
+                "salt": bytes.fromhex(salt[2:] if salt.startswith("0x") else salt),
+            })
+        except Exception as e:
+            await VoteReveals._failed(proposal_id, vote, e)
+            return False
+        await get_database()["votes"].update_one({"_id": vote["_id"]}, {"$set": {
+            "reveal_status": "revealed", "reveal_tx_hash": tx_hash, "updated_at": datetime.now(timezone.utc),
+        }})
+        return True
+
+    @staticmethod
+    async def _failed(proposal_id: str, vote: Dict, error: Exception):
+        attempts = vote.get("reveal_attempts", 0) + 1
+        now = datetime.now(timezone.utc)
+        update = {"reveal_attempts": attempts, "last_error": str(error), "updated_at": now}
+        if attempts >= REVEAL_MAX_ATTEMPTS:
+            update["reveal_status"] = "failed"
+            logger.error(f"revealVote of {vote['address']} on proposal {proposal_id} failed {attempts} times, giving up: {error}")
+        else:
+            delay = min(REVEAL_RETRY_BASE_SECONDS * 2 ** (attempts - 1), REVEAL_RETRY_MAX_SECONDS)
+            update["next_attempt_at"] = now + timedelta(seconds=delay)
+            logger.error(
+                f"revealVote of {vote['address']} on proposal {proposal_id} failed (attempt {attempts}), "
+                f"retrying in {delay:.0f}s: {error}"
+            )
+        await get_database()["votes"].update_one({"_id": vote["_id"]}, {"$set": update})
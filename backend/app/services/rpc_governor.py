@@ -0,0 +1,172 @@
+import threading
+import time
+from contextvars import ContextVar
+from typing import Callable, Dict
+
+import requests
+from web3.providers.rpc.utils import check_if_retry_on_failure
+
+from app.config import (
+    RPC_BURST,
+    RPC_MAX_RATE,
+    RPC_MAX_RETRIES,
+    RPC_MIN_RATE,
+    RPC_RATE,
+    RPC_RATE_DECREASE,
+    RPC_RATE_INCREASE,
+)
+from app.metrics import RPC_THROTTLES
+from app.utils import get_logger
+
+logger = get_logger(__name__)
+
+INTERACTIVE = "interactive"
+BACKGROUND = "background"
+
+# Priority of the JSON-RPC calls made in this context. Request handlers keep the
+# default; the scheduler loop sets BACKGROUND. asyncio.to_thread copies the
+# context into the worker thread that runs the call.
+rpc_priority: ContextVar[str] = ContextVar("rpc_priority", default=INTERACTIVE)
+
+
+class RateGovernor:
+    """
+    Token bucket for one RPC endpoint with an AIMD rate.
+
+    Every call takes a token; tokens refill at `rate` per second, up to `burst`.
+    Each successful call raises the rate by increase / rate, i.e. by about
+    `increase` per second while the bucket is in use, and a 429 or a timeout
+    multiplies it by `decrease` (at most once per 1 / rate seconds, so a burst
+    of rejections from one window counts once). A Retry-After pauses all calls.
+
+    Waiting INTERACTIVE callers are served before BACKGROUND ones. Callers
+    block a thread while they wait, which is how the sync web3 provider is
+    called (from asyncio.to_thread).
+    """
+
+    def __init__(
+        self,
+        rate: float = RPC_RATE,
+        min_rate: float = RPC_MIN_RATE,
+        max_rate: float = RPC_MAX_RATE,
+        increase: float = RPC_RATE_INCREASE,
+        decrease: float = RPC_RATE_DECREASE,
+        burst: float = RPC_BURST,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        self.min_rate = min_rate
+        self.max_rate = max_rate
+        self.increase = increase
+        self.decrease = decrease
+        self.burst = max(burst, 1)
+        self._clock = clock
+        self._rate = min(max(rate, min_rate), max_rate)
+        self._tokens = self.burst
+        self._updated = clock()
+        self._paused_until = 0.0
+        self._last_decrease = float("-inf")
+        self._interactive_waiting = 0
+        self._cond = threading.Condition()
+
+    @property
+    def rate(self) -> float:
+        return self._rate
+
+    def _refill(self, now: float):
+        self._tokens = min(self.burst, self._tokens + (now - self._updated) * self._rate)
+        self._updated = now
+
+    def acquire(self, priority: str = INTERACTIVE):
+        interactive = priority != BACKGROUND
+        with self._cond:
+            if interactive:
+                self._interactive_waiting += 1
+            try:
+                while True:
+                    now = self._clock()
+                    self._refill(now)
+                    if now >= self._paused_until and self._tokens >= 1 and (
+                        interactive or not self._interactive_waiting
+                    ):
+                        self._tokens -= 1
+                        return
+                    if now < self._paused_until:
+                        wait = self._paused_until - now
+                    elif self._tokens < 1:
+                        wait = (1 - self._tokens) / self._rate
+                    else:
+                        # background behind interactive callers: woken by their notify_all
+                        wait = 1 / self._rate
+                    self._cond.wait(wait)
+            finally:
+                if interactive:
+                    self._interactive_waiting -= 1
+                    self._cond.notify_all()
+
+    def succeeded(self):
+        with self._cond:
+            self._refill(self._clock())
+            self._rate = min(self.max_rate, self._rate + self.increase / self._rate)
+
+    def throttled(self, retry_after: float | None = None):
+        with self._cond:
+            now = self._clock()
+            self._refill(now)
+            if now - self._last_decrease >= 1 / self._rate:
+                self._rate = max(self.min_rate, self._rate * self.decrease)
+                self._last_decrease = now
+                self._tokens = min(self._tokens, 0)
+                logger.warning(f"RPC rate limited; sending at most {self._rate:.2f} requests/s")
+            if retry_after:
+                self._paused_until = max(self._paused_until, now + retry_after)
+
+    def call(self, method: str, post: Callable[[], bytes], endpoint: str = "") -> bytes:
+        """
+        Send one JSON-RPC request through the bucket. 429s (never executed) are
+        retried for every method; timeouts and connection errors only for the
+        methods web3 itself retries.
+        """
+        priority = rpc_priority.get()
+        retryable = check_if_retry_on_failure(method)
+        for attempt in range(RPC_MAX_RETRIES + 1):
+            self.acquire(priority)
+            try:
+                response = post()
+            except requests.HTTPError as e:
+                if e.response is None or e.response.status_code != 429:
+                    raise
+                RPC_THROTTLES.inc(endpoint=endpoint, reason="429")
+                self.throttled(_retry_after(e.response))
+                if attempt == RPC_MAX_RETRIES:
+                    raise
+            except requests.Timeout:
+                RPC_THROTTLES.inc(endpoint=endpoint, reason="timeout")
+                self.throttled()
+                if not retryable or attempt == RPC_MAX_RETRIES:
+                    raise
+            except requests.ConnectionError:
+                if not retryable or attempt == RPC_MAX_RETRIES:
+                    raise
+                time.sleep(0.125 * 2 ** attempt)
+            else:
+                self.succeeded()
+                return response
+
+
+def _retry_after(response: requests.Response) -> float | None:
+    try:
+        return float(response.headers.get("Retry-After", ""))
+    except ValueError:
+        return None
+
+
+_governors: Dict[str, RateGovernor] = {}
+_governors_lock = threading.Lock()
+
+
+def governor_for(endpoint: str) -> RateGovernor:
+    with _governors_lock:
+        governor = _governors.get(endpoint)
+        if governor is None:
+            governor = _governors[endpoint] = RateGovernor()
+        return governor
@@ -0,0 +1,202 @@
+import asyncio
+import time
+from collections import OrderedDict
+from typing import Dict, List, Tuple
+
+from web3 import Web3
+
+from app.config import (
+    MULTICALL3_ADDRESS,
+    SAFE_OWNER_BATCH_DELAY_MS,
+    SAFE_OWNER_MAX_ENTRIES,
+    SAFE_OWNER_MULTICALL,
+    SAFE_OWNER_NEGATIVE_TTL,
+    SAFE_OWNER_TTL,
+    SIWE_RPC_URL,
+)
+from app.metrics import CACHE_REQUESTS
+from app.services.smart_contract_client import GovernedHTTPProvider
+from app.utils import get_logger
+
+logger = get_logger(__name__)
+
+# SAFE contract ABI for isOwner function
+SAFE_CONTRACT_ABI = [
+    {
+        "inputs": [{"internalType": "address", "name": "owner", "type": "address"}],
+        "name": "isOwner",
+        "outputs": [{"internalType": "bool", "name": "", "type": "bool"}],
+        "stateMutability": "view",
+        "type": "function"
+    }
+]
+
+MULTICALL3_ABI = [
+    {
+        "inputs": [{
+            "components": [
+                {"internalType": "address", "name": "target", "type": "address"},
+                {"internalType": "bool", "name": "allowFailure", "type": "bool"},
+                {"internalType": "bytes", "name": "callData", "type": "bytes"},
+            ],
+            "internalType": "struct Multicall3.Call3[]", "name": "calls", "type": "tuple[]",
+        }],
+        "name": "aggregate3",
+        "outputs": [{
+            "components": [
+                {"internalType": "bool", "name": "success", "type": "bool"},
+                {"internalType": "bytes", "name": "returnData", "type": "bytes"},
+            ],
+            "internalType": "struct Multicall3.Result[]", "name": "returnData", "type": "tuple[]",
+        }],
+        "stateMutability": "payable",
+        "type": "function"
+    }
+]
+
+# Most calls one Multicall may carry; more pending lookups are split.
+MAX_BATCH = 100
+
+Key = Tuple[str, str]  # (safe, signer), checksummed
+
+
+class SafeOwnerLookup:
+    """
+    Answers Safe.isOwner(signer) for SIWE logins.
+
+    Results are kept in an LRU of SAFE_OWNER_MAX_ENTRIES (safe, signer) pairs:
+    owners for SAFE_OWNER_TTL, non-owners for the shorter
+    SAFE_OWNER_NEGATIVE_TTL so a newly added owner gets in soon. A removed
+    owner can therefore still sign in until the entry expires. Concurrent
+    lookups of the same pair share one call. With SAFE_OWNER_MULTICALL, the
+    misses of SAFE_OWNER_BATCH_DELAY_MS go out as one Multicall3 aggregate3
+    eth_call.
+    """
+
+    def __init__(
+        self,
+        rpc_url: str = SIWE_RPC_URL,
+        ttl: float = SAFE_OWNER_TTL,
+        negative_ttl: float = SAFE_OWNER_NEGATIVE_TTL,
+        max_entries: int = SAFE_OWNER_MAX_ENTRIES,
+        multicall: bool = SAFE_OWNER_MULTICALL,
+        batch_delay_ms: float = SAFE_OWNER_BATCH_DELAY_MS,
+    ):
+        self.w3 = Web3(GovernedHTTPProvider(rpc_url))
+        self.ttl = ttl
+        self.negative_ttl = negative_ttl
+        self.max_entries = max_entries
+        self.multicall = multicall
+        self.batch_delay = batch_delay_ms / 1000.0
+
+        self._safe_abi = self.w3.eth.contract(abi=SAFE_CONTRACT_ABI)
+        self._entries: "OrderedDict[Key, Tuple[float, bool]]" = OrderedDict()
+        self._loading: Dict[Key, asyncio.Future] = {}
+        self._batch: List[Tuple[Key, asyncio.Future]] = []
+        self._timer: asyncio.TimerHandle | None = None
+        self._flushes: set[asyncio.Task] = set()
+
+    async def is_owner(self, safe: str, signer: str) -> bool:
+        key = (Web3.to_checksum_address(safe), Web3.to_checksum_address(signer))
+
+        entry = self._entries.get(key)
+        if entry is not None:
+            expires_at, owner = entry
+            if expires_at >= time.monotonic():
+                self._entries.move_to_end(key)
+                CACHE_REQUESTS.inc(namespace="safe_owners", result="hit")
+                return owner
+            del self._entries[key]
+
+        loading = self._loading.get(key)
+        if loading is not None:
+            CACHE_REQUESTS.inc(namespace="safe_owners", result="coalesced")
+            return await asyncio.shield(loading)
+
+        CACHE_REQUESTS.inc(namespace="safe_owners", result="miss")
+        future = asyncio.get_running_loop().create_future()
+        self._loading[key] = future
+        try:
+            owner = await (self._batched(key) if self.multicall else asyncio.to_thread(self._call_is_owner, key))
+            self._store(key, owner)
+            future.set_result(owner)
+            return owner
+        except BaseException as e:
+            # not cached: the next login retries
+            future.set_exception(e)
+            future.exception()
+            raise
+        finally:
+            del self._loading[key]
+
+    def _store(self, key: Key, owner: bool):
+        self._entries[key] = (time.monotonic() + (self.ttl if owner else self.negative_ttl), owner)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def _call_is_owner(self, key: Key) -> bool:
+        safe, signer = key
+        return self.w3.eth.contract(address=safe, abi=SAFE_CONTRACT_ABI).functions.isOwner(signer).call()
+
+    # ---- Multicall batching ----
+
+    async def _batched(self, key: Key) -> bool:
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        self._batch.append((key, future))
+        if len(self._batch) >= MAX_BATCH:
+            self._start_flush()
+        elif self._timer is None:
+            self._timer = loop.call_later(self.batch_delay, self._start_flush)
+        return await future
+
+    def _start_flush(self):
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        while self._batch:
+            batch = self._batch[:MAX_BATCH]
+            del self._batch[:MAX_BATCH]
+            task = asyncio.ensure_future(self._run_batch(batch))
+            self._flushes.add(task)
+            task.add_done_callback(self._flushes.discard)
+
+    async def _run_batch(self, batch: List[Tuple[Key, asyncio.Future]]):
+        try:
+            results = await asyncio.to_thread(self._call_multicall, [key for key, _ in batch])
+        except Exception as e:
+            logger.error(f"Multicall of {len(batch)} isOwner lookups failed: {e}")
+            results = [e] * len(batch)
+        for (_, future), result in zip(batch, results):
+            if future.done():
+                continue
+            if isinstance(result, Exception):
+                future.set_exception(result)
+            else:
+                future.set_result(result)
+
+    def _call_multicall(self, keys: List[Key]) -> List["bool | Exception"]:
+        calls = [(safe, True, self._safe_abi.encode_abi("isOwner", [signer])) for safe, signer in keys]
+        results = []
+        for (safe, _), (success, data) in zip(keys, self._aggregate(calls)):
+            if success and len(data) == 32:
+                results.append(self.w3.codec.decode(["bool"], data)[0])
+            else:
+                # reverted, or no contract at that address
+                results.append(ValueError(f"isOwner call to {safe} failed"))
+        return results
+
+    def _aggregate(self, calls: List[Tuple[str, bool, str]]) -> List[Tuple[bool, bytes]]:
+        multicall = self.w3.eth.contract(address=Web3.to_checksum_address(MULTICALL3_ADDRESS), abi=MULTICALL3_ABI)
+        return multicall.functions.aggregate3(calls).call()
+
+
+_lookups: Dict[str, SafeOwnerLookup] = {}
+
+
+def owner_lookup_for(rpc_url: str = SIWE_RPC_URL) -> SafeOwnerLookup:
+    lookup = _lookups.get(rpc_url)
+    if lookup is None:
+        lookup = _lookups[rpc_url] = SafeOwnerLookup(rpc_url)
+    return lookup
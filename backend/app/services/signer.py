@@ -0,0 +1,104 @@
+import asyncio
+import multiprocessing
+from concurrent.futures import Executor, ProcessPoolExecutor
+from typing import Any, Dict, List, Tuple
+
+from eth_account import Account
+
+from app.config import BACKEND_WALLET_PRIVATE_KEY, SIGNER_PROCESSES
+from app.utils import get_logger
+
+logger = get_logger(__name__)
+
+# Set in each pool worker by _init_worker, so the key is sent once per process
+# instead of with every transaction.
+_worker_key: str | None = None
+
+_executor: Executor | None = None
+_pending: List[Tuple[Dict[str, Any], asyncio.Future]] = []
+_flush_scheduled = False
+
+
+def _init_worker(private_key: str):
+    global _worker_key
+    _worker_key = private_key
+
+
+def _sign_batch(txns: List[Dict[str, Any]]) -> List[bytes]:
+    return [bytes(Account.sign_transaction(txn, _worker_key).raw_transaction) for txn in txns]
+
+
+class TransactionSigner:
+    """
+    Signs backend wallet transactions off the event loop.
+
+    eth-account signs in pure Python unless coincurve is installed, so signing
+    runs in a process pool. Transactions submitted in the same loop iteration are
+    signed together in one pool call, which amortizes the IPC round trip.
+    """
+
+    @staticmethod
+    def executor() -> Executor:
+        global _executor
+        if _executor is None:
+            private_key = BACKEND_WALLET_PRIVATE_KEY
+            if not private_key:
+                raise RuntimeError("BACKEND_WALLET_PRIVATE_KEY not set")
+            # spawn: forking a process that already runs web3/Motor threads is unsafe
+            _executor = ProcessPoolExecutor(
+                max_workers=SIGNER_PROCESSES,
+                mp_context=multiprocessing.get_context("spawn"),
+                initializer=_init_worker,
+                initargs=(private_key,),
+            )
+        return _executor
+
+    @staticmethod
+    async def sign(txn: Dict[str, Any]) -> bytes:
+        """
+        Sign one transaction and return the raw signed transaction bytes.
+        """
+        global _flush_scheduled
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        _pending.append((txn, future))
+        if not _flush_scheduled:
+            _flush_scheduled = True
+            loop.call_soon(lambda: asyncio.ensure_future(TransactionSigner._flush()))
+        return await future
+
+    @staticmethod
+    async def sign_many(txns: List[Dict[str, Any]]) -> List[bytes]:
+        """
+        Sign a batch of transactions in a single pool call.
+        """
+        if not txns:
+            return []
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(TransactionSigner.executor(), _sign_batch, txns)
+
+    @staticmethod
+    async def _flush():
+        global _pending, _flush_scheduled
+        batch, _pending = _pending, []
+        _flush_scheduled = False
+
+        try:
+            signed = await TransactionSigner.sign_many([txn for txn, _ in batch])
+        except Exception as e:
+            logger.error(f"Signing a batch of {len(batch)} transactions failed: {e}")
+            for _, future in batch:
+                if not future.done():
+                    future.set_exception(e)
+            return
+
+        for (_, future), raw in zip(batch, signed):
+            if not future.done():
+                future.set_result(raw)
+
+    @staticmethod
+    def close():
+        global _executor
+        if _executor is not None:
+            _executor.shutdown(wait=False, cancel_futures=True)
+            _executor = None
@@ -2,9 +2,12 @@ import os
 import json
 import asyncio
 import logging
-from typing import Any, Dict
+import time
+from typing import Any, Dict, Tuple
 
-from web3 import Web3
+from web3 import Web3, HTTPProvider
+from web3.exceptions import TimeExhausted, TransactionNotFound
+from web3._utils.batching import sort_batch_response_by_response_ids
 from web3.middleware import ExtraDataToPOAMiddleware
 
 from app.config import (
@@ -12,7 +15,13 @@ from app.config import (
     VOTE_CONTRACT_ADDRESS,
     LABEL_CONTRACT_ADDRESS,
     BACKEND_WALLET_PRIVATE_KEY,
+    RELAY_RECEIPT_POLL_INTERVAL,
+    RELAY_RECEIPT_TIMEOUT,
 )
+from app.services.rpc_governor import governor_for
+from app.services.tx_manager import TransactionManager, call_key
+from app.services.view_cache import ViewCache
+from app.timing import timed
 
 logger = logging.getLogger(__name__)
 BASE_DIR = os.path.dirname(__file__)
@@ -53,7 +62,46 @@ with open(label_abi_path, "r") as f:
 # ————————————————
 # Web3 Setup
 # ————————————————
-w3 = Web3(Web3.HTTPProvider(BLOCKCHAIN_RPC_URL))
+class TimedHTTPProvider(HTTPProvider):
+    """
+    HTTPProvider that records every JSON-RPC round trip as an "rpc" timing.
+    """
+
+    def make_request(self, method, params):
+        with timed("rpc"):
+            return super().make_request(method, params)
+
+
+class GovernedHTTPProvider(TimedHTTPProvider):
+    """
+    TimedHTTPProvider whose requests pass the endpoint's RateGovernor, which
+    replaces web3's own retry loop (it would retry 429s blindly).
+    """
+
+    def __init__(self, endpoint_uri, **kwargs):
+        super().__init__(endpoint_uri, exception_retry_configuration=None, **kwargs)
+        self.governor = governor_for(str(endpoint_uri))
+
+    def _make_request(self, method, request_data):
+        return self.governor.call(method, lambda: self._request_session_manager.make_post_request(
+            self.endpoint_uri, request_data, **self.get_request_kwargs()
+        ), endpoint=str(self.endpoint_uri))
+
+    def make_batch_request(self, batch_requests):
+        # a JSON-RPC batch takes one token, like a single request
+        request_data = self.encode_batch_rpc_request(batch_requests)
+        with timed("rpc"):
+            raw_response = self.governor.call("batch", lambda: self._request_session_manager.make_post_request(
+                self.endpoint_uri, request_data, **self.get_request_kwargs()
+            ), endpoint=str(self.endpoint_uri))
+        response = self.decode_rpc_response(raw_response)
+        if not isinstance(response, list):
+            # RPC errors return only one response with the error object
+            return response
+        return sort_batch_response_by_response_ids(response)
+
+
+w3 = Web3(GovernedHTTPProvider(BLOCKCHAIN_RPC_URL))
 w3.middleware_onion.inject(ExtraDataToPOAMiddleware, layer=0)
 
 if not w3.eth.default_account:
@@ -64,6 +112,50 @@ if not w3.eth.default_account:
 # Use a hard-coded gas value for all transactions.
 HARDCODED_GAS = 500000
 
+# Pending transactions are re-sent with a bumped fee until mined (app/services/tx_manager.py)
+tx_manager = TransactionManager(w3)
+
+# View results are reused until the next block (app/services/view_cache.py)
+view_cache = ViewCache(w3)
+
+
+async def relay_transaction(raw_txn: bytes) -> Tuple[str, Any]:
+    """
+    Broadcast a user-signed transaction and wait for its receipt; returns the
+    hash (hex, as web3 formats it) and the receipt.
+
+    The calls run in worker threads: the governed provider blocks while the
+    RPC bucket is throttled, which must not stall the event loop. The receipt
+    is polled every RELAY_RECEIPT_POLL_INTERVAL seconds instead of web3's
+    0.1 s, so requests waiting on their transactions don't use up the bucket
+    the background jobs share.
+    """
+    tx_hash = await asyncio.to_thread(w3.eth.send_raw_transaction, raw_txn)
+    deadline = time.monotonic() + RELAY_RECEIPT_TIMEOUT
+    with timed("rpc_wait"):
+        while True:
+            try:
+                return tx_hash.hex(), await asyncio.to_thread(w3.eth.get_transaction_receipt, tx_hash)
+            except TransactionNotFound:
+                if time.monotonic() >= deadline:
+                    raise TimeExhausted(
+                        f"Transaction {tx_hash.hex()} is not in the chain after {RELAY_RECEIPT_TIMEOUT} seconds"
+                    )
+            await asyncio.sleep(RELAY_RECEIPT_POLL_INTERVAL)
+
+
+async def _send_transaction(contract_name: str, fn, method: str, args: Dict[str, Any],
+                            gas: int = HARDCODED_GAS) -> str:
+    receipt = await tx_manager.send(fn(**args), method, call_key(f"{contract_name}.{method}", args), gas)
+    tx_hex = "0x" + bytes(receipt["transactionHash"]).hex()
+    view_cache.observe(receipt["blockNumber"], args.get("proposalId"))
+    logger.info(f"Mined {method} tx: {tx_hex} args={args}")
+    if receipt["status"] != 1:
+        logger.error(f"Transaction {tx_hex} failed: {receipt}")
+        raise RuntimeError(f"Transaction {tx_hex} failed: {receipt}")
+    return tx_hex
+
+
 class VoteContract:
     contract = w3.eth.contract(
         address=Web3.to_checksum_address(VOTE_CONTRACT_ADDRESS),
@@ -71,35 +163,20 @@ class VoteContract:
     )
 
     @classmethod
-    async def call_contract(cls, method: str, args: Dict[str, Any]) -> str:
-        fn = getattr(cls.contract.functions, method)
-        txn = fn(**args).build_transaction({
-            "from": w3.eth.default_account,
-            "nonce": w3.eth.get_transaction_count(w3.eth.default_account),
-            "gas": HARDCODED_GAS,
-            "gasPrice": w3.eth.gas_price,
-        })
-
-        private_key = BACKEND_WALLET_PRIVATE_KEY
-        if not private_key:
-            raise RuntimeError("BACKEND_WALLET_PRIVATE_KEY not set")
-
-        signed = w3.eth.account.sign_transaction(txn, private_key=private_key)
-        tx_hash = w3.eth.send_raw_transaction(signed.raw_transaction)
-        tx_hex = tx_hash.hex()
-        logger.info(f"Sent {method} tx: {tx_hex} args={args}")
+    async def call_contract(cls, method: str, args: Dict[str, Any], gas: int = HARDCODED_GAS) -> str:
+        return await _send_transaction("VoteContract", getattr(cls.contract.functions, method), method, args, gas)
 
-        def _wait_receipt():
-            return w3.eth.wait_for_transaction_receipt(tx_hash, timeout=120)
-
-        receipt = await asyncio.get_event_loop().run_in_executor(None, _wait_receipt)
-
-
-        if receipt.status != 1:
-            logger.error(f"Transaction {tx_hex} failed: {receipt}")
-            raise RuntimeError(f"Transaction {tx_hex} failed: {receipt}")
+    @classmethod
+    async def call_view(cls, method: str, args: Dict[str, Any]) -> Any:
+        return await view_cache.call(cls.contract, method, args, proposal_id=args.get("proposalId"))
 
-        return tx_hex
+    @classmethod
+    async def proposal(cls, proposal_id: str) -> tuple:
+        """
+        The proposals(id) getter: (target, malicious, description, proposer,
+        deadline, phase, totalStake, finalized, winningLabel).
+        """
+        return await view_cache.call(cls.contract, "proposals", (proposal_id,), proposal_id=proposal_id)
 
 class LabelContract:
     contract = w3.eth.contract(
@@ -109,27 +186,4 @@ class LabelContract:
 
     @classmethod
     async def call_contract(cls, method: str, args: Dict[str, Any]) -> str:
-        fn = getattr(cls.contract.functions, method)
-        txn = fn(**args).build_transaction({
-            "from": w3.eth.default_account,
-            "nonce": w3.eth.get_transaction_count(w3.eth.default_account),
-            "gas": HARDCODED_GAS,
-            "gasPrice": w3.eth.gas_price,
-        })
-
-        private_key = BACKEND_WALLET_PRIVATE_KEY
-        if not private_key:
-            raise RuntimeError("BACKEND_WALLET_PRIVATE_KEY not set")
-
-        signed = w3.eth.account.sign_transaction(txn, private_key=private_key)
-        tx_hash = w3.eth.send_raw_transaction(signed.raw_transaction)
-        tx_hex = tx_hash.hex()
-        logger.info(f"Sent {method} tx: {tx_hex} args={args}")
-
-        def _wait_receipt():
-            return w3.eth.wait_for_transaction_receipt(tx_hash, timeout=120)
-
-        receipt = await asyncio.get_event_loop().run_in_executor(None, _wait_receipt)
-        if receipt.status != 1:
-            raise RuntimeError(f"Transaction {tx_hex} failed: {receipt}")
-        return tx_hex
\ No newline at end of file
+        return await _send_transaction("LabelContract", getattr(cls.contract.functions, method), method, args)
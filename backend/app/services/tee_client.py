@@ -1,70 +1,400 @@
-import math
+import hashlib
 import logging
 import os
-import io
 import json
+import random
+from datetime import datetime, timezone
 import httpx
+import numpy as np
 from typing import List, Dict
 from app.config import TEE_SERVICE_URL
 from app.db.mongodb import get_database
-from app.config import TEE_CLIENT_URL
+from app.config import (
+    TEE_CLIENT_URL,
+    TEE_HTTP_TIMEOUT,
+    TEE_HTTP_POOL_SIZE,
+    BTS_SHARD_SIZE,
+    TEE_SHARD_SIZE,
+    TEE_VOTE_FORMAT,
+    BTS_SCORER_MODE,
+    BTS_SHADOW_SAMPLE_RATE,
+    BTS_SHADOW_TOLERANCE,
+)
+from app.metrics import TEE_RESULT_CACHE
+from app.services.bts_scoring import (
+    BtsAggregate,
+    REWARD_UNIT,
+    SCORE_SCALE,
+    bts_scores,
+    fixed_point_scores,
+    reward_amounts,
+    vote_arrays,
+)
+from app.services.proposal_stats import NOT_MISMATCHED, ProposalStats
+from app.services.vote_codec import VOTES_CONTENT_TYPE, encode_votes
+from app.timing import timed
 from app.utils import get_logger
 
 logger = get_logger(__name__)
 
+SCORER_MODES = ("tee", "local", "fallback", "shadow")
+
+_http_client: httpx.AsyncClient | None = None
+
+# Cleared when the TEE service answers a binary payload with 415 (an older
+# service); later requests then go straight to JSON.
+_binary_votes_supported = True
+
+
 class TeeClient:
+    @staticmethod
+    async def score_proposal(proposal_id: str, voters: List[str], mode: str | None = None) -> List[Dict]:
+        """
+        Produce finalize rewards for a proposal with the configured scorer mode.
+
+        "fallback" and "shadow" keep finalization going when the TEE is down by
+        using the local reference scorer; "shadow" additionally compares a sample
+        of successful TEE results against it and records disagreements.
+        """
+        mode = mode or BTS_SCORER_MODE
+        if mode not in SCORER_MODES:
+            raise ValueError(f"Unknown BTS scorer mode: {mode}")
+
+        if mode == "local":
+            return await TeeClient.compute_rewards_local(proposal_id, voters)
+
+        try:
+            tee_results = await TeeClient.compute_rewards_tee(proposal_id, voters)
+        except Exception as e:
+            if mode == "tee":
+                raise
+            logger.error(f"TEE scoring raised for proposal {proposal_id}: {e}")
+            tee_results = []
+
+        if mode == "tee":
+            return tee_results
+
+        if not tee_results:
+            local_results = await TeeClient.compute_rewards_local(proposal_id, voters)
+            if local_results:
+                logger.warning(f"TEE produced no scores for proposal {proposal_id}; using local scorer")
+            return local_results
+
+        if mode == "shadow" and random.random() < BTS_SHADOW_SAMPLE_RATE:
+            try:
+                await TeeClient._shadow_check(proposal_id, voters, tee_results)
+            except Exception as e:
+                logger.error(f"Shadow check failed for proposal {proposal_id}: {e}")
+
+        return tee_results
+
+    @staticmethod
+    async def compute_rewards_local(proposal_id: str, voters: List[str]) -> List[Dict]:
+        if len(voters) > BTS_SHARD_SIZE:
+            return await TeeClient.compute_rewards_sharded(proposal_id, voters)
+        return await TeeClient.compute_rewards(proposal_id, voters)
+
+    @staticmethod
+    async def compute_rewards_tee(proposal_id: str, voters: List[str]) -> List[Dict]:
+        if len(voters) > TEE_SHARD_SIZE:
+            return await TeeClient.compute_rewards_op_tee_sharded(proposal_id, voters)
+        return await TeeClient.compute_rewards_op_tee(proposal_id, voters)
+
+    @staticmethod
+    async def _shadow_check(proposal_id: str, voters: List[str], tee_results: List[Dict]) -> List[Dict]:
+        """
+        Compare TEE rewards against the local reference scorer and record any
+        voter whose amounts differ by more than BTS_SHADOW_TOLERANCE.
+        """
+        local_results = await TeeClient.compute_rewards_local(proposal_id, voters)
+        local_scores = {r["address"]: r["score"] for r in local_results}
+        tolerance = round(BTS_SHADOW_TOLERANCE * SCORE_SCALE) * REWARD_UNIT
+
+        mismatches = []
+        for r in tee_results:
+            local_score = local_scores.get(r["address"], 0)
+            if abs(r["score"] - local_score) > tolerance:
+                mismatches.append({"address": r["address"], "tee": r["score"], "local": local_score})
+
+        logger.info(
+            f"Shadow check for proposal {proposal_id}: {len(mismatches)}/{len(tee_results)} voters outside tolerance"
+        )
+        if mismatches:
+            db = get_database()
+            await db["score_disagreements"].insert_one({
+                "proposal_id": proposal_id,
+                "checked": len(tee_results),
+                "tolerance": tolerance,
+                "mismatches": mismatches,
+                "created_at": datetime.now(timezone.utc),
+            })
+        return mismatches
+
     @staticmethod
     async def compute_rewards(proposal_id: str, voters: List[str]) -> List[Dict]:
+        results = await TeeClient.compute_rewards_many({proposal_id: voters})
+        return results[proposal_id]
+
+    @staticmethod
+    async def compute_rewards_many(proposal_voters: Dict[str, List[str]]) -> Dict[str, List[Dict]]:
+        """
+        Score several proposals in one vectorized pass.
+
+        Args:
+            proposal_voters: proposal id -> on-chain voter list (finalize order)
+
+        Returns:
+            proposal id -> [{"address", "score"}] in voter order, where score is the
+            fixed-point reward amount ready for finalize's rewardList
+        """
+        if not proposal_voters:
+            return {}
+
         db = get_database()
         votes = await db["votes"].find({
-            "proposal_id": proposal_id,
-            "address": {"$in": voters}
+            "$or": [
+                {"proposal_id": pid, "address": {"$in": voters}, **NOT_MISMATCHED}
+                for pid, voters in proposal_voters.items()
+            ]
         }).to_list(None)
+        votes = _first_vote_per_voter(votes)
 
-        if not votes:
+        proposal_ids = list(proposal_voters)
+        segment_of = {pid: i for i, pid in enumerate(proposal_ids)}
+
+        segment_ids = np.fromiter((segment_of[v["proposal_id"]] for v in votes), dtype=np.intp, count=len(votes))
+        vote_arr, prediction_arr = vote_arrays(votes)
+
+        scores = bts_scores(vote_arr, prediction_arr, segment_ids, len(proposal_ids))
+        amounts = reward_amounts(fixed_point_scores(scores))
+
+        by_proposal: Dict[str, Dict[str, int]] = {pid: {} for pid in proposal_ids}
+        for vote, amount in zip(votes, amounts):
+            by_proposal[vote["proposal_id"]][vote.get("address")] = amount
+
+        results = {}
+        for pid, voters in proposal_voters.items():
+            scored = by_proposal[pid]
+            if not scored:
+                logger.info(f"No votes found for proposal {pid}")
+                results[pid] = []
+                continue
+            results[pid] = [{"address": a, "score": scored.get(a, 0)} for a in voters]
+            logger.info(f"Computed rewards for proposal {pid} based on {len(scored)} votes")
+        return results
+
+    @staticmethod
+    async def compute_rewards_sharded(
+        proposal_id: str, voters: List[str], chunk_size: int = BTS_SHARD_SIZE
+    ) -> List[Dict]:
+        """
+        Map-reduce variant of compute_rewards for proposals with very large voter sets.
+
+        The first pass streams the votes in chunks and merges their partial
+        aggregates, the second pass scores each chunk against the merged
+        population aggregate. Only one chunk of votes is held in memory at a time.
+        """
+        aggregate = await TeeClient._population_aggregate(proposal_id, voters, chunk_size)
+
+        if aggregate.n == 0:
             logger.info(f"No votes found for proposal {proposal_id}")
             return []
 
-        epsilon = 1e-6
-        n = len(votes)
+        scored: Dict[str, int] = {}
+        async for chunk in TeeClient._iter_vote_chunks(proposal_id, voters, chunk_size):
+            amounts = reward_amounts(fixed_point_scores(aggregate.score_chunk(*vote_arrays(chunk))))
+            for vote, amount in zip(chunk, amounts):
+                scored[vote["address"]] = amount
+
+        logger.info(f"Computed sharded rewards for proposal {proposal_id} based on {aggregate.n} votes")
+        return [{"address": a, "score": scored.get(a, 0)} for a in voters]
+
+    @staticmethod
+    async def _population_aggregate(proposal_id: str, voters: List[str], chunk_size: int) -> BtsAggregate:
+        """
+        The population aggregate of the votes cast by the given on-chain voters.
+
+        Read in O(1) from proposal_stats when the stored signed votes are exactly
+        one per on-chain voter, so the tallies cover the same votes as the
+        scoring pass; otherwise reduced from a streamed pass over the votes.
+        """
+        stats = await ProposalStats.aggregate(proposal_id)
+        if stats is not None and stats.n == len(voters) and await TeeClient._one_vote_per_voter(proposal_id, voters):
+            return stats
 
-        count_yes = sum(1 for vote in votes if vote.get("vote") is True)
-        count_no = n - count_yes
+        aggregate = BtsAggregate()
+        async for chunk in TeeClient._iter_vote_chunks(proposal_id, voters, chunk_size):
+            aggregate = aggregate.merge(BtsAggregate.from_chunk(*vote_arrays(chunk)))
+        return aggregate
 
-        f_yes = max(count_yes / n, epsilon)
-        f_no = max(count_no / n, epsilon)
+    @staticmethod
+    async def _one_vote_per_voter(proposal_id: str, voters: List[str]) -> bool:
+        """
+        Whether the proposal's signed votes are one per on-chain voter, no more
+        and none missing. Only the addresses are read.
+        """
+        voter_set = set(voters)
+        seen = set()
+        db = get_database()
+        cursor = db["votes"].find(
+            {"proposal_id": proposal_id, "address": {"$ne": None}, **NOT_MISMATCHED},
+            {"address": 1},
+        ).batch_size(BTS_SHARD_SIZE)
+        async for vote in cursor:
+            address = vote["address"]
+            if address in seen or address not in voter_set:
+                return False
+            seen.add(address)
+        return len(seen) == len(voter_set)
 
-        sum_log_yes = 0.0
-        sum_log_no = 0.0
-        for vote in votes:
-            pred_fraction = vote.get("prediction", 50) / 100.0
-            p_i_yes = max(pred_fraction, epsilon)
-            p_i_no = max(1 - pred_fraction, epsilon)
-            sum_log_yes += math.log(p_i_yes)
-            sum_log_no += math.log(p_i_no)
+    @staticmethod
+    async def _iter_vote_chunks(proposal_id: str, voters: List[str], chunk_size: int):
+        """
+        Stream a proposal's votes from Mongo in chunks of at most chunk_size documents,
+        keeping only votes cast by the given on-chain voters, one per voter.
 
-        pbar_yes = math.exp(sum_log_yes / n)
-        pbar_no = math.exp(sum_log_no / n)
+        Voters are filtered client side: an $in over hundreds of thousands of
+        addresses would exceed the 16 MB query document limit.
+        """
+        voter_set = set(voters)
+        seen = set()
+        db = get_database()
+        cursor = db["votes"].find(
+            {"proposal_id": proposal_id, **NOT_MISMATCHED},
+            {"address": 1, "vote": 1, "prediction": 1},
+        ).batch_size(chunk_size)
 
-        rewards = []
-        for vote in votes:
+        chunk = []
+        async for vote in cursor:
             address = vote.get("address")
-            pred_fraction = vote.get("prediction", 50) / 100.0
-            p_i_yes = max(pred_fraction, epsilon)
-            p_i_no = max(1 - pred_fraction, epsilon)
+            if address not in voter_set or address in seen:
+                continue
+            seen.add(address)
+            chunk.append(vote)
+            if len(chunk) >= chunk_size:
+                yield chunk
+                chunk = []
+        if chunk:
+            yield chunk
 
-            if vote.get("vote") is True:
-                term_a = math.log(f_yes / pbar_yes)
-            else:
-                term_a = math.log(f_no / pbar_no)
+    @staticmethod
+    def _tee_votes(votes: List[Dict]) -> List[Dict]:
+        """
+        Convert vote documents into the TA's JSON vote format.
+        """
+        tee_votes = []
+        for v in votes:
+            vote_str = "yes" if v["vote"] else "no"
+            tee_votes.append({
+                "user": v["address"],
+                "vote": vote_str,
+                "prediction_yes": float(v.get("prediction", 0.0)) / 100.0,
+                "prediction_no": (100 - float(v.get("prediction", 0.0))) / 100.0,
+            })
+        return tee_votes
+
+    @staticmethod
+    def http_client() -> httpx.AsyncClient:
+        """
+        Long-lived pooled HTTP client for the TEE service, created on first use.
+        """
+        global _http_client
+        if _http_client is None or _http_client.is_closed:
+            _http_client = httpx.AsyncClient(
+                base_url=TEE_CLIENT_URL,
+                timeout=TEE_HTTP_TIMEOUT,
+                limits=httpx.Limits(
+                    max_connections=TEE_HTTP_POOL_SIZE,
+                    max_keepalive_connections=TEE_HTTP_POOL_SIZE,
+                ),
+            )
+        return _http_client
+
+    @staticmethod
+    async def close():
+        global _http_client
+        if _http_client is not None:
+            await _http_client.aclose()
+            _http_client = None
+
+    @staticmethod
+    async def _run_tee(label: str, payload_dict: Dict) -> Dict:
+        """
+        Send one payload to the TEE /score endpoint, which streams it to the guest
+        and signs the result in a single round trip.
+
+        Results are content addressed: the signed result is stored in `tee_results`
+        under the sha256 of the canonical payload, so a retried finalize with
+        unchanged votes is answered from Mongo without re-running the TEE.
+
+        Returns the "user_scores" mapping; raises on any transport or TEE error.
+        """
+        canonical = _canonical_payload(payload_dict)
+        body = json.dumps(canonical, separators=(",", ":")).encode("utf-8")
+        payload_hash = hashlib.sha256(body).hexdigest()
+
+        db = get_database()
+        cached = await db["tee_results"].find_one({"_id": payload_hash})
+        if cached:
+            TEE_RESULT_CACHE.inc(result="hit")
+            logger.info(f"TEE result cache hit for '{label}' ({payload_hash[:12]})")
+            return _restore_users(cached["result"]["user_scores"], canonical["votes"])
+        TEE_RESULT_CACHE.inc(result="miss")
+
+        resp = await TeeClient._post_score(label, canonical, body)
+        resp.raise_for_status()
+        logger.info(f"TEE /score responded successfully for '{label}'")
+
+        tee_response = resp.json()
+        result_obj = tee_response.get("result", {})
+        user_scores = result_obj.get("user_scores", {})
+
+        if not user_scores:
+            raise RuntimeError(f"No 'user_scores' found in TEE response: {tee_response}")
+
+        logger.info(f"TEE returned scores for {len(user_scores)} users")
+
+        try:
+            await db["tee_results"].update_one(
+                {"_id": payload_hash},
+                {"$setOnInsert": {
+                    "label": label,
+                    "result": result_obj,
+                    "created_at": datetime.now(timezone.utc),
+                }},
+                upsert=True,
+            )
+        except Exception as e:
+            logger.warning(f"Failed to cache TEE result for '{label}': {e}")
+
+        return _restore_users(user_scores, canonical["votes"])
 
-            term_b = p_i_yes * math.log(pbar_yes / f_yes) + p_i_no * math.log(pbar_no / f_no)
+    @staticmethod
+    async def _post_score(label: str, canonical: Dict, json_body: bytes) -> httpx.Response:
+        """
+        POST a payload to /score, as the binary vote format when enabled and
+        representable, otherwise (or when the service rejects it) as JSON.
+        """
+        global _binary_votes_supported
+        client = TeeClient.http_client()
 
-            score = term_a + term_b
-            rewards.append({"address": address, "score": score})
+        if TEE_VOTE_FORMAT == "binary" and _binary_votes_supported:
+            try:
+                binary_body = encode_votes(canonical["votes"], canonical.get("aggregate"))
+            except ValueError as e:
+                logger.info(f"Sending '{label}' as JSON, votes not binary encodable: {e}")
+            else:
+                logger.info(f"Requesting score calculation from TEE /score for '{label}' ({len(binary_body)} bytes, binary)")
+                with timed("tee"):
+                    resp = await client.post("/score", content=binary_body, headers={"Content-Type": VOTES_CONTENT_TYPE})
+                if resp.status_code != 415:
+                    return resp
+                logger.warning("TEE service does not accept binary vote payloads; falling back to JSON")
+                _binary_votes_supported = False
 
-        logger.info(f"Computed rewards for proposal {proposal_id} based on {n} votes")
-        return rewards
+        logger.info(f"Requesting score calculation from TEE /score for '{label}' ({len(json_body)} bytes)")
+        with timed("tee"):
+            return await client.post("/score", content=json_body, headers={"Content-Type": "application/json"})
 
     @staticmethod
     async def compute_rewards_op_tee(proposal_id: str, voters: List[str]) -> List[Dict]:
@@ -73,70 +403,109 @@ class TeeClient:
         db = get_database()
         votes_cursor = db["votes"].find({
             "proposal_id": proposal_id,
-            "address": {"$in": voters}
+            "address": {"$in": voters},
+            **NOT_MISMATCHED,
         })
-        votes = await votes_cursor.to_list(None)
+        votes = _first_vote_per_voter(await votes_cursor.to_list(None))
         logger.info(f"Retrieved {len(votes)} votes for proposal {proposal_id}")
         if not votes:
             logger.info(f"No votes found for proposal {proposal_id} among {voters}.")
             return []
 
-        payload_dict = {"votes": []}
-        for v in votes:
-            vote_str = "yes" if v["vote"] else "no"
-            payload_dict["votes"].append({
-                "user": v["address"],
-                "vote": vote_str,
-                "prediction_yes": float(v.get("prediction", 0.0)) / 100.0,
-                "prediction_no": (100 - float(v.get("prediction", 0.0))) / 100.0,
-            })
+        payload_dict = {"votes": TeeClient._tee_votes(votes)}
+
+        try:
+            user_scores = await TeeClient._run_tee(proposal_id, payload_dict)
+        except Exception as e:
+            logger.error(f"TEE scoring failed for proposal {proposal_id}: {e}")
+            return []
 
-        json_bytes = io.BytesIO(json.dumps(payload_dict).encode("utf-8"))
+        return _tee_rewards(voters, user_scores)
 
-        TEE_BASE_URL = TEE_CLIENT_URL
-        upload_url = f"{TEE_BASE_URL}/upload"
-        vote_url = f"{TEE_BASE_URL}/vote"
+    @staticmethod
+    async def compute_rewards_op_tee_sharded(
+        proposal_id: str, voters: List[str], chunk_size: int = TEE_SHARD_SIZE
+    ) -> List[Dict]:
+        """
+        Sharded variant of compute_rewards_op_tee.
 
-        file_name = f"{proposal_id}.json"
+        The population aggregate is reduced locally from streamed chunks, then every
+        chunk is sent to the TEE together with that aggregate, so each TEE run stays
+        within the TA's voter and buffer limits.
+        """
+        logger.info(f"Starting sharded TEE scoring for proposal_id={proposal_id}, {len(voters)} voters")
 
-        async with httpx.AsyncClient() as client:
-            try:
-                files = {
-                    "file": (file_name, json_bytes, "application/json")
-                }
-                data = {"filename": file_name}
-                
-                logger.info(f"Uploading payload to TEE /upload: {file_name}")
-                resp = await client.post(upload_url, files=files, data=data)
-                resp.raise_for_status()
-                logger.info(f"Successfully uploaded JSON to TEE /upload as '{file_name}'.")
-            except Exception as e:
-                logger.error(f"Failed to upload JSON to TEE: {e}")
-                return []
+        aggregate = await TeeClient._population_aggregate(proposal_id, voters, chunk_size)
+
+        if aggregate.n == 0:
+            logger.info(f"No votes found for proposal {proposal_id} among {len(voters)} voters.")
+            return []
 
+        aggregate_dict = {
+            "total": aggregate.n,
+            "yes_count": aggregate.yes_count,
+            "sum_log_yes": aggregate.sum_log_yes,
+            "sum_log_no": aggregate.sum_log_no,
+        }
+
+        user_scores: Dict[str, int] = {}
+        index = 0
+        async for chunk in TeeClient._iter_vote_chunks(proposal_id, voters, chunk_size):
+            # aggregate goes first: the TA scans keys from the start of the buffer
+            payload_dict = {"aggregate": aggregate_dict, "votes": TeeClient._tee_votes(chunk)}
+            label = f"{proposal_id}.{index}"
             try:
-                payload = {"json_file_name": file_name}
-                logger.info(f"Requesting score calculation from TEE /vote for '{file_name}'")
-                resp = await client.post(vote_url, json=payload)
-                resp.raise_for_status()
-                logger.info(f"TEE /vote responded successfully for '{file_name}'")
+                user_scores.update(await TeeClient._run_tee(label, payload_dict))
             except Exception as e:
-                logger.error(f"TEE /vote request failed for '{file_name}': {e}")
+                logger.error(f"TEE scoring failed for shard '{label}': {e}")
                 return []
+            index += 1
 
-            tee_response = resp.json()
-            result_obj = tee_response.get("result", {})
-            user_scores = result_obj.get("user_scores", {})
+        logger.info(f"TEE scored proposal {proposal_id} in {index} shards ({aggregate.n} votes)")
+        return _tee_rewards(voters, user_scores)
+
+
+def _first_vote_per_voter(votes: List[Dict]) -> List[Dict]:
+    """
+    Keep the first stored vote of each (proposal, address). A duplicate would
+    count twice in the BTS population while only one of its scores is paid.
+    """
+    seen = set()
+    unique = []
+    for vote in votes:
+        key = (vote.get("proposal_id"), vote.get("address"))
+        if key in seen:
+            continue
+        seen.add(key)
+        unique.append(vote)
+    if len(unique) < len(votes):
+        logger.warning(f"Ignored {len(votes) - len(unique)} duplicate votes")
+    return unique
+
+
+def _canonical_payload(payload_dict: Dict) -> Dict:
+    """
+    Put a TEE payload in canonical form: votes sorted by user. Mongo returns votes
+    in no guaranteed order, and the TA's result does not depend on it, so the
+    sorted form is both what is sent and (as compact JSON) what is hashed.
+    """
+    canonical = dict(payload_dict)
+    canonical["votes"] = sorted(payload_dict.get("votes", []), key=lambda v: v["user"])
+    return canonical
 
-            if not user_scores:
-                logger.warning(f"No 'user_scores' found in TEE response: {tee_response}")
-                return []
 
-            logger.info(f"TEE returned scores for {len(user_scores)} users")
+def _restore_users(user_scores: Dict[str, int], votes: List[Dict]) -> Dict[str, int]:
+    """
+    Map the TEE's user keys back to the addresses as sent. The binary format
+    carries raw address bytes, so checksummed addresses come back lowercased.
+    """
+    users = {v["user"].lower(): v["user"] for v in votes}
+    return {users.get(user.lower(), user): score for user, score in user_scores.items()}
 
-            final_rewards = []
-            for address in voters:
-                score = user_scores.get(address, 0)
-                final_rewards.append({"address": address, "score": score})
 
-            return final_rewards
+def _tee_rewards(voters: List[str], user_scores: Dict[str, int]) -> List[Dict]:
+    """
+    Turn the TA's fixed-point scores (SCORE_SCALE micro-units) into rewards in voter order.
+    """
+    amounts = reward_amounts(user_scores.get(address, 0) for address in voters)
+    return [{"address": a, "score": amount} for a, amount in zip(voters, amounts)]
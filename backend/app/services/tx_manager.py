@@ -0,0 +1,322 @@
+import asyncio
+import functools
+import hashlib
+import json
+import math
+import time
+from datetime import datetime, timezone
+from typing import Any, Awaitable, Callable, Dict, List
+
+from web3.exceptions import TransactionNotFound, Web3RPCError
+
+from app.config import (
+    TX_BUMP_AFTER_BLOCKS,
+    TX_BUMP_PERCENT,
+    TX_MAX_BUMPS,
+    TX_MAX_GAS_PRICE_GWEI,
+    TX_POLL_INTERVAL,
+    TX_TIMEOUT,
+)
+from app.db.mongodb import get_database
+from app.metrics import TX_FEE_BUMPS
+from app.services.signer import TransactionSigner
+from app.timing import timed
+from app.utils import get_logger
+
+logger = get_logger(__name__)
+
+# Nodes reject a same-nonce replacement unless its fee is at least 10% higher.
+MIN_BUMP_PERCENT = 10
+GWEI = 10 ** 9
+
+# Fields of a built transaction kept in its record, to re-sign replacements
+# (also after a restart).
+REPLAY_FIELDS = ("to", "data", "value", "gas", "chainId")
+
+
+class TransactionStuck(RuntimeError):
+    """
+    Raised when a transaction is still unmined after TX_TIMEOUT seconds. Its
+    record stays pending, so sending the same call again keeps watching (and
+    bumping) it rather than using a new nonce; resume_pending picks it up
+    if the call is never sent again.
+    """
+
+
+def call_key(method: str, args: Dict[str, Any]) -> str:
+    """
+    Identity of a contract call: sending the same call again while an earlier
+    one is pending attaches to it instead of using a new nonce.
+    """
+    payload = json.dumps([method, args], sort_keys=True, default=str)
+    return hashlib.sha256(payload.encode()).hexdigest()
+
+
+class TransactionManager:
+    """
+    Sends backend wallet transactions and sees them through to a receipt.
+
+    Nonces are assigned under a lock from the larger of the node's pending
+    transaction count and the last nonce sent, so concurrent sends don't
+    collide. While a transaction waits, the manager polls receipts for every
+    hash in its replacement chain; once TX_BUMP_AFTER_BLOCKS blocks pass
+    without one, it re-signs the transaction with the same nonce
+    and a gas price TX_BUMP_PERCENT higher, up to TX_MAX_BUMPS times and
+    TX_MAX_GAS_PRICE_GWEI. Each transaction is recorded in the `transactions`
+    collection with its replacement chain:
+
+        {_id: "<sender>:<nonce>", key, method, status, nonce, gas_price,
+         txn: {to, data, value, gas, chainId},
+         attempts: [{hash, gas_price, block, sent_at}], mined_hash, ...}
+    """
+
+    def __init__(
+        self,
+        w3,
+        collection: Callable[[], Any] | None = None,
+        bump_after_blocks: int = TX_BUMP_AFTER_BLOCKS,
+        bump_percent: float = TX_BUMP_PERCENT,
+        max_bumps: int = TX_MAX_BUMPS,
+        max_gas_price: int = int(TX_MAX_GAS_PRICE_GWEI * GWEI),
+        poll_interval: float = TX_POLL_INTERVAL,
+        timeout: float = TX_TIMEOUT,
+    ):
+        self.w3 = w3
+        self._collection = collection or (lambda: get_database()["transactions"])
+        self.bump_after_blocks = bump_after_blocks
+        self.bump_percent = max(bump_percent, MIN_BUMP_PERCENT)
+        self.max_bumps = max_bumps
+        self.max_gas_price = max_gas_price
+        self.poll_interval = poll_interval
+        self.timeout = timeout
+
+        self._send_lock = asyncio.Lock()
+        self._next_nonce: int | None = None
+        self._in_flight: Dict[str, asyncio.Future] = {}
+
+    @property
+    def sender(self) -> str:
+        return self.w3.eth.default_account
+
+    async def send(self, fn, method: str, key: str, gas: int) -> Dict:
+        """
+        Send a contract function call and return its receipt.
+
+        A call with the same key as one still in flight (in this process) or
+        pending in the transactions collection (e.g. from before a restart)
+        waits for that transaction instead of sending another.
+        """
+        in_flight = self._in_flight.get(key)
+        if in_flight is not None:
+            return await asyncio.shield(in_flight)
+
+        async def run():
+            record = await self._collection().find_one({"key": key, "status": "pending"})
+            if record is None:
+                record = await self._broadcast_new(fn, method, key, gas)
+            else:
+                logger.info(f"Resuming pending {method} transaction nonce={record['nonce']}")
+            return await self._watch(record)
+
+        return await self._track(key, run)
+
+    async def resume_pending(self) -> Dict[str, int]:
+        """
+        Check on this wallet's pending transactions that no send is waiting
+        on, such as those left by a TransactionStuck call that is never
+        retried, or by a restart. A pending nonce holds up every later one, so
+        they are polled once each in nonce order, bumping the fee when due,
+        and the first one still unmined ends the pass: the pass never waits
+        for a receipt, and the next one picks up where it stopped. Returns how
+        many were mined, stuck or failed.
+        """
+        counts = {"mined": 0, "stuck": 0, "failed": 0}
+        records = [r for r in await self.pending() if r["_id"].startswith(f"{self.sender}:")]
+        for record in sorted(records, key=lambda r: r["nonce"]):
+            if record["key"] in self._in_flight:
+                continue
+            try:
+                await self._track(record["key"], functools.partial(self._poll_once, record))
+                counts["mined"] += 1
+            except TransactionStuck as e:
+                logger.info(f"Pending transaction not mined yet: {e}")
+                counts["stuck"] += 1
+                break
+            except Exception as e:
+                logger.error(f"Pending {record['method']} nonce={record['nonce']} failed: {e}")
+                counts["failed"] += 1
+        return counts
+
+    async def _track(self, key: str, run: Callable[[], Awaitable[Dict]]) -> Dict:
+        """
+        Run a send or resume of the call `key`, which later sends of the same
+        call attach to until it finishes.
+        """
+        future = asyncio.get_running_loop().create_future()
+        self._in_flight[key] = future
+        try:
+            receipt = await run()
+            future.set_result(receipt)
+            return receipt
+        except BaseException as e:
+            future.set_exception(e)
+            future.exception()  # nobody else may be waiting
+            raise
+        finally:
+            del self._in_flight[key]
+
+    async def _broadcast_new(self, fn, method: str, key: str, gas: int) -> Dict:
+        async with self._send_lock:
+            gas_price = await asyncio.to_thread(lambda: self.w3.eth.gas_price)
+            # the node's count catches up with transactions sent from this wallet
+            # elsewhere; ours covers sends it hasn't seen yet
+            pending_count = await asyncio.to_thread(self.w3.eth.get_transaction_count, self.sender, "pending")
+            nonce = max(pending_count, self._next_nonce or 0)
+            txn = await asyncio.to_thread(fn.build_transaction, {
+                "from": self.sender,
+                "nonce": nonce,
+                "gas": gas,
+                "gasPrice": gas_price,
+            })
+            try:
+                tx_hash = await self._sign_and_send(txn)
+            except Exception:
+                # the nonce may or may not be used now; read it from the node next time
+                self._next_nonce = None
+                raise
+            self._next_nonce = nonce + 1
+
+        block = await asyncio.to_thread(lambda: self.w3.eth.block_number)
+        now = datetime.now(timezone.utc)
+        record = {
+            "_id": f"{self.sender}:{nonce}",
+            "key": key,
+            "method": method,
+            "status": "pending",
+            "nonce": nonce,
+            "gas_price": gas_price,
+            "txn": {k: txn[k] for k in REPLAY_FIELDS if k in txn},
+            "attempts": [{"hash": tx_hash, "gas_price": gas_price, "block": block, "sent_at": now}],
+            "created_at": now,
+            "updated_at": now,
+        }
+        # a record for this nonce may remain from a transaction that was dropped
+        await self._collection().replace_one({"_id": record["_id"]}, record, upsert=True)
+        logger.info(f"Sent {method} tx: {tx_hash} nonce={nonce} gas_price={gas_price}")
+        return record
+
+    async def _sign_and_send(self, txn: Dict) -> str:
+        raw_transaction = await TransactionSigner.sign(txn)
+        tx_hash = await asyncio.to_thread(self.w3.eth.send_raw_transaction, raw_transaction)
+        return "0x" + bytes(tx_hash).hex()
+
+    async def _watch(self, record: Dict) -> Dict:
+        """
+        Poll until one transaction of the record's replacement chain is mined,
+        bumping the fee whenever the latest attempt sat bump_after_blocks blocks.
+        """
+        deadline = time.monotonic() + self.timeout
+        with timed("rpc_wait"):
+            while True:
+                receipt = await self._poll(record)
+                if receipt is not None:
+                    return receipt
+                if time.monotonic() > deadline:
+                    # left pending: the next send of the same call resumes watching it
+                    raise self._stuck(record)
+                await asyncio.sleep(self.poll_interval)
+
+    async def _poll_once(self, record: Dict) -> Dict:
+        receipt = await self._poll(record)
+        if receipt is None:
+            raise self._stuck(record)
+        return receipt
+
+    async def _poll(self, record: Dict) -> Dict | None:
+        """
+        One poll of the record's replacement chain: its receipt if mined,
+        otherwise None after bumping the fee if the latest attempt is due.
+        """
+        receipt = await self._find_receipt(record)
+        if receipt is None:
+            block = await asyncio.to_thread(lambda: self.w3.eth.block_number)
+            if block - record["attempts"][-1]["block"] >= self.bump_after_blocks:
+                if await self._nonce_used(record):
+                    # mined by a transaction we didn't see; give its receipt one more poll
+                    receipt = await self._find_receipt(record)
+                    if receipt is None:
+                        await self._finish(record, "replaced")
+                        raise RuntimeError(
+                            f"Nonce {record['nonce']} of {record['method']} was used by another transaction"
+                        )
+                elif len(record["attempts"]) <= self.max_bumps:
+                    await self._bump(record, block)
+        if receipt is not None:
+            await self._finish(record, "mined", mined_hash="0x" + bytes(receipt["transactionHash"]).hex())
+        return receipt
+
+    @staticmethod
+    def _stuck(record: Dict) -> TransactionStuck:
+        return TransactionStuck(
+            f"{record['method']} nonce={record['nonce']} unmined after "
+            f"{len(record['attempts']) - 1} fee bumps: {[a['hash'] for a in record['attempts']]}"
+        )
+
+    async def _find_receipt(self, record: Dict) -> Dict | None:
+        # newest first: a replacement is the likeliest to have been mined
+        for attempt in reversed(record["attempts"]):
+            try:
+                return await asyncio.to_thread(self.w3.eth.get_transaction_receipt, attempt["hash"])
+            except TransactionNotFound:
+                continue
+        return None
+
+    async def _nonce_used(self, record: Dict) -> bool:
+        mined_count = await asyncio.to_thread(self.w3.eth.get_transaction_count, self.sender, "latest")
+        return mined_count > record["nonce"]
+
+    async def _bump(self, record: Dict, block: int):
+        network_price = await asyncio.to_thread(lambda: self.w3.eth.gas_price)
+        gas_price = max(math.ceil(record["gas_price"] * (1 + self.bump_percent / 100)), network_price)
+        if self.max_gas_price:
+            gas_price = min(gas_price, self.max_gas_price)
+        if gas_price <= record["gas_price"]:
+            return  # at the cap: keep waiting on the current attempt
+
+        txn = dict(record["txn"], nonce=record["nonce"], gasPrice=gas_price)
+        txn["from"] = self.sender
+        try:
+            tx_hash = await self._sign_and_send(txn)
+        except (ValueError, Web3RPCError) as e:
+            # "nonce too low": an earlier attempt was just mined; found on the next poll
+            logger.warning(f"Replacement of {record['method']} nonce={record['nonce']} rejected: {e}")
+            return
+
+        attempt = {"hash": tx_hash, "gas_price": gas_price, "block": block, "sent_at": datetime.now(timezone.utc)}
+        record["attempts"].append(attempt)
+        record["gas_price"] = gas_price
+        TX_FEE_BUMPS.inc(method=record["method"])
+        logger.warning(
+            f"Bumped {record['method']} nonce={record['nonce']} to gas_price={gas_price} "
+            f"(attempt {len(record['attempts'])}): {tx_hash}"
+        )
+        try:
+            await self._collection().update_one(
+                {"_id": record["_id"]},
+                {"$push": {"attempts": attempt}, "$set": {"gas_price": gas_price, "updated_at": attempt["sent_at"]}},
+            )
+        except Exception as e:
+            logger.error(f"Failed to record replacement {tx_hash}: {e}")
+
+    async def _finish(self, record: Dict, status: str, mined_hash: str | None = None):
+        record["status"] = status
+        update = {"status": status, "updated_at": datetime.now(timezone.utc)}
+        if mined_hash is not None:
+            update["mined_hash"] = mined_hash
+        try:
+            await self._collection().update_one({"_id": record["_id"]}, {"$set": update})
+        except Exception as e:
+            logger.error(f"Failed to record {status} transaction {record['_id']}: {e}")
+
+    async def pending(self) -> List[Dict]:
+        return await self._collection().find({"status": "pending"}).to_list(None)
@@ -0,0 +1,126 @@
+import asyncio
+import json
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Tuple
+
+from app.config import VIEW_CACHE_HEAD_TTL, VIEW_CACHE_MAX_ENTRIES
+from app.metrics import CACHE_REQUESTS
+
+Key = Tuple[str, str, str]  # (contract address, method, args as JSON)
+
+
+class ViewCache:
+    """
+    Results of contract view calls, tagged with the block they were read at.
+
+    A view is read at the current head (block_identifier=head) and served from
+    the cache until the head moves, so any number of identical reads within a
+    block cost one eth_call. The head is polled at most every
+    VIEW_CACHE_HEAD_TTL seconds, which bounds how stale a result can be; mined
+    transactions the backend sees (its own and the ones it relays) move it at
+    once through observe(), which also drops the entries of the proposal the
+    transaction touched.
+    """
+
+    def __init__(self, w3, head_ttl: float = VIEW_CACHE_HEAD_TTL, max_entries: int = VIEW_CACHE_MAX_ENTRIES):
+        self.w3 = w3
+        self.head_ttl = head_ttl
+        self.max_entries = max_entries
+        self._head: int | None = None
+        self._head_checked = 0.0
+        self._head_loading: asyncio.Future | None = None
+        # key -> (block, proposal id, result)
+        self._entries: "OrderedDict[Key, Tuple[int, str | None, Any]]" = OrderedDict()
+        # (key, block) -> (future, proposal id) of the reads in flight
+        self._loading: Dict[Tuple[Key, int], Tuple[asyncio.Future, str | None]] = {}
+
+    async def head(self) -> int:
+        if self._head is not None and time.monotonic() - self._head_checked < self.head_ttl:
+            return self._head
+        if self._head_loading is not None:
+            return await asyncio.shield(self._head_loading)
+
+        future = asyncio.get_running_loop().create_future()
+        self._head_loading = future
+        try:
+            block = await asyncio.to_thread(lambda: self.w3.eth.block_number)
+            self._head_checked = time.monotonic()
+            self._advance(block)
+            future.set_result(self._head)
+            return self._head
+        except BaseException as e:
+            future.set_exception(e)
+            future.exception()
+            raise
+        finally:
+            self._head_loading = None
+
+    async def call(self, contract, method: str, args: "Dict[str, Any] | tuple" = (), proposal_id: str | None = None) -> Any:
+        """
+        contract.functions.<method>(args).call() at the head block. args is a
+        dict of named inputs or a tuple of positional ones (for getters with
+        unnamed inputs); proposal_id names the proposal the result belongs to.
+        """
+        key = (contract.address, method, json.dumps(args, sort_keys=True, default=str))
+        block = await self.head()
+
+        entry = self._entries.get(key)
+        if entry is not None and entry[0] == block:
+            self._entries.move_to_end(key)
+            CACHE_REQUESTS.inc(namespace="views", result="hit")
+            return entry[2]
+
+        loading = self._loading.get((key, block))
+        if loading is not None:
+            CACHE_REQUESTS.inc(namespace="views", result="coalesced")
+            return await asyncio.shield(loading[0])
+
+        CACHE_REQUESTS.inc(namespace="views", result="miss")
+        future = asyncio.get_running_loop().create_future()
+        self._loading[(key, block)] = (future, proposal_id)
+        try:
+            fn = getattr(contract.functions, method)
+            bound = fn(**args) if isinstance(args, dict) else fn(*args)
+            # to_thread (unlike run_in_executor) carries the request context for timings
+            result = await asyncio.to_thread(lambda: bound.call(block_identifier=block))
+            # not if the head moved or the proposal changed meanwhile
+            if block == self._head and self._in_flight(key, block) is future:
+                self._entries[key] = (block, proposal_id, result)
+                self._entries.move_to_end(key)
+                while len(self._entries) > self.max_entries:
+                    self._entries.popitem(last=False)
+            future.set_result(result)
+            return result
+        except BaseException as e:
+            future.set_exception(e)
+            future.exception()
+            raise
+        finally:
+            if self._in_flight(key, block) is future:
+                del self._loading[(key, block)]
+
+    def observe(self, block: int, proposal_id: str | None = None):
+        """
+        A transaction was mined in block, touching proposal_id.
+        """
+        self._advance(block)
+        if proposal_id is not None:
+            self.invalidate(proposal_id)
+
+    def invalidate(self, proposal_id: str):
+        for key in [k for k, (_, pid, _) in self._entries.items() if pid == proposal_id]:
+            del self._entries[key]
+        # reads in flight may predate the change; they still answer their
+        # callers but aren't stored
+        for loading_key in [k for k, (_, pid) in self._loading.items() if pid == proposal_id]:
+            del self._loading[loading_key]
+
+    def _in_flight(self, key: Key, block: int) -> asyncio.Future | None:
+        loading = self._loading.get((key, block))
+        return loading[0] if loading is not None else None
+
+    def _advance(self, block: int):
+        if self._head is None or block > self._head:
+            self._head = block
+            self._entries.clear()
@@ -0,0 +1,149 @@
+import asyncio
+from typing import Any, Awaitable, Callable, Dict, List, Tuple
+
+from pymongo import WriteConcern
+from pymongo.errors import BulkWriteError
+
+from app.config import VOTE_BATCH_SIZE, VOTE_BATCH_DELAY_MS, VOTE_QUEUE_LIMIT
+from app.db.mongodb import get_database
+from app.services.proposal_stats import ProposalStats
+from app.utils import get_logger
+
+logger = get_logger(__name__)
+
+# Votes are acknowledged only once journaled, matching what a client of the old
+# per-request insert_one could rely on after a crash.
+VOTE_WRITE_CONCERN = WriteConcern(w=1, j=True)
+
+DUPLICATE_KEY = 11000
+
+
+def vote_id(proposal_id: str, address: str) -> str:
+    """
+    _id of a signed vote. One per voter and proposal, so a vote retried after
+    an unconfirmed write is stored once.
+    """
+    return f"{proposal_id}:{address}"
+
+
+class IngestQueueFull(Exception):
+    """
+    Raised by VoteIngestBuffer.submit when the buffer is at VOTE_QUEUE_LIMIT.
+    """
+
+
+class VoteIngestBuffer:
+    """
+    Group commit for vote documents.
+
+    Concurrent submit() calls are coalesced into insert_many batches, flushed once
+    max_batch documents are queued or max_delay_ms after the first one arrived.
+    Each caller resumes only when its own document has been written (or failed).
+    A duplicate _id counts as written: the vote was stored by an earlier
+    attempt. on_written, if given, is awaited with the documents of each batch
+    that this batch stored, before their callers resume.
+    """
+
+    def __init__(
+        self,
+        collection: Callable[[], Any] | None = None,
+        max_batch: int = VOTE_BATCH_SIZE,
+        max_delay_ms: float = VOTE_BATCH_DELAY_MS,
+        max_queue: int = VOTE_QUEUE_LIMIT,
+        on_written: Callable[[List[Dict]], Awaitable[None]] | None = None,
+    ):
+        self._collection = collection or (
+            lambda: get_database()["votes"].with_options(write_concern=VOTE_WRITE_CONCERN)
+        )
+        self.max_batch = max_batch
+        self.max_delay = max_delay_ms / 1000.0
+        self.max_queue = max_queue
+        self.on_written = on_written
+
+        self._pending: List[Tuple[Dict, asyncio.Future]] = []
+        self._in_flight = 0
+        self._timer: asyncio.TimerHandle | None = None
+        self._flushes: set[asyncio.Task] = set()
+
+    @property
+    def depth(self) -> int:
+        return len(self._pending) + self._in_flight
+
+    async def submit(self, doc: Dict) -> None:
+        if self.depth >= self.max_queue:
+            raise IngestQueueFull(f"Vote ingest queue is full ({self.depth} documents)")
+
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        self._pending.append((doc, future))
+
+        if len(self._pending) >= self.max_batch:
+            self._start_flush()
+        elif self._timer is None:
+            self._timer = loop.call_later(self.max_delay, self._start_flush)
+
+        await future
+
+    def _start_flush(self):
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+
+        while self._pending:
+            batch = self._pending[:self.max_batch]
+            del self._pending[:self.max_batch]
+            self._in_flight += len(batch)
+            task = asyncio.ensure_future(self._write(batch))
+            self._flushes.add(task)
+            task.add_done_callback(self._flushes.discard)
+
+    async def _write(self, batch: List[Tuple[Dict, asyncio.Future]]):
+        failed: Dict[int, Exception] = {}
+        duplicates = set()
+        unconfirmed: Exception | None = None
+        try:
+            await self._collection().insert_many([doc for doc, _ in batch], ordered=False)
+        except BulkWriteError as e:
+            for error in e.details.get("writeErrors", []):
+                if error.get("code") == DUPLICATE_KEY:
+                    duplicates.add(error["index"])
+                else:
+                    failed[error["index"]] = RuntimeError(error.get("errmsg", "write failed"))
+            if e.details.get("writeConcernErrors"):
+                # written but not confirmed durable: fail the requests, whose
+                # retries find the votes already stored
+                unconfirmed = e
+        except Exception as e:
+            logger.error(f"Vote batch of {len(batch)} failed: {e}")
+            failed = {i: e for i in range(len(batch))}
+        finally:
+            self._in_flight -= len(batch)
+
+        written = [doc for i, (doc, _) in enumerate(batch) if i not in failed and i not in duplicates]
+        if written and self.on_written is not None:
+            try:
+                await self.on_written(written)
+            except Exception as e:
+                # the votes are stored; ProposalStats.rebuild can repair the tallies
+                logger.error(f"Post-write hook failed for {len(written)} votes: {e}")
+
+        for i, (_, future) in enumerate(batch):
+            if future.done():
+                continue
+            if i in failed:
+                future.set_exception(failed[i])
+            elif unconfirmed is not None and i not in duplicates:
+                future.set_exception(unconfirmed)
+            else:
+                future.set_result(None)
+
+    async def drain(self):
+        """
+        Flush everything still queued and wait for in-flight batches.
+        """
+        self._start_flush()
+        if self._flushes:
+            await asyncio.gather(*self._flushes, return_exceptions=True)
+
+
+vote_buffer = VoteIngestBuffer(on_written=ProposalStats.record_votes)
@@ -2,12 +2,13 @@ import os
 import httpx
 import logging
 from typing import Dict, Any
-from app.config import WORLDCOIN_APP_ID
+from app.config import WORLDCOIN_API_URL, WORLDCOIN_APP_ID
+from app.timing import timed
 
 logger = logging.getLogger(__name__)
 
 class Worldchain:
-    BASE_URL = "https://developer.worldcoin.org"
+    BASE_URL = WORLDCOIN_API_URL
     APP_ID = WORLDCOIN_APP_ID  # must be set in your environment
     HEADERS = {
         "Content-Type": "application/json",
@@ -33,8 +34,9 @@ class Worldchain:
 
         url = f"{Worldchain.BASE_URL}/api/v2/verify/{Worldchain.APP_ID}"
         try:
-            async with httpx.AsyncClient() as client:
-                resp = await client.post(url, json=payload, headers=Worldchain.HEADERS, timeout=10.0)
+            with timed("worldid"):
+                async with httpx.AsyncClient() as client:
+                    resp = await client.post(url, json=payload, headers=Worldchain.HEADERS, timeout=10.0)
                 if resp.status_code == 200:
                     return True
                 logger.warning(f"WorldID verification failed [{resp.status_code}]: {resp.text}")
@@ -0,0 +1,158 @@
+import asyncio
+
+import httpx
+from eth_account import Account
+from fastapi import Depends, FastAPI
+from fastapi.testclient import TestClient
+
+from app.routes.middleware import WorldIDMiddleware
+from app.services import admission as admission_module
+from app.services.admission import AdmissionControl, MemoryAdmissionBackend, admit
+
+KEY = "0x" + "11" * 32
+
+
+def signed_txn(nonce: int = 0) -> str:
+    txn = {"to": "0x" + "22" * 20, "value": 0, "gas": 21000, "gasPrice": 10 ** 9, "nonce": nonce, "chainId": 1}
+    return "0x" + Account.sign_transaction(txn, KEY).raw_transaction.hex()
+
+
+def make_app(monkeypatch, handler=None, verify=None, **limits):
+    defaults = dict(ADMISSION_RATE=1, ADMISSION_BURST=2, ADMISSION_IP_RATE=1, ADMISSION_IP_BURST=5,
+                    ADMISSION_CHAIN_CONCURRENCY=10)
+    defaults.update(limits)
+    for name, value in defaults.items():
+        monkeypatch.setattr(admission_module, name, value)
+    monkeypatch.setattr(admission_module, "admission", AdmissionControl(MemoryAdmissionBackend()))
+
+    app = FastAPI()
+    handled = []
+    if verify is not None:
+        async def verify_worldid(payload):
+            return verify
+        monkeypatch.setattr("app.routes.middleware.Worldchain.verify_worldid", verify_worldid)
+        app.add_middleware(WorldIDMiddleware)
+
+    @app.post("/api/vote", dependencies=[Depends(admit("vote"))])
+    async def vote(body: dict):
+        handled.append(body)
+        if handler is not None:
+            await handler(body)
+        return {"message": "success"}
+
+    return app, handled
+
+
+def test_buckets_refill_at_their_rate():
+    backend = MemoryAdmissionBackend()
+
+    async def run():
+        waits = [await backend.take("k", rate=10, burst=2) for _ in range(3)]
+        await asyncio.sleep(0.1)
+        return waits, await backend.take("k", rate=10, burst=2)
+
+    waits, after_refill = asyncio.run(run())
+    assert waits[:2] == [0, 0]
+    assert 0 < waits[2] <= 0.1
+    assert after_refill == 0
+
+
+def test_memory_backend_forgets_least_recently_used_buckets():
+    backend = MemoryAdmissionBackend(max_keys=2)
+
+    async def run():
+        await backend.take("a", rate=0.001, burst=1)
+        await backend.take("b", rate=0.001, burst=1)
+        await backend.take("c", rate=0.001, burst=1)
+        return await backend.take("a", rate=0.001, burst=1), await backend.take("c", rate=0.001, burst=1)
+
+    forgotten, kept = asyncio.run(run())
+    assert forgotten == 0
+    assert kept > 0
+
+
+def test_identities_are_limited_before_the_handler(monkeypatch):
+    app, handled = make_app(monkeypatch, verify=True)
+    client = TestClient(app)
+
+    def vote(nullifier):
+        return client.post("/api/vote", json={"verifyPayload": {"nullifier_hash": nullifier}})
+
+    assert [vote("0xA").status_code for _ in range(3)] == [200, 200, 429]
+    limited = vote("0xa")
+    assert limited.status_code == 429
+    assert limited.headers["Retry-After"] == "1"
+    assert "nullifier" in limited.json()["detail"]
+
+    # another identity from the same IP, until the IP bucket (burst 5) is empty
+    assert [vote("0xB").status_code for _ in range(2)] == [200, 429]
+    assert "ip" in vote("0xC").json()["detail"]
+    assert len(handled) == 3
+
+
+def test_unverified_nullifiers_are_not_charged(monkeypatch):
+    app, handled = make_app(monkeypatch)
+    victim = TestClient(app, client=("10.0.0.1", 1))
+    attacker = TestClient(app, client=("10.0.0.2", 1))
+
+    def vote(client):
+        return client.post("/api/vote", json={"verifyPayload": {"nullifier_hash": "0xA"}})
+
+    # without World ID verification, someone else's nullifier only costs the sender's IP
+    assert [vote(attacker).status_code for _ in range(6)] == [200] * 5 + [429]
+    assert "ip" in vote(attacker).json()["detail"]
+    assert vote(victim).status_code == 200
+
+
+def test_signing_wallet_is_an_identity(monkeypatch):
+    app, handled = make_app(monkeypatch, ADMISSION_IP_BURST=100)
+    client = TestClient(app)
+    # a new nullifier each time doesn't help when the same wallet signs
+    statuses = [
+        client.post("/api/vote", json={"signed_txn": signed_txn(i), "verifyPayload": {"nullifier_hash": str(i)}}).status_code
+        for i in range(3)
+    ]
+    assert statuses == [200, 200, 429]
+
+
+def test_replayed_transactions_do_not_charge_their_wallet(monkeypatch):
+    app, handled = make_app(monkeypatch)
+    victim = TestClient(app, client=("10.0.0.1", 1))
+    attacker = TestClient(app, client=("10.0.0.2", 1))
+
+    assert victim.post("/api/vote", json={"signed_txn": signed_txn(0)}).status_code == 200
+    # the victim's transaction is public once sent: resending it only costs the attacker's IP
+    statuses = [attacker.post("/api/vote", json={"signed_txn": signed_txn(0)}).status_code for _ in range(6)]
+    assert statuses == [200] * 5 + [429]
+    assert victim.post("/api/vote", json={"signed_txn": signed_txn(1)}).status_code == 200
+
+
+def test_chain_submissions_are_capped(monkeypatch):
+    release = asyncio.Event()
+
+    async def wait_for_receipt(body):
+        if body.get("signed_txn"):
+            await release.wait()
+
+    app, handled = make_app(monkeypatch, handler=wait_for_receipt, ADMISSION_CHAIN_CONCURRENCY=1,
+                            ADMISSION_BURST=10, ADMISSION_IP_BURST=100)
+
+    async def run():
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+            first = asyncio.ensure_future(client.post("/api/vote", json={"signed_txn": signed_txn(0)}))
+            await asyncio.sleep(0.05)
+            second = await client.post("/api/vote", json={"signed_txn": signed_txn(1)})
+            without_txn = await client.post("/api/vote", json={"vote": True})
+            release.set()
+            first = await first
+            third = await client.post("/api/vote", json={"signed_txn": signed_txn(2)})
+            return first.status_code, second, without_txn.status_code, third.status_code
+
+    first, second, without_txn, third = asyncio.run(run())
+    assert first == 200
+    assert second.status_code == 503
+    assert second.headers["Retry-After"] == "1"
+    assert without_txn == 200
+    # the slot is released when the first request finishes
+    assert third == 200
@@ -0,0 +1,93 @@
+import asyncio
+from datetime import datetime, timedelta, timezone
+
+from app.db.memory import MemoryClient
+from app.jobs import scheduler
+from app.services import archive
+from app.services.archive import ArchiveStore
+
+
+def test_finished_proposals_move_to_the_archive(monkeypatch):
+    old = datetime.now(timezone.utc) - timedelta(days=30)
+    db = MemoryClient()["test"]
+    monkeypatch.setattr(scheduler, "get_database", lambda: db)
+    monkeypatch.setattr(archive, "get_database", lambda: db)
+
+    async def ids(collection):
+        return [d["_id"] for d in await db[collection].find().to_list(None)]
+
+    async def run():
+        await db["proposals"].insert_many([
+            {"_id": "done", "phase": "Finished", "updated_at": old, "address": "0xT"},
+            {"_id": "live", "phase": "Commit", "updated_at": old, "address": "0xT"},
+        ])
+        await db["votes"].insert_many([
+            {"_id": "v1", "proposal_id": "done", "address": "0xA", "vote": True},
+            {"_id": "v2", "proposal_id": "live", "address": "0xA", "vote": False},
+        ])
+        await db["rewards"].insert_many([
+            {"_id": "done:0xA", "proposal_id": "done", "address": "0xA", "amount": 5, "claimed_at": old},
+            {"_id": "done:0xB", "proposal_id": "done", "address": "0xB", "amount": 7, "claimed_at": None},
+        ])
+
+        await scheduler.archive_finished_job()
+
+        assert await ids("proposals") == ["live"]
+        assert await ids("votes") == ["v2"]
+        # unclaimed rewards stay hot
+        assert await ids("rewards") == ["done:0xB"]
+        assert await ids("votes_archive") == ["v1"]
+
+        # archived documents are compressed but keep their query keys
+        archived = await db["votes_archive"].find_one({"_id": "v1"})
+        assert archived["proposal_id"] == "done"
+        assert "z" in archived
+
+    asyncio.run(run())
+
+    proposal = archive.unpack(asyncio.run(db["proposals_archive"].find_one({"_id": "done"})))
+    assert proposal["address"] == "0xT"
+    votes = asyncio.run(db["votes_archive"].find({"proposal_id": "done"}).to_list(None))
+    assert [archive.unpack(v)["vote"] for v in votes] == [True]
+    rewards = asyncio.run(ArchiveStore.find_rewards("0xA"))
+    assert [r["amount"] for r in rewards] == [5]
+
+
+def test_rewards_claimed_after_archiving_are_swept(monkeypatch):
+    old = datetime.now(timezone.utc) - timedelta(days=30)
+    db = MemoryClient()["test"]
+    monkeypatch.setattr(scheduler, "_last_sweep", None)
+    monkeypatch.setattr(scheduler, "get_database", lambda: db)
+    monkeypatch.setattr(archive, "get_database", lambda: db)
+
+    async def ids(collection):
+        return sorted(d["_id"] for d in await db[collection].find().to_list(None))
+
+    async def run():
+        await db["proposals"].insert_many([
+            {"_id": "done", "phase": "Finished", "updated_at": old, "address": "0xT"},
+            {"_id": "recent", "phase": "Finished", "updated_at": datetime.now(timezone.utc), "address": "0xT"},
+        ])
+        await db["rewards"].insert_many([
+            {"_id": "done:0xB", "proposal_id": "done", "address": "0xB", "amount": 7, "claimed_at": None},
+            {"_id": "recent:0xB", "proposal_id": "recent", "address": "0xB", "amount": 3, "claimed_at": None},
+        ])
+        await scheduler.archive_finished_job()
+        assert await ids("rewards") == ["done:0xB", "recent:0xB"]
+
+        now = datetime.now(timezone.utc)
+        await db["rewards"].update_many({}, {"$set": {"claimed_at": now}})
+        # not swept again until ARCHIVE_SWEEP_SECONDS have passed
+        await scheduler.archive_finished_job()
+        assert await ids("rewards") == ["done:0xB", "recent:0xB"]
+
+        monkeypatch.setattr(scheduler, "ARCHIVE_SWEEP_SECONDS", 0)
+        await scheduler.archive_finished_job()
+
+        # the claim on the archived proposal follows it; the live proposal's stays hot
+        assert await ids("rewards") == ["recent:0xB"]
+        assert await ids("rewards_archive") == ["done:0xB"]
+
+    asyncio.run(run())
+    rewards = asyncio.run(ArchiveStore.find_rewards("0xB"))
+    assert sorted(r["amount"] for r in rewards) == [3, 7]
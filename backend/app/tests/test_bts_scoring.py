@@ -0,0 +1,253 @@
+import math
+import asyncio
+
+import numpy as np
+
+from app.services import proposal_stats, tee_client
+from app.services.bts_scoring import (
+    EPSILON,
+    BtsAggregate,
+    REWARD_UNIT,
+    bts_scores,
+    fixed_point_scores,
+    reward_amounts,
+    segment_ids_for,
+    vote_arrays,
+)
+from app.services.tee_client import TeeClient
+
+
+def reference_scores(votes, predictions):
+    # Straight port of the original per-vote loop in TeeClient.compute_rewards
+    n = len(votes)
+    count_yes = sum(1 for v in votes if v)
+    f_yes = max(count_yes / n, EPSILON)
+    f_no = max((n - count_yes) / n, EPSILON)
+
+    sum_log_yes = sum(math.log(max(p / 100.0, EPSILON)) for p in predictions)
+    sum_log_no = sum(math.log(max(1 - p / 100.0, EPSILON)) for p in predictions)
+    pbar_yes = math.exp(sum_log_yes / n)
+    pbar_no = math.exp(sum_log_no / n)
+
+    scores = []
+    for v, p in zip(votes, predictions):
+        p_yes = max(p / 100.0, EPSILON)
+        p_no = max(1 - p / 100.0, EPSILON)
+        term_a = math.log(f_yes / pbar_yes) if v else math.log(f_no / pbar_no)
+        term_b = p_yes * math.log(pbar_yes / f_yes) + p_no * math.log(pbar_no / f_no)
+        scores.append(term_a + term_b)
+    return scores
+
+
+def test_matches_reference_single_proposal():
+    rng = np.random.default_rng(7)
+    votes = rng.random(200) < 0.6
+    predictions = rng.integers(0, 101, 200)
+
+    got = bts_scores(votes, predictions)
+    expected = reference_scores(votes.tolist(), predictions.tolist())
+    assert np.allclose(got, expected, rtol=1e-9, atol=1e-9)
+
+
+def test_segments_are_scored_independently():
+    a_votes, a_preds = [True, True, False], [70, 40, 10]
+    b_votes, b_preds = [False, False, True, True], [0, 100, 55, 50]
+
+    got = bts_scores(
+        np.array(a_votes + b_votes),
+        np.array(a_preds + b_preds),
+        segment_ids_for([3, 4]),
+        2,
+    )
+    expected = reference_scores(a_votes, a_preds) + reference_scores(b_votes, b_preds)
+    assert np.allclose(got, expected)
+
+
+def test_unanimous_vote_is_finite():
+    got = bts_scores(np.array([True, True, True]), np.array([100, 100, 90]))
+    assert np.all(np.isfinite(got))
+
+
+def test_fixed_point_rewards_are_deterministic_and_non_negative():
+    scores = np.array([1.2345674, -0.5, 0.0000004, 2.0])
+    fixed = fixed_point_scores(scores)
+    assert fixed.tolist() == [1234567, -500000, 0, 2000000]
+    assert reward_amounts(fixed) == [1234567 * REWARD_UNIT, 0, 0, 2000000 * REWARD_UNIT]
+    assert all(isinstance(a, int) for a in reward_amounts(fixed))
+
+
+def test_merged_chunk_aggregates_match_one_shot_scoring():
+    rng = np.random.default_rng(11)
+    votes = rng.random(1000) < 0.3
+    predictions = rng.integers(0, 101, 1000)
+
+    aggregate = BtsAggregate()
+    for start in range(0, 1000, 128):
+        aggregate = aggregate.merge(BtsAggregate.from_chunk(votes[start:start + 128], predictions[start:start + 128]))
+    assert aggregate.n == 1000
+    assert aggregate.yes_count == int(votes.sum())
+
+    chunked = np.concatenate([
+        aggregate.score_chunk(votes[start:start + 128], predictions[start:start + 128])
+        for start in range(0, 1000, 128)
+    ])
+    assert np.allclose(chunked, bts_scores(votes, predictions), rtol=1e-9, atol=1e-9)
+
+
+class FakeCursor:
+    def __init__(self, data):
+        self.data = data
+
+    def batch_size(self, size):
+        return self
+
+    async def to_list(self, length=None):
+        return self.data
+
+    def __aiter__(self):
+        return self._iterate()
+
+    async def _iterate(self):
+        for doc in self.data:
+            yield doc
+
+
+class FakeVotesCollection:
+    def __init__(self, data):
+        self.data = data
+
+    def find(self, query, projection=None):
+        if "$or" not in query:
+            return FakeCursor([d for d in self.data if d["proposal_id"] == query["proposal_id"]])
+        results = []
+        for clause in query["$or"]:
+            results += [
+                d for d in self.data
+                if d["proposal_id"] == clause["proposal_id"] and d["address"] in clause["address"]["$in"]
+            ]
+        return FakeCursor(results)
+
+
+class FakeStatsCollection:
+    def __init__(self, votes):
+        aggregate = BtsAggregate.from_chunk(*vote_arrays(votes))
+        self.doc = {
+            "vote_count": aggregate.n,
+            "yes_count": aggregate.yes_count,
+            "sum_log_yes": aggregate.sum_log_yes,
+            "sum_log_no": aggregate.sum_log_no,
+        }
+
+    async def find_one(self, query):
+        return self.doc
+
+
+def test_compute_rewards_many_keeps_voter_order(monkeypatch):
+    votes = [
+        {"proposal_id": "p1", "address": "0xA", "vote": True, "prediction": 80},
+        {"proposal_id": "p1", "address": "0xB", "vote": False, "prediction": 30},
+        {"proposal_id": "p1", "address": "0xC", "vote": True, "prediction": 60},
+        {"proposal_id": "p2", "address": "0xD", "vote": False, "prediction": 20},
+    ]
+    monkeypatch.setattr(tee_client, "get_database", lambda: {"votes": FakeVotesCollection(votes)})
+
+    results = asyncio.run(TeeClient.compute_rewards_many({
+        "p1": ["0xC", "0xMissing", "0xA", "0xB"],
+        "p2": ["0xD"],
+        "p3": ["0xE"],
+    }))
+
+    assert [r["address"] for r in results["p1"]] == ["0xC", "0xMissing", "0xA", "0xB"]
+    assert results["p1"][1]["score"] == 0
+    assert results["p3"] == []
+
+    expected = reward_amounts(fixed_point_scores(reference_scores([True, False, True], [80, 30, 60])))
+    by_address = {r["address"]: r["score"] for r in results["p1"]}
+    assert [by_address["0xA"], by_address["0xB"], by_address["0xC"]] == expected
+
+
+def test_duplicate_votes_are_scored_once(monkeypatch):
+    votes = [
+        {"proposal_id": "p1", "address": "0xA", "vote": True, "prediction": 80},
+        {"proposal_id": "p1", "address": "0xB", "vote": False, "prediction": 30},
+        {"proposal_id": "p1", "address": "0xA", "vote": False, "prediction": 10},
+        {"proposal_id": "p1", "address": "0xC", "vote": True, "prediction": 60},
+    ]
+    voters = ["0xA", "0xB", "0xC"]
+    monkeypatch.setattr(tee_client, "get_database", lambda: {"votes": FakeVotesCollection(votes)})
+    monkeypatch.setattr(proposal_stats, "get_database", lambda: {"proposal_stats": FakeStatsCollection(votes)})
+
+    single = asyncio.run(TeeClient.compute_rewards("p1", voters))
+    sharded = asyncio.run(TeeClient.compute_rewards_sharded("p1", voters, chunk_size=2))
+
+    # the duplicate neither joins the population nor replaces 0xA's first vote
+    expected = reward_amounts(fixed_point_scores(reference_scores([True, False, True], [80, 30, 60])))
+    assert [r["score"] for r in single] == expected
+    assert all(abs(a["score"] - b) <= REWARD_UNIT for a, b in zip(sharded, expected))
+
+
+def test_compute_rewards_sharded_matches_single_pass(monkeypatch):
+    rng = np.random.default_rng(3)
+    votes = [
+        {"proposal_id": "big", "address": f"0x{i:040x}", "vote": bool(v), "prediction": int(p)}
+        for i, (v, p) in enumerate(zip(rng.random(500) < 0.5, rng.integers(0, 101, 500)))
+    ]
+    # a vote from an address that is not an on-chain voter must be ignored
+    votes.append({"proposal_id": "big", "address": "0xNotAVoter", "vote": True, "prediction": 99})
+    voters = [v["address"] for v in votes[:-1]]
+    monkeypatch.setattr(tee_client, "get_database", lambda: {"votes": FakeVotesCollection(votes)})
+    # proposal_stats counts the stray vote too, so the aggregate is streamed instead
+    monkeypatch.setattr(proposal_stats, "get_database", lambda: {"proposal_stats": FakeStatsCollection(votes)})
+
+    sharded = asyncio.run(TeeClient.compute_rewards_sharded("big", voters, chunk_size=64))
+    single = asyncio.run(TeeClient.compute_rewards("big", voters))
+
+    assert [r["address"] for r in sharded] == voters
+    # Summation order differs between the passes, allow one micro-unit of rounding
+    assert all(abs(a["score"] - b["score"]) <= REWARD_UNIT for a, b in zip(sharded, single))
+
+
+def test_compute_rewards_sharded_reads_aggregate_from_proposal_stats(monkeypatch):
+    rng = np.random.default_rng(4)
+    votes = [
+        {"proposal_id": "big", "address": f"0x{i:040x}", "vote": bool(v), "prediction": int(p)}
+        for i, (v, p) in enumerate(zip(rng.random(300) < 0.4, rng.integers(0, 101, 300)))
+    ]
+    voters = [v["address"] for v in votes]
+    passes = []
+
+    class CountingVotes(FakeVotesCollection):
+        def find(self, query, projection=None):
+            passes.append(query)
+            return super().find(query, projection)
+
+    monkeypatch.setattr(tee_client, "get_database", lambda: {"votes": CountingVotes(votes)})
+    monkeypatch.setattr(proposal_stats, "get_database", lambda: {"proposal_stats": FakeStatsCollection(votes)})
+
+    sharded = asyncio.run(TeeClient.compute_rewards_sharded("big", voters, chunk_size=64))
+    # the voter check reads addresses and the scoring pass reads votes; the
+    # aggregate came from proposal_stats
+    assert len(passes) == 2
+
+    single = asyncio.run(TeeClient.compute_rewards("big", voters))
+    assert all(abs(a["score"] - b["score"]) <= REWARD_UNIT for a, b in zip(sharded, single))
+
+
+def test_compute_rewards_sharded_checks_the_tallied_voters(monkeypatch):
+    rng = np.random.default_rng(5)
+    votes = [
+        {"proposal_id": "big", "address": f"0x{i:040x}", "vote": bool(v), "prediction": int(p)}
+        for i, (v, p) in enumerate(zip(rng.random(200) < 0.5, rng.integers(0, 101, 200)))
+    ]
+    voters = [v["address"] for v in votes]
+    # the last voter's vote is missing and a non-voter's takes its place: the
+    # tallied count still matches the voter count
+    votes[-1] = {**votes[-1], "address": "0xNotAVoter", "vote": True, "prediction": 99}
+    monkeypatch.setattr(tee_client, "get_database", lambda: {"votes": FakeVotesCollection(votes)})
+    monkeypatch.setattr(proposal_stats, "get_database", lambda: {"proposal_stats": FakeStatsCollection(votes)})
+
+    sharded = asyncio.run(TeeClient.compute_rewards_sharded("big", voters, chunk_size=64))
+    single = asyncio.run(TeeClient.compute_rewards("big", voters))
+
+    assert sharded[-1]["score"] == 0
+    assert all(abs(a["score"] - b["score"]) <= REWARD_UNIT for a, b in zip(sharded, single))
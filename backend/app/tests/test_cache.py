@@ -0,0 +1,81 @@
+import asyncio
+
+from fastapi import FastAPI, Request
+from fastapi.testclient import TestClient
+
+from app.services.cache import Cache, MemoryBackend, dumps, loads
+
+
+def test_memory_backend_evicts_least_recently_used():
+    backend = MemoryBackend(max_entries=2)
+
+    async def run():
+        await backend.set("a", 1, ttl=60)
+        await backend.set("b", 2, ttl=60)
+        await backend.get("a")
+        await backend.set("c", 3, ttl=60)
+        values = [await backend.get(k) for k in ("a", "b", "c")]
+        await backend.set("expired", 4, ttl=-1)
+        return values, await backend.get("expired")
+
+    assert asyncio.run(run()) == ([1, None, 3], None)
+
+
+def test_concurrent_misses_share_one_load_and_invalidation_reloads():
+    cache = Cache(MemoryBackend(), ttl=60)
+    loads = []
+
+    async def loader():
+        loads.append(1)
+        await asyncio.sleep(0.01)
+        return {"n": len(loads)}
+
+    async def run():
+        first = await asyncio.gather(*(cache.get_or_load("proposals", "list", loader) for _ in range(5)))
+        cached = await cache.get_or_load("proposals", "list", loader)
+        await cache.invalidate("proposals")
+        reloaded = await cache.get_or_load("proposals", "list", loader)
+        return first, cached, reloaded
+
+    first, cached, reloaded = asyncio.run(run())
+    assert first == [{"n": 1}] * 5
+    assert cached == {"n": 1}
+    assert reloaded == {"n": 2}
+    assert len(loads) == 2
+
+
+def test_unchanged_list_costs_a_304():
+    cache = Cache(MemoryBackend(), ttl=60)
+    app = FastAPI()
+    items = ["a"]
+
+    @app.get("/items")
+    async def list_items(request: Request):
+        async def load():
+            return {"list": list(items)}
+        return await cache.json_response(request, "items", "all", load)
+
+    @app.post("/items")
+    async def add_item():
+        items.append("b")
+        await cache.invalidate("items")
+
+    client = TestClient(app)
+    first = client.get("/items")
+    assert first.json() == {"list": ["a"]}
+    etag = first.headers["etag"]
+
+    assert client.get("/items", headers={"If-None-Match": etag}).status_code == 304
+
+    client.post("/items")
+    changed = client.get("/items", headers={"If-None-Match": etag})
+    assert changed.status_code == 200
+    assert changed.json() == {"list": ["a", "b"]}
+    assert changed.headers["etag"] != etag
+
+
+def test_redis_values_are_json_with_base64_bodies():
+    entry = {"body": b'{"list":[]}\x00\xff', "etag": '"abc"', "n": [1, None]}
+    raw = dumps(entry)
+    assert b"$b64" in raw and b"\x00" not in raw
+    assert loads(raw) == entry
@@ -0,0 +1,149 @@
+import gzip
+import json
+from datetime import datetime, timezone
+
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from app.db.mongodb import get_database
+from app.routes import export
+from app.routes.export import build_export_query
+
+
+class FakeCursor:
+    def __init__(self, docs):
+        self.docs = docs
+
+    def sort(self, key, direction):
+        self.docs = sorted(self.docs, key=lambda d: d[key], reverse=direction < 0)
+        return self
+
+    def batch_size(self, size):
+        return self
+
+    def __aiter__(self):
+        return self._iterate()
+
+    async def _iterate(self):
+        for doc in self.docs:
+            yield doc
+
+
+class FakeVotes:
+    def __init__(self, docs):
+        self.docs = docs
+        self.queries = []
+
+    def find(self, query):
+        self.queries.append(query)
+        after = query.get("_id", {}).get("$gt")
+        return FakeCursor([d for d in self.docs if after is None or d["_id"] > after])
+
+
+class FakeProposals:
+    def __init__(self, docs):
+        self.docs = {d["_id"]: d for d in docs}
+        self.lookups = 0
+
+    async def find_one(self, query, projection=None):
+        self.lookups += 1
+        return self.docs.get(query["_id"])
+
+    async def distinct(self, key, query):
+        return [d[key] for d in self.docs.values() if all(d.get(k) == v for k, v in query.items())]
+
+
+PROPOSALS = [{"_id": "p1", "phase": "Finished"}, {"_id": "p2", "phase": "Commit"}, {"_id": "p3", "phase": "Reveal"}]
+
+VOTES = [
+    {"_id": f"v{i:03d}", "proposal_id": "p1", "vote": i % 2 == 0, "prediction": i,
+     "created_at": datetime(2025, 1, 1, tzinfo=timezone.utc)}
+    for i in range(300)
+]
+
+
+API_KEY = "export-key"
+
+
+def make_client(monkeypatch, votes=VOTES):
+    votes = FakeVotes(votes)
+    proposals = FakeProposals(PROPOSALS)
+    app = FastAPI()
+    app.include_router(export.router)
+    app.dependency_overrides[get_database] = lambda: {"votes": votes, "proposals": proposals}
+    # small chunks so the stream is split over several writes
+    monkeypatch.setattr(export, "CHUNK_SIZE", 1024)
+    monkeypatch.setattr(export, "EXPORT_API_KEY", API_KEY)
+    return TestClient(app, headers={"Authorization": f"Bearer {API_KEY}"}), votes
+
+
+def test_export_streams_ndjson_and_resumes(monkeypatch):
+    client, _ = make_client(monkeypatch)
+
+    lines = client.get("/api/export/votes").text.splitlines()
+    assert len(lines) == 300
+    assert json.loads(lines[0])["_id"] == "v000"
+
+    last = json.loads(lines[99])["_id"]
+    rest = client.get("/api/export/votes", params={"after": last}).text.splitlines()
+    assert [json.loads(l)["_id"] for l in rest] == [v["_id"] for v in VOTES[100:]]
+
+
+def test_export_gzip(monkeypatch):
+    client, _ = make_client(monkeypatch)
+    resp = client.get("/api/export/votes", params={"gzip": "true"})
+    assert resp.headers["content-type"] == "application/gzip"
+    assert "content-encoding" not in resp.headers
+    assert 'filename="votes.ndjson.gz"' in resp.headers["content-disposition"]
+    assert len(gzip.decompress(resp.content).splitlines()) == 300
+
+
+def test_export_requires_the_api_key(monkeypatch):
+    client, _ = make_client(monkeypatch)
+    assert client.get("/api/export/votes", headers={"Authorization": "Bearer wrong"}).status_code == 401
+    assert client.get("/api/export/votes", headers={"Authorization": ""}).status_code == 401
+    monkeypatch.setattr(export, "EXPORT_API_KEY", "")
+    assert client.get("/api/export/votes").status_code == 403
+
+
+def test_unrevealed_votes_are_exported_without_their_secrets(monkeypatch):
+    votes = [
+        {"_id": "a", "proposal_id": "p1", "vote": True, "prediction": 60, "salt": "0x01"},
+        {"_id": "b", "proposal_id": "p2", "vote": True, "prediction": 60, "salt": "0x02"},
+        {"_id": "c", "proposal_id": "p3", "vote": False, "prediction": 30, "salt": "0x03",
+         "reveal_status": "revealed"},
+        {"_id": "d", "proposal_id": "p3", "vote": False, "prediction": 30, "salt": "0x04"},
+    ]
+    client, _ = make_client(monkeypatch, votes)
+    exported = {d["_id"]: d for d in map(json.loads, client.get("/api/export/votes").text.splitlines())}
+
+    assert exported["a"]["salt"] == "0x01"  # proposal finished
+    assert exported["c"]["vote"] is False  # revealed
+    for redacted in ("b", "d"):
+        assert not {"vote", "prediction", "salt"} & exported[redacted].keys()
+        assert exported[redacted]["proposal_id"]
+
+
+def test_phase_filters_votes_through_their_proposals(monkeypatch):
+    client, votes = make_client(monkeypatch)
+    client.get("/api/export/votes", params={"phase": "Finished"})
+    assert votes.queries[-1] == {"proposal_id": {"$in": ["p1"]}}
+    client.get("/api/export/votes", params={"phase": "Finished", "proposal_id": "p2"})
+    assert votes.queries[-1] == {"proposal_id": {"$in": []}}
+
+
+def test_unknown_collection_is_404(monkeypatch):
+    client, _ = make_client(monkeypatch)
+    assert client.get("/api/export/users").status_code == 404
+
+
+def test_filters_build_the_query():
+    since = datetime(2025, 1, 1, tzinfo=timezone.utc)
+    query = build_export_query("votes", "p1", None, since, None, "v010")
+    assert query == {"proposal_id": "p1", "created_at": {"$gte": since}, "_id": {"$gt": "v010"}}
+    assert build_export_query("proposals", "p1", "Finished", None, None, "a") == {
+        "_id": {"$eq": "p1", "$gt": "a"}, "phase": "Finished",
+    }
+    assert build_export_query("rewards", None, "Finished", None, None, None, ["p1", "p4"]) == {
+        "proposal_id": {"$in": ["p1", "p4"]},
+    }
@@ -0,0 +1,49 @@
+import asyncio
+
+import pytest
+
+from app.services import finalizer
+from app.services.finalizer import Finalizer, ProposalTooLarge
+
+PROPOSAL = "p1"
+VOTERS = [f"0x{i:040x}" for i in range(1, 11)]
+REWARDS = [i * 10 for i in range(1, 11)]
+
+
+class FakeVotingContract:
+    def __init__(self):
+        self.mined = []
+
+    async def call_contract(self, method, args, gas=500000):
+        self.mined.append((method, len(args["voterList"]), gas))
+        return f"0x{len(self.mined):064x}"
+
+
+def setup(monkeypatch, max_gas):
+    contract = FakeVotingContract()
+    monkeypatch.setattr(finalizer, "VoteContract", contract)
+    monkeypatch.setattr(finalizer, "HARDCODED_GAS", 200)
+    monkeypatch.setattr(finalizer, "FINALIZE_BASE_GAS", 100)
+    monkeypatch.setattr(finalizer, "FINALIZE_GAS_PER_VOTER", 10)
+    monkeypatch.setattr(finalizer, "FINALIZE_MAX_GAS", max_gas)
+    return contract
+
+
+def test_finalize_gas_is_sized_to_the_voter_list(monkeypatch):
+    contract = setup(monkeypatch, max_gas=1000)
+    asyncio.run(Finalizer.finalize(PROPOSAL, VOTERS[:3], REWARDS[:3]))
+    asyncio.run(Finalizer.finalize(PROPOSAL, VOTERS, REWARDS))
+    # never below the default limit
+    assert contract.mined == [("finalize", 3, 200), ("finalize", 10, 200)]
+
+    monkeypatch.setattr(finalizer, "FINALIZE_GAS_PER_VOTER", 50)
+    asyncio.run(Finalizer.finalize(PROPOSAL, VOTERS, REWARDS))
+    assert contract.mined[-1] == ("finalize", 10, 600)
+
+
+def test_proposals_over_the_gas_cap_are_not_sent(monkeypatch):
+    contract = setup(monkeypatch, max_gas=150)
+    monkeypatch.setattr(finalizer, "HARDCODED_GAS", 0)
+    with pytest.raises(ProposalTooLarge):
+        asyncio.run(Finalizer.finalize(PROPOSAL, VOTERS, REWARDS))
+    assert contract.mined == []
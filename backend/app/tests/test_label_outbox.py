@@ -0,0 +1,172 @@
+import asyncio
+from datetime import datetime, timedelta, timezone
+
+from web3 import Web3
+
+from app.db.memory import MemoryClient
+from app.services import label_outbox
+from app.services.label_outbox import LabelOutbox, hashed_address
+
+NOW = datetime(2025, 1, 1, tzinfo=timezone.utc)
+TARGET = "0x00000000000000000000000000000000000000a1"
+OTHER = "0x00000000000000000000000000000000000000a2"
+
+
+class FakeTags:
+    def __init__(self, storage, key):
+        self.storage, self.key = storage, key
+
+    def call(self):
+        return self.storage.tags.get(self.key, ("", False))
+
+
+class FakeLabelContract:
+    """
+    TrustTagStorage stand-in: updateLabel calls wait for `released` so tests can
+    see what is in flight at once.
+    """
+
+    def __init__(self, fail=()):
+        self.tags = {}
+        self.sent = []
+        self.fail = set(fail)
+        self.released = asyncio.Event()
+        self.in_flight = 0
+        self.max_in_flight = 0
+        storage = self
+
+        class functions:
+            @staticmethod
+            def tags(key):
+                return FakeTags(storage, key)
+
+        self.contract = type("Contract", (), {"functions": functions})
+
+    async def call_contract(self, method, args):
+        assert method == "updateLabel"
+        self.in_flight += 1
+        self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        await self.released.wait()
+        self.in_flight -= 1
+        if args["description"] in self.fail:
+            raise RuntimeError("reverted")
+        self.sent.append(args)
+        self.tags[args["hashedAddress"]] = (args["description"], args["malicious"])
+        return f"0x{len(self.sent):064x}"
+
+
+def setup(monkeypatch, contract):
+    db = MemoryClient()["test"]
+    monkeypatch.setattr(label_outbox, "get_database", lambda: db)
+    monkeypatch.setattr(label_outbox, "LabelContract", contract)
+    return db
+
+
+def test_hashed_address_matches_solidity_encode_packed():
+    # abi.encodePacked(address) is the 20 address bytes
+    assert hashed_address(TARGET) == "0x" + Web3.keccak(bytes.fromhex(TARGET[2:])).hex()
+
+
+def test_outcomes_for_one_address_coalesce_to_the_latest(monkeypatch):
+    contract = FakeLabelContract()
+    db = setup(monkeypatch, contract)
+    contract.released.set()
+
+    async def run():
+        await LabelOutbox.enqueue(TARGET, "phishing", True, "p1", NOW)
+        await LabelOutbox.enqueue(TARGET, "safe", False, "p3", NOW + timedelta(hours=2))
+        # finalized earlier than what is queued: ignored
+        await LabelOutbox.enqueue(TARGET, "drainer", True, "p2", NOW + timedelta(hours=1))
+        await LabelOutbox.enqueue(OTHER, "scam", True, "p4", NOW)
+        assert await db["label_outbox"].count_documents({}) == 2
+        return await LabelOutbox.flush()
+
+    counts = asyncio.run(run())
+    assert counts == {"sent": 2, "unchanged": 0, "failed": 0}
+    assert sorted((a["description"], a["malicious"]) for a in contract.sent) == [("safe", False), ("scam", True)]
+
+
+def test_batch_is_sent_at_once_and_failures_back_off(monkeypatch):
+    contract = FakeLabelContract(fail={"label-3"})
+    db = setup(monkeypatch, contract)
+    targets = [f"0x{i:040x}" for i in range(1, 6)]
+
+    async def run():
+        for i, target in enumerate(targets):
+            await LabelOutbox.enqueue(target, f"label-{i}", True, f"p{i}", NOW + timedelta(seconds=i))
+        flush = asyncio.ensure_future(LabelOutbox.flush(batch_size=4))
+        await asyncio.sleep(0.01)
+        contract.released.set()
+        first = await flush
+        second = await LabelOutbox.flush(batch_size=4)
+        left = await db["label_outbox"].find({"status": "pending"}).to_list(None)
+        return first, second, left
+
+    first, second, left = asyncio.run(run())
+    assert contract.max_in_flight == 4
+    assert first == {"sent": 3, "unchanged": 0, "failed": 1}
+    # the failed entry waits out its backoff; the fifth goes ahead
+    assert second == {"sent": 1, "unchanged": 0, "failed": 0}
+    assert [e["description"] for e in left] == ["label-3"]
+    assert left[0]["attempts"] == 1
+    # stored naive UTC, like pymongo returns it
+    assert left[0]["next_attempt_at"] > datetime.now(timezone.utc).replace(tzinfo=None)
+
+
+def test_entries_that_keep_failing_are_given_up(monkeypatch):
+    contract = FakeLabelContract(fail={"label-0", "label-1"})
+    contract.released.set()
+    db = setup(monkeypatch, contract)
+    monkeypatch.setattr(label_outbox, "LABEL_RETRY_BASE_SECONDS", 0)
+    monkeypatch.setattr(label_outbox, "LABEL_WRITE_MAX_ATTEMPTS", 3)
+    targets = [f"0x{i:040x}" for i in range(1, 4)]
+
+    async def run():
+        for i, target in enumerate(targets):
+            await LabelOutbox.enqueue(target, f"label-{i}", True, f"p{i}", NOW + timedelta(seconds=i))
+        # the two oldest entries fill the batch until they are given up
+        flushes = [await LabelOutbox.flush(batch_size=2) for _ in range(4)]
+        return flushes, {e["description"]: e for e in await db["label_outbox"].find({}).to_list(None)}
+
+    flushes, entries = asyncio.run(run())
+    assert [f["failed"] for f in flushes] == [2, 2, 2, 0]
+    assert flushes[3]["sent"] == 1
+    assert [entries[f"label-{i}"]["status"] for i in range(3)] == ["failed", "failed", "written"]
+    assert entries["label-0"]["attempts"] == 3
+
+
+def test_labels_already_on_chain_are_not_resent(monkeypatch):
+    contract = FakeLabelContract()
+    db = setup(monkeypatch, contract)
+    contract.released.set()
+    contract.tags[bytes.fromhex(hashed_address(TARGET)[2:])] = ("phishing", True)
+
+    async def run():
+        await LabelOutbox.enqueue(TARGET, "phishing", True, "p1", NOW)
+        counts = await LabelOutbox.flush()
+        return counts, await db["label_outbox"].find_one({})
+
+    counts, entry = asyncio.run(run())
+    assert counts == {"sent": 0, "unchanged": 1, "failed": 0}
+    assert contract.sent == []
+    assert entry["status"] == "written"
+
+
+def test_requeued_while_in_flight_is_sent_again(monkeypatch):
+    contract = FakeLabelContract()
+    db = setup(monkeypatch, contract)
+
+    async def run():
+        await LabelOutbox.enqueue(TARGET, "phishing", True, "p1", NOW)
+        flush = asyncio.ensure_future(LabelOutbox.flush())
+        await asyncio.sleep(0.01)
+        await LabelOutbox.enqueue(TARGET, "safe", False, "p2", NOW + timedelta(hours=1))
+        contract.released.set()
+        await flush
+        assert (await db["label_outbox"].find_one({}))["status"] == "pending"
+        await LabelOutbox.flush()
+        return await db["label_outbox"].find_one({})
+
+    entry = asyncio.run(run())
+    assert [a["description"] for a in contract.sent] == ["phishing", "safe"]
+    assert entry["status"] == "written"
@@ -0,0 +1,193 @@
+import asyncio
+import random
+from datetime import datetime, timedelta, timezone
+
+import pytest
+from pymongo import ReturnDocument, UpdateOne
+from pymongo.errors import BulkWriteError, DuplicateKeyError
+
+from app.db import mongodb
+from app.db.memory import MemoryClient
+from app.services import proposal_stats
+from app.services.proposal_stats import ProposalStats
+from app.services.vote_ingest import VOTE_WRITE_CONCERN, VoteIngestBuffer
+
+NOW = datetime(2025, 1, 1, tzinfo=timezone.utc)
+
+
+def new_db():
+    return MemoryClient()["test"]
+
+
+def test_filters_match_mongo_semantics():
+    async def run():
+        coll = new_db()["rewards"]
+        await coll.insert_many([
+            {"_id": "a", "address": "0xA", "amount": 5, "claimed_at": None, "tags": ["x", "y"]},
+            {"_id": "b", "address": "0xB", "amount": 7, "claimed_at": NOW},
+            {"_id": "c", "address": "0xA", "amount": 1.5},
+        ])
+
+        async def ids(query, **kwargs):
+            return [d["_id"] for d in await coll.find(query, **kwargs).to_list(None)]
+
+        # null matches null and missing
+        assert await ids({"claimed_at": None}) == ["a", "c"]
+        assert await ids({"claimed_at": {"$ne": None}}) == ["b"]
+        assert await ids({"claimed_at": {"$exists": False}}) == ["c"]
+        # aware query datetimes compare with stored (naive UTC) ones
+        assert await ids({"claimed_at": {"$lte": NOW + timedelta(seconds=1)}}) == ["b"]
+        # comparisons only match values of the same BSON type
+        assert await ids({"amount": {"$gt": 1}}) == ["a", "b", "c"]
+        assert await ids({"amount": {"$gt": "1"}}) == []
+        assert await ids({"amount": {"$in": [5, 7]}, "address": {"$nin": ["0xB"]}}) == ["a"]
+        assert await ids({"$or": [{"address": "0xB"}, {"amount": {"$lt": 2}}]}) == ["b", "c"]
+        assert await ids({"tags": "y"}) == ["a"]
+
+        doc = await coll.find_one({"_id": "b"}, {"amount": 1})
+        assert doc == {"_id": "b", "amount": 7}
+        assert doc["amount"] == 7 and "address" not in doc
+        # stored datetimes come back naive UTC, like pymongo's default codec
+        assert (await coll.find_one("b"))["claimed_at"] == NOW.replace(tzinfo=None)
+
+        sorted_ids = [d["_id"] for d in await coll.find().sort("amount", -1).skip(1).limit(1).to_list(None)]
+        assert sorted_ids == ["a"]
+
+        seen = [d["_id"] async for d in coll.find({"address": "0xA"}).batch_size(1)]
+        assert seen == ["a", "c"]
+
+    asyncio.run(run())
+
+
+def test_indexed_queries_agree_with_scans():
+    rng = random.Random(7)
+    docs = [
+        {
+            "_id": f"v{i:04d}",
+            "proposal_id": f"p{rng.randrange(20)}",
+            "prediction": rng.randrange(101),
+            "created_at": NOW + timedelta(minutes=rng.randrange(1000)),
+        }
+        for i in range(2000)
+    ]
+    queries = [
+        {"proposal_id": "p3"},
+        {"proposal_id": {"$in": ["p1", "p2"]}, "prediction": {"$gte": 50}},
+        {"prediction": {"$gt": 10, "$lte": 20}},
+        {"created_at": {"$lt": NOW + timedelta(minutes=100)}},
+        {"$or": [{"proposal_id": "p4"}, {"prediction": 100}]},
+        {"_id": {"$gt": "v1990"}},
+    ]
+
+    async def run():
+        db = new_db()
+        plain, indexed = db["plain"], db["indexed"]
+        for field in ("proposal_id", "prediction", "created_at"):
+            await indexed.create_index(field)
+        await plain.insert_many([dict(d) for d in docs])
+        await indexed.insert_many([dict(d) for d in docs])
+        # index entries follow updates and deletes
+        for coll in (plain, indexed):
+            await coll.update_many({"prediction": {"$lt": 5}}, {"$set": {"proposal_id": "p3"}})
+            await coll.delete_many({"proposal_id": "p7"})
+
+        for query in queries:
+            expected = sorted(d["_id"] for d in await plain.find(query).to_list(None))
+            got = sorted(d["_id"] for d in await indexed.find(query).to_list(None))
+            assert got == expected, query
+            assert indexed._plan(query) is not None, query
+
+    asyncio.run(run())
+
+
+def test_updates_and_upserts():
+    async def run():
+        coll = new_db()["proposal_stats"]
+        result = await coll.update_one(
+            {"_id": "p1"},
+            {"$inc": {"vote_count": 2}, "$set": {"updated_at": NOW}, "$setOnInsert": {"created_at": NOW}},
+            upsert=True,
+        )
+        assert result.upserted_id == "p1"
+        await coll.update_one({"_id": "p1"}, {"$inc": {"vote_count": 3}, "$setOnInsert": {"created_at": None}})
+        doc = await coll.find_one({"_id": "p1"})
+        assert doc["vote_count"] == 5
+        assert doc["created_at"] == NOW.replace(tzinfo=None)
+
+        before = await coll.find_one_and_update({"_id": "p1"}, {"$max": {"vote_count": 4}})
+        after = await coll.find_one_and_update(
+            {"_id": "p1"}, {"$max": {"vote_count": 9}}, return_document=ReturnDocument.AFTER,
+        )
+        assert before["vote_count"] == 5 and after["vote_count"] == 9
+
+        result = await coll.bulk_write([
+            UpdateOne({"_id": "p1"}, {"$inc": {"vote_count": 1}}),
+            UpdateOne({"_id": "p2"}, {"$inc": {"vote_count": 1}}, upsert=True),
+        ], ordered=False)
+        assert (result.matched_count, result.modified_count, result.upserted_count) == (1, 1, 1)
+
+        with pytest.raises(ValueError):
+            await coll.update_one({"_id": "p1"}, {"vote_count": 0})
+
+    asyncio.run(run())
+
+
+def test_duplicate_ids_fail_per_index():
+    async def run():
+        coll = new_db()["votes"]
+        await coll.insert_one({"_id": "v1"})
+        with pytest.raises(DuplicateKeyError):
+            await coll.insert_one({"_id": "v1"})
+
+        with pytest.raises(BulkWriteError) as e:
+            await coll.insert_many([{"_id": "v2"}, {"_id": "v1"}, {"_id": "v3"}], ordered=False)
+        assert [err["index"] for err in e.value.details["writeErrors"]] == [1]
+        assert e.value.details["writeErrors"][0]["code"] == 11000
+        assert await coll.count_documents({}) == 3
+
+        with pytest.raises(BulkWriteError):
+            await coll.insert_many([{"_id": "v1"}, {"_id": "v4"}], ordered=True)
+        assert await coll.find_one({"_id": "v4"}) is None
+
+    asyncio.run(run())
+
+
+def test_app_services_run_on_the_memory_store(monkeypatch):
+    db = new_db()
+    monkeypatch.setattr(proposal_stats, "get_database", lambda: db)
+    buffer = VoteIngestBuffer(
+        collection=lambda: db["votes"].with_options(write_concern=VOTE_WRITE_CONCERN),
+        max_batch=10,
+        on_written=ProposalStats.record_votes,
+    )
+
+    async def run():
+        await asyncio.gather(*(
+            buffer.submit({"_id": f"v{i}", "proposal_id": "p1", "address": f"0x{i:040x}",
+                           "vote": i % 3 != 0, "prediction": 60})
+            for i in range(25)
+        ))
+        stats = await ProposalStats.get_many(["p1"])
+        rebuilt = await ProposalStats.rebuild("p1")
+        return stats["p1"], rebuilt
+
+    stats, rebuilt = asyncio.run(run())
+    assert stats["vote_count"] == 25
+    assert stats["yes_count"] == 16
+    assert rebuilt.n == 25 and rebuilt.yes_count == 16
+    assert rebuilt.sum_log_yes == pytest.approx(stats["sum_log_yes"])
+
+
+def test_connect_with_memory_uri(monkeypatch):
+    monkeypatch.setattr(mongodb, "MONGO_URI", "memory://")
+    monkeypatch.setattr(mongodb, "_client", None)
+
+    async def run():
+        await mongodb.connect_to_mongo()
+        db = mongodb.get_database()
+        await db["votes"].insert_one({"_id": "v1", "proposal_id": "p1"})
+        assert await db["votes"].count_documents({"proposal_id": "p1"}) == 1
+        assert "proposal_id_1" in await db["votes"].index_information()
+        await mongodb.close_mongo_connection()
+
+    asyncio.run(run())
@@ -0,0 +1,57 @@
+import asyncio
+
+import numpy as np
+
+from app.services import proposal_stats
+from app.services.bts_scoring import BtsAggregate, vote_arrays
+from app.services.proposal_stats import ProposalStats
+
+
+class FakeStatsCollection:
+    def __init__(self):
+        self.data = {}
+        self.bulk_writes = 0
+
+    async def bulk_write(self, ops, ordered=True):
+        self.bulk_writes += 1
+        for op in ops:
+            doc = self.data.setdefault(op._filter["_id"], {"_id": op._filter["_id"]})
+            for field, amount in op._doc["$inc"].items():
+                doc[field] = doc.get(field, 0) + amount
+            doc.update(op._doc["$set"])
+
+    async def find_one(self, query):
+        return self.data.get(query["_id"])
+
+
+def test_tallies_accumulate_per_proposal(monkeypatch):
+    stats = FakeStatsCollection()
+    monkeypatch.setattr(proposal_stats, "get_database", lambda: {"proposal_stats": stats})
+    batches = [
+        [{"proposal_id": "p1", "address": "0xA", "vote": True, "prediction": 80},
+         {"proposal_id": "p2", "address": "0xA", "vote": False, "prediction": 0}],
+        [{"proposal_id": "p1", "address": "0xB", "vote": False, "prediction": 35},
+         {"proposal_id": "p1", "address": "0xC", "vote": True, "prediction": 100},
+         # unsigned, can't be scored
+         {"proposal_id": "p1", "address": None, "vote": True, "prediction": 50}],
+    ]
+
+    async def run():
+        for batch in batches:
+            await ProposalStats.record_votes(batch)
+        return await ProposalStats.aggregate("p1"), await ProposalStats.aggregate("missing")
+
+    p1, missing = asyncio.run(run())
+
+    assert stats.bulk_writes == 2
+    assert stats.data["p1"]["vote_count"] == 3
+    assert stats.data["p1"]["yes_count"] == 2
+    assert stats.data["p1"]["no_count"] == 1
+    assert stats.data["p2"]["no_count"] == 1
+    assert missing is None
+
+    p1_votes = [v for batch in batches for v in batch if v["proposal_id"] == "p1" and v["address"]]
+    expected = BtsAggregate.from_chunk(*vote_arrays(p1_votes))
+    assert (p1.n, p1.yes_count) == (expected.n, expected.yes_count)
+    assert np.isclose(p1.sum_log_yes, expected.sum_log_yes)
+    assert np.isclose(p1.sum_log_no, expected.sum_log_no)
@@ -0,0 +1,205 @@
+import asyncio
+from datetime import datetime, timezone
+
+from eth_account import Account
+from web3 import Web3
+
+from app.db.memory import MemoryClient
+from app.scripts.e2e_standins import LocalChain
+from app.services import proposal_stats, reveal, tee_client
+from app.services.proposal_stats import ProposalStats
+from app.services.reveal import VoteReveals, commit_hash, commit_slot
+from app.services.tee_client import TeeClient
+
+PROPOSAL = "p1"
+SALT = "0x" + "11" * 32
+VOTERS = [Account.create().address for _ in range(5)]
+
+
+def ballot(voter, vote=True, prediction=60, salt=SALT, **extra):
+    return {"_id": f"{voter}:{vote}:{prediction}:{salt}", "proposal_id": PROPOSAL, "address": voter,
+            "vote": vote, "prediction": prediction, "salt": salt, **extra}
+
+
+def test_commit_hash_matches_solidity():
+    assert commit_hash(True, 60, SALT) == Web3.solidity_keccak(["bool", "uint8", "bytes32"], [True, 60, SALT])
+    assert commit_hash(False, 0, SALT[2:]) == Web3.solidity_keccak(["bool", "uint8", "bytes32"], [False, 0, SALT])
+    for malformed in [(1, 60, SALT), (True, 256, SALT), (True, 60, "0x1234"), (True, 60, None)]:
+        assert commit_hash(*malformed) is None
+
+
+def test_commit_slot_locates_the_vote_hash():
+    chain = LocalChain()
+    owner = chain.add_account(Account.create().key.hex())
+    chain.deploy_trusttag(owner)
+    voting = chain.contracts["TrustTagVoting"]
+    voter = Account.create()
+    chain.add_account(voter.key.hex())
+    chain.stake(owner, owner, 300 * 10 ** 18)
+    chain.stake(owner, voter.address, 20 * 10 ** 18)
+    chain.transact(owner, voting.functions.createProposal(PROPOSAL, voter.address, True, "tag", chain.now() + 100))
+    chain.transact(voter.address, voting.functions.commitVote(PROPOSAL, commit_hash(True, 60, SALT)))
+
+    slot = commit_slot(PROPOSAL, voter.address)
+    assert chain.w3.eth.get_storage_at(voting.address, slot) == commit_hash(True, 60, SALT)
+    # revealed flag, still unset
+    assert chain.w3.eth.get_storage_at(voting.address, slot + 1)[-1] == 0
+
+
+def fake_chain(monkeypatch, commits):
+    """
+    On-chain commits {voter: (vote, prediction, salt, revealed)}; returns the
+    batches read and the revealVote calls sent.
+    """
+    reads, sent = [], []
+
+    async def read_commits(proposal_id, voters):
+        reads.append(voters)
+        result = {}
+        for voter in voters:
+            entry = next((c for v, c in commits.items() if v.lower() == voter), None)
+            result[voter] = (commit_hash(*entry[:3]), entry[3]) if entry else (b"\0" * 32, False)
+        return result
+
+    class FakeVoteContract:
+        @staticmethod
+        async def call_contract(method, args):
+            assert method == "revealVote"
+            if args["prediction"] == 13:
+                raise RuntimeError("reverted")
+            sent.append(args)
+            return f"0x{len(sent):064x}"
+
+    monkeypatch.setattr(VoteReveals, "read_commits", staticmethod(read_commits))
+    monkeypatch.setattr(reveal, "VoteContract", FakeVoteContract)
+    return reads, sent
+
+
+def test_only_matching_votes_are_revealed(monkeypatch):
+    a, b, c, d, e = VOTERS
+    reads, sent = fake_chain(monkeypatch, {
+        a: (True, 60, SALT, False),
+        b: (False, 40, SALT, False),
+        c: (True, 70, SALT, True),  # revealed before
+        d: (True, 13, SALT, False),
+    })
+    db = MemoryClient()["test"]
+    monkeypatch.setattr(reveal, "get_database", lambda: db)
+    monkeypatch.setattr(proposal_stats, "get_database", lambda: db)
+    # failed reveals are due again right away
+    monkeypatch.setattr(reveal, "REVEAL_RETRY_BASE_SECONDS", 0)
+    votes = [
+        ballot(a),
+        ballot(a, prediction=61),        # a second stored vote of a, not the committed one
+        ballot(b, prediction=41),        # stored values differ from the commit
+        ballot(c, prediction=70),
+        ballot(d, prediction=13),        # revealVote fails
+        ballot(e),                       # commitVote never mined
+        ballot(b, salt="0x1234"),
+        ballot(None),
+    ]
+
+    async def run():
+        await db["votes"].insert_many(votes)
+        first = await VoteReveals.reveal(PROPOSAL)
+        again = await VoteReveals.reveal(PROPOSAL)
+        stored = {v["_id"]: v for v in await db["votes"].find({}).to_list(None)}
+        return first, again, stored
+
+    first, again, stored = asyncio.run(run())
+    assert first == {"revealed": 2, "mismatched": 5, "failed": 1}
+    assert [args["voter"] for args in sent] == [a]
+    # one batch of distinct voters per run; the failed reveal is retried
+    assert len(reads[0]) == 5
+    assert again == {"revealed": 0, "mismatched": 0, "failed": 1}
+    assert reads[1] == [d.lower()]
+
+    assert [(stored[v["_id"]].get("reveal_status"), stored[v["_id"]].get("reveal_error")) for v in votes] == [
+        ("revealed", None),
+        ("mismatch", "hash_mismatch"),
+        ("mismatch", "hash_mismatch"),
+        ("revealed", None),
+        (None, None),
+        ("mismatch", "no_commit"),
+        ("mismatch", "malformed"),
+        ("mismatch", "unsigned"),
+    ]
+
+
+def test_failed_reveals_back_off_and_give_up(monkeypatch):
+    voter = VOTERS[0]
+    reads, sent = fake_chain(monkeypatch, {voter: (True, 13, SALT, False)})
+    db = MemoryClient()["test"]
+    monkeypatch.setattr(reveal, "get_database", lambda: db)
+    monkeypatch.setattr(reveal, "REVEAL_MAX_ATTEMPTS", 3)
+    vote = ballot(voter, prediction=13)
+
+    async def stored():
+        return await db["votes"].find_one({"_id": vote["_id"]})
+
+    async def run():
+        await db["votes"].insert_one(vote)
+        assert (await VoteReveals.reveal(PROPOSAL))["failed"] == 1
+        first = await stored()
+        # not due yet
+        assert await VoteReveals.reveal(PROPOSAL) == {"revealed": 0, "mismatched": 0, "failed": 0}
+
+        # once the backoff has passed (and with none after)
+        await db["votes"].update_one({"_id": vote["_id"]}, {"$set": {"next_attempt_at": datetime.now(timezone.utc)}})
+        monkeypatch.setattr(reveal, "REVEAL_RETRY_BASE_SECONDS", 0)
+        for _ in range(3):
+            await VoteReveals.reveal(PROPOSAL)
+        return first, await stored()
+
+    first, last = asyncio.run(run())
+    assert first["reveal_attempts"] == 1 and "reveal_status" not in first
+    assert (first["next_attempt_at"] - datetime.now(timezone.utc).replace(tzinfo=None)).total_seconds() > 10
+    # given up after REVEAL_MAX_ATTEMPTS; the last run found nothing to send
+    assert last["reveal_attempts"] == 3
+    assert last["reveal_status"] == "failed" and last["last_error"] == "reverted"
+    assert len(reads) == 3
+
+
+def test_duplicate_matching_votes_are_revealed_once(monkeypatch):
+    voter = VOTERS[0]
+    _, sent = fake_chain(monkeypatch, {voter: (True, 60, SALT, False)})
+    votes = [ballot(voter, _id="first"), ballot(voter, _id="second")]
+
+    report = asyncio.run(VoteReveals.verify(PROPOSAL, votes))
+    assert [v["_id"] for v in report["matching"]] == ["first"]
+    assert [(v["_id"], v["reason"]) for v in report["mismatches"]] == [("second", "duplicate")]
+
+
+def test_mismatched_votes_are_not_scored_or_tallied(monkeypatch):
+    a, b, c = VOTERS[:3]
+    fake_chain(monkeypatch, {
+        a: (True, 60, SALT, False),
+        b: (False, 30, SALT, False),
+        c: (True, 90, SALT, False),
+    })
+    honest = [ballot(a), ballot(b, vote=False, prediction=30), ballot(c, prediction=90)]
+    # stored before b's real vote, but not what b committed
+    forged = ballot(b, vote=True, prediction=100)
+    dbs = {"current": MemoryClient()["test"]}
+    for module in (reveal, proposal_stats, tee_client):
+        monkeypatch.setattr(module, "get_database", lambda: dbs["current"])
+
+    async def scores(votes):
+        await dbs["current"]["votes"].insert_many(votes)
+        await ProposalStats.record_votes(votes)
+        return await TeeClient.compute_rewards(PROPOSAL, [a, b, c])
+
+    async def run():
+        before = await scores([forged] + honest)
+        await VoteReveals.reveal(PROPOSAL)
+        after = await TeeClient.compute_rewards(PROPOSAL, [a, b, c])
+        tallied = await ProposalStats.aggregate(PROPOSAL)
+        rebuilt = await ProposalStats.rebuild(PROPOSAL)
+
+        dbs["current"] = MemoryClient()["test"]
+        return before, after, tallied, rebuilt, await scores(honest)
+
+    before, after, tallied, rebuilt, expected = asyncio.run(run())
+    assert before != expected
+    assert after == expected
+    assert (tallied.n, tallied.yes_count) == (rebuilt.n, rebuilt.yes_count) == (3, 2)
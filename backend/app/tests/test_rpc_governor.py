@@ -0,0 +1,134 @@
+import asyncio
+import threading
+import time
+
+import pytest
+import requests
+from hexbytes import HexBytes
+from web3.exceptions import TransactionNotFound
+
+from app.metrics import RPC_THROTTLES
+from app.services import rpc_governor, smart_contract_client
+from app.services.rpc_governor import BACKGROUND, INTERACTIVE, RateGovernor, rpc_priority
+
+
+def http_error(status: int, retry_after: str | None = None) -> requests.HTTPError:
+    response = requests.Response()
+    response.status_code = status
+    if retry_after is not None:
+        response.headers["Retry-After"] = retry_after
+    return requests.HTTPError(response=response)
+
+
+def test_rate_is_additive_up_and_multiplicative_down():
+    governor = RateGovernor(rate=10, min_rate=1, max_rate=12, increase=1, decrease=0.5)
+    governor.throttled()
+    assert governor.rate == 5
+    # rejections from the same window count once
+    governor.throttled()
+    assert governor.rate == 5
+
+    for _ in range(5):
+        governor.succeeded()
+    assert governor.rate == pytest.approx(6, abs=0.1)
+    for _ in range(1000):
+        governor.succeeded()
+    assert governor.rate == 12
+
+
+def test_429_is_retried_after_retry_after(monkeypatch):
+    monkeypatch.setattr(rpc_governor, "RPC_MAX_RETRIES", 2)
+    governor = RateGovernor(rate=50, burst=5)
+    responses = [http_error(429, retry_after="0.2"), b'{"result": "0x1"}']
+    before = RPC_THROTTLES.value(endpoint="test", reason="429")
+
+    def post():
+        result = responses.pop(0)
+        if isinstance(result, Exception):
+            raise result
+        return result
+
+    start = time.monotonic()
+    assert governor.call("eth_sendRawTransaction", post, endpoint="test") == b'{"result": "0x1"}'
+    assert time.monotonic() - start >= 0.2
+    assert governor.rate < 50
+    assert RPC_THROTTLES.value(endpoint="test", reason="429") == before + 1
+
+
+def test_timeouts_are_only_retried_for_safe_methods(monkeypatch):
+    monkeypatch.setattr(rpc_governor, "RPC_MAX_RETRIES", 2)
+    governor = RateGovernor(rate=100, burst=10)
+    calls = []
+
+    def post():
+        calls.append(1)
+        raise requests.ReadTimeout()
+
+    with pytest.raises(requests.Timeout):
+        governor.call("eth_blockNumber", post)
+    assert len(calls) == 3
+
+    calls.clear()
+    with pytest.raises(requests.Timeout):
+        governor.call("debug_traceTransaction", post)
+    assert len(calls) == 1
+
+    with pytest.raises(requests.HTTPError):
+        governor.call("eth_call", lambda: (_ for _ in ()).throw(http_error(500)))
+
+
+def test_interactive_calls_go_first():
+    governor = RateGovernor(rate=5, burst=1)
+    governor.acquire()  # empty the bucket
+    order = []
+
+    def caller(priority):
+        token = rpc_priority.set(priority)
+        try:
+            governor.acquire(rpc_priority.get())
+            order.append(priority)
+        finally:
+            rpc_priority.reset(token)
+
+    background = threading.Thread(target=caller, args=(BACKGROUND,))
+    interactive = threading.Thread(target=caller, args=(INTERACTIVE,))
+    background.start()
+    time.sleep(0.05)
+    interactive.start()
+    background.join()
+    interactive.join()
+    assert order == [INTERACTIVE, BACKGROUND]
+
+
+def test_relayed_transactions_wait_off_the_event_loop(monkeypatch):
+    governor = RateGovernor(rate=20, burst=1)
+    polls = []
+
+    class ThrottledEth:
+        def send_raw_transaction(self, raw):
+            governor.acquire()
+            return HexBytes("0x" + "ab" * 32)
+
+        def get_transaction_receipt(self, tx_hash):
+            governor.acquire()
+            polls.append(time.monotonic())
+            if len(polls) < 3:
+                raise TransactionNotFound(tx_hash)
+            return {"status": 1, "blockNumber": 7}
+
+    monkeypatch.setattr(smart_contract_client.w3, "eth", ThrottledEth(), raising=False)
+    monkeypatch.setattr(smart_contract_client, "RELAY_RECEIPT_POLL_INTERVAL", 0.05)
+
+    async def run():
+        ticks = 0
+        relay = asyncio.ensure_future(smart_contract_client.relay_transaction(b"raw"))
+        while not relay.done():
+            ticks += 1
+            await asyncio.sleep(0.005)
+        return await relay, ticks
+
+    (tx_hex, receipt), ticks = asyncio.run(run())
+    assert tx_hex == "ab" * 32 and receipt["blockNumber"] == 7
+    # the loop kept running while the calls waited for tokens
+    assert ticks >= 10
+    assert all(b - a >= 0.05 for a, b in zip(polls, polls[1:]))
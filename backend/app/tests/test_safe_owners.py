@@ -0,0 +1,153 @@
+import asyncio
+import time
+
+import pytest
+from eth_account import Account
+from eth_account.messages import encode_defunct
+from web3 import Web3
+
+from app.routes import world
+from app.services import safe_owners
+from app.services.safe_owners import SafeOwnerLookup
+
+SAFE = "0x" + "5a" * 20
+OTHER_SAFE = "0x" + "5b" * 20
+OWNER = Account.create()
+STRANGER = Account.create()
+
+
+def make_lookup(owners, multicall=False, **kwargs):
+    """
+    A lookup whose chain has the given {safe: {owners}}; counts round trips.
+    """
+    lookup = SafeOwnerLookup("http://127.0.0.1:1", multicall=multicall, batch_delay_ms=5, **kwargs)
+    lookup.round_trips = []
+    owners = {Web3.to_checksum_address(s): set(o) for s, o in owners.items()}
+
+    def call_is_owner(key):
+        lookup.round_trips.append([key])
+        time.sleep(0.01)
+        safe, signer = key
+        return signer in owners[safe]
+
+    def aggregate(calls):
+        lookup.round_trips.append(calls)
+        results = []
+        for target, allow_failure, data in calls:
+            assert allow_failure and data.startswith("0x2f54bf6e")  # isOwner(address)
+            if target not in owners:
+                results.append((False, b""))
+                continue
+            signer = Web3.to_checksum_address("0x" + data[-40:])
+            results.append((True, (signer in owners[target]).to_bytes(32, "big")))
+        return results
+
+    lookup._call_is_owner = call_is_owner
+    lookup._aggregate = aggregate
+    return lookup
+
+
+def test_repeat_logins_are_served_from_the_cache():
+    lookup = make_lookup({SAFE: {OWNER.address}})
+
+    async def run():
+        first = await asyncio.gather(*(lookup.is_owner(SAFE, OWNER.address) for _ in range(5)))
+        again = await lookup.is_owner(SAFE.upper().replace("0X", "0x"), OWNER.address.lower())
+        stranger = await lookup.is_owner(SAFE, STRANGER.address)
+        return first, again, stranger
+
+    first, again, stranger = asyncio.run(run())
+    assert first == [True] * 5 and again is True
+    assert stranger is False
+    # one call for the five concurrent owner lookups, one for the stranger
+    assert len(lookup.round_trips) == 2
+
+
+def test_entries_expire_non_owners_first():
+    lookup = make_lookup({SAFE: {OWNER.address}}, ttl=60, negative_ttl=0.05)
+
+    async def run():
+        await lookup.is_owner(SAFE, OWNER.address)
+        await lookup.is_owner(SAFE, STRANGER.address)
+        await asyncio.sleep(0.1)
+        await lookup.is_owner(SAFE, OWNER.address)
+        await lookup.is_owner(SAFE, STRANGER.address)
+
+    asyncio.run(run())
+    assert [calls[0][1] for calls in lookup.round_trips] == [OWNER.address, STRANGER.address, STRANGER.address]
+
+
+def test_cache_is_bounded():
+    lookup = make_lookup({SAFE: {OWNER.address}}, max_entries=2)
+    signers = [Account.create().address for _ in range(3)]
+
+    async def run():
+        for signer in signers + signers[:1]:
+            await lookup.is_owner(SAFE, signer)
+
+    asyncio.run(run())
+    assert len(lookup._entries) == 2
+    assert len(lookup.round_trips) == 4
+
+
+def test_misses_share_one_multicall():
+    lookup = make_lookup({SAFE: {OWNER.address}, OTHER_SAFE: set()}, multicall=True)
+    missing = "0x" + "00" * 19 + "01"
+
+    async def run():
+        results = await asyncio.gather(
+            lookup.is_owner(SAFE, OWNER.address),
+            lookup.is_owner(SAFE, STRANGER.address),
+            lookup.is_owner(OTHER_SAFE, OWNER.address),
+            lookup.is_owner(missing, OWNER.address),
+            return_exceptions=True,
+        )
+        return results
+
+    results = asyncio.run(run())
+    assert results[:3] == [True, False, False]
+    assert isinstance(results[3], ValueError)
+    assert len(lookup.round_trips) == 1 and len(lookup.round_trips[0]) == 4
+    # failures aren't cached
+    assert len(lookup._entries) == 3
+
+
+def siwe_message(address: str, nonce: str) -> str:
+    return "\n".join([
+        "trustag.app wants you to sign in with your Ethereum account:",
+        address,
+        "",
+        "Sign in to TrusTag",
+        "",
+        "URI: https://trustag.app",
+        "Version: 1",
+        "Chain ID: 4801",
+        f"Nonce: {nonce}",
+        "Issued At: 2025-01-01T00:00:00Z",
+    ])
+
+
+def test_siwe_verification_uses_the_owner_lookup(monkeypatch):
+    lookup = make_lookup({SAFE: {OWNER.address}})
+    monkeypatch.setattr(world, "owner_lookup_for", lambda rpc_url: lookup)
+
+    def payload(account):
+        message = siwe_message(SAFE, "n1")
+        signature = Account.sign_message(encode_defunct(text=message), account.key).signature.hex()
+        return {"message": message, "signature": signature, "address": SAFE}
+
+    async def run():
+        result = await world.verify_siwe_message(payload(OWNER), "n1")
+        await world.verify_siwe_message(payload(OWNER), "n1")
+        with pytest.raises(ValueError, match="invalid owner"):
+            await world.verify_siwe_message(payload(STRANGER), "n1")
+        return result
+
+    assert asyncio.run(run())["is_valid"] is True
+    assert len(lookup.round_trips) == 2
+
+
+def test_lookups_are_shared_per_rpc_url(monkeypatch):
+    monkeypatch.setattr(safe_owners, "_lookups", {})
+    assert safe_owners.owner_lookup_for("http://a") is safe_owners.owner_lookup_for("http://a")
+    assert safe_owners.owner_lookup_for("http://a") is not safe_owners.owner_lookup_for("http://b")
@@ -117,7 +117,7 @@ async def test_finalize_reward_job():
     for doc in reward_docs:
         # Each reward _id should combine the proposal_id and the voter address.
         assert doc["_id"] == f"{proposal_id}:{doc['address']}"
-        assert doc["amount"] == 10
+        assert doc["amount"] == "10"
         assert doc["tx_hash"] == "finalize_dummy_tx_hash"
         assert doc["claimed_at"] is None
 
@@ -0,0 +1,44 @@
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+
+from eth_account import Account
+
+from app.services import signer
+from app.services.signer import TransactionSigner
+
+KEY = "0x6c156ca8d84657e2072639f8cad5f8ef4e26e3bc64299231e10f45fe4e736f3c"
+
+
+def make_txn(nonce):
+    return {
+        "to": "0x39CB184af026c05B6BcB507aA8365B2dbb377dcD",
+        "value": 0,
+        "data": "0x",
+        "nonce": nonce,
+        "gas": 500000,
+        "gasPrice": 1_000_000_000,
+        "chainId": 4801,
+    }
+
+
+def test_concurrent_signs_share_one_batch(monkeypatch):
+    # a thread pool stands in for the process pool; the worker key is set in-process
+    monkeypatch.setattr(signer, "_executor", ThreadPoolExecutor(max_workers=1))
+    monkeypatch.setattr(signer, "_worker_key", KEY)
+    batches = []
+    sign_batch = signer._sign_batch
+
+    def recording_sign_batch(txns):
+        batches.append(len(txns))
+        return sign_batch(txns)
+
+    monkeypatch.setattr(signer, "_sign_batch", recording_sign_batch)
+
+    async def sign_all():
+        return await asyncio.gather(*(TransactionSigner.sign(make_txn(n)) for n in range(3)))
+
+    signed = asyncio.run(sign_all())
+    TransactionSigner.close()
+
+    assert batches == [3]
+    assert signed == [bytes(Account.sign_transaction(make_txn(n), KEY).raw_transaction) for n in range(3)]
@@ -0,0 +1,129 @@
+import json
+import shutil
+import subprocess
+from pathlib import Path
+
+import numpy as np
+import pytest
+
+from app.services.bts_scoring import BtsAggregate, bts_scores, fixed_point_scores, vote_arrays
+from app.services.tee_client import TeeClient, _canonical_payload
+
+TA_DIR = Path(__file__).resolve().parents[3] / "bts-op-tee" / "optee_examples" / "bts_voting" / "ta"
+
+# The TA works in float32 and a software ln(); bts_scoring in float64. Their
+# micro-unit scores drift apart by a few units, far inside BTS_SHADOW_TOLERANCE.
+MAX_DRIFT = 5
+
+# Just enough of the OP-TEE internal API to build the TA as a host program.
+TEE_API_SHIM = r"""
+#include <stdint.h>
+#include <stdio.h>
+#include <stdlib.h>
+#include <string.h>
+typedef uint32_t TEE_Result;
+typedef union { struct { void *buffer; size_t size; } memref; struct { uint32_t a, b; } value; } TEE_Param;
+#define TEE_SUCCESS 0x00000000
+#define TEE_ERROR_BAD_PARAMETERS 0xFFFF0006
+#define TEE_ERROR_NOT_SUPPORTED 0xFFFF000A
+#define TEE_ERROR_OUT_OF_MEMORY 0xFFFF000C
+#define TEE_PARAM_TYPE_NONE 0
+#define TEE_PARAM_TYPE_MEMREF_INPUT 5
+#define TEE_PARAM_TYPE_MEMREF_OUTPUT 6
+#define TEE_PARAM_TYPES(t0, t1, t2, t3) ((t0) | ((t1) << 4) | ((t2) << 8) | ((t3) << 12))
+#define TEE_MALLOC_FILL_ZERO 0
+#define TEE_MemMove memmove
+#define TEE_Malloc(size, hint) calloc(1, size)
+#define TEE_Free free
+#define IMSG(...) ((void)0)
+#define DMSG(...) ((void)0)
+#define __maybe_unused __attribute__((unused))
+"""
+
+# Runs CMD_PROCESS_VOTE on stdin and prints the TA's output, like
+# `optee_example_bts_voting process_vote -` in the guest.
+HOST_MAIN = r"""
+#include "bts_voting_ta.c"
+
+int main(void) {
+    static char input[MAX_INPUT_LEN + 1], output[MAX_OUTPUT_LEN];
+    size_t n = fread(input, 1, MAX_INPUT_LEN, stdin);
+    input[n] = '\0';
+    TEE_Param params[4] = {0};
+    params[0].memref.buffer = input;
+    params[0].memref.size = n + 1;
+    params[1].memref.buffer = output;
+    params[1].memref.size = sizeof(output);
+    uint32_t types = TEE_PARAM_TYPES(TEE_PARAM_TYPE_MEMREF_INPUT, TEE_PARAM_TYPE_MEMREF_OUTPUT,
+                                     TEE_PARAM_TYPE_NONE, TEE_PARAM_TYPE_NONE);
+    if (TA_InvokeCommandEntryPoint(NULL, CMD_PROCESS_VOTE, types, params) != TEE_SUCCESS)
+        return 1;
+    fwrite(output, 1, params[1].memref.size, stdout);
+    return 0;
+}
+"""
+
+
+@pytest.fixture(scope="module")
+def ta(tmp_path_factory):
+    compiler = shutil.which("cc") or shutil.which("gcc")
+    if compiler is None:
+        pytest.skip("no C compiler to build the TA on the host")
+    build = tmp_path_factory.mktemp("ta")
+    (build / "tee_internal_api.h").write_text(TEE_API_SHIM)
+    (build / "tee_internal_api_extensions.h").write_text("")
+    (build / "main.c").write_text(HOST_MAIN)
+    binary = build / "bts_voting"
+    subprocess.run(
+        [compiler, "-O2", "-w", f"-I{build}", f"-I{TA_DIR}", f"-I{TA_DIR / 'include'}", "-o", str(binary),
+         str(build / "main.c")],
+        check=True,
+    )
+
+    def run(payload):
+        body = json.dumps(_canonical_payload(payload), separators=(",", ":")).encode()
+        out = subprocess.run([str(binary)], input=body, capture_output=True, check=True).stdout
+        return json.loads(out)["user_scores"]
+
+    return run
+
+
+def random_votes(rng, n):
+    yes_rate = rng.random()
+    return [
+        {"address": f"0x{i:040x}", "vote": bool(rng.random() < yes_rate), "prediction": int(rng.integers(0, 101))}
+        for i in range(n)
+    ]
+
+
+def test_ta_scores_match_bts_scoring(ta):
+    rng = np.random.default_rng(28)
+    for _ in range(50):
+        votes = random_votes(rng, int(rng.integers(1, 300)))
+        expected = fixed_point_scores(bts_scores(*vote_arrays(votes)))
+
+        scores = ta({"votes": TeeClient._tee_votes(votes)})
+        drift = [abs(scores[v["address"]] - int(e)) for v, e in zip(votes, expected)]
+        assert max(drift) <= MAX_DRIFT
+
+
+def test_ta_shards_match_bts_scoring(ta):
+    rng = np.random.default_rng(29)
+    for _ in range(20):
+        votes = random_votes(rng, int(rng.integers(100, 5000)))
+        expected = fixed_point_scores(bts_scores(*vote_arrays(votes)))
+        aggregate = BtsAggregate.from_chunk(*vote_arrays(votes))
+        start = int(rng.integers(0, len(votes)))
+        shard = votes[start:start + 48]
+
+        scores = ta({
+            "aggregate": {
+                "total": aggregate.n,
+                "yes_count": aggregate.yes_count,
+                "sum_log_yes": aggregate.sum_log_yes,
+                "sum_log_no": aggregate.sum_log_no,
+            },
+            "votes": TeeClient._tee_votes(shard),
+        })
+        drift = [abs(scores[v["address"]] - int(e)) for v, e in zip(shard, expected[start:start + 48])]
+        assert max(drift) <= MAX_DRIFT
@@ -0,0 +1,154 @@
+import asyncio
+
+import pytest
+
+from app.services import tee_client
+from app.services.bts_scoring import REWARD_UNIT
+from app.services.tee_client import TeeClient
+
+
+class FakeDisagreements:
+    def __init__(self):
+        self.data = []
+
+    async def insert_one(self, doc):
+        self.data.append(doc)
+
+
+def use_scorers(monkeypatch, tee_results, local_results):
+    calls = {"tee": 0, "local": 0}
+
+    async def fake_tee(proposal_id, voters):
+        calls["tee"] += 1
+        if isinstance(tee_results, Exception):
+            raise tee_results
+        return tee_results
+
+    async def fake_local(proposal_id, voters):
+        calls["local"] += 1
+        return local_results
+
+    monkeypatch.setattr(TeeClient, "compute_rewards_tee", staticmethod(fake_tee))
+    monkeypatch.setattr(TeeClient, "compute_rewards_local", staticmethod(fake_local))
+    return calls
+
+
+def test_tee_mode_does_not_fall_back(monkeypatch):
+    calls = use_scorers(monkeypatch, [], [{"address": "0xA", "score": 5}])
+    assert asyncio.run(TeeClient.score_proposal("p", ["0xA"], mode="tee")) == []
+    assert calls["local"] == 0
+
+
+def test_fallback_mode_uses_local_scorer_when_tee_fails(monkeypatch):
+    local = [{"address": "0xA", "score": 5}]
+    calls = use_scorers(monkeypatch, RuntimeError("TEE down"), local)
+    assert asyncio.run(TeeClient.score_proposal("p", ["0xA"], mode="fallback")) == local
+    assert calls == {"tee": 1, "local": 1}
+
+
+def test_shadow_mode_records_disagreements(monkeypatch):
+    tee = [{"address": "0xA", "score": 1_000_000 * REWARD_UNIT}, {"address": "0xB", "score": 2_000_000 * REWARD_UNIT}]
+    local = [{"address": "0xA", "score": 1_000_010 * REWARD_UNIT}, {"address": "0xB", "score": 2_500_000 * REWARD_UNIT}]
+    use_scorers(monkeypatch, tee, local)
+    monkeypatch.setattr(tee_client, "BTS_SHADOW_SAMPLE_RATE", 1.0)
+    disagreements = FakeDisagreements()
+    monkeypatch.setattr(tee_client, "get_database", lambda: {"score_disagreements": disagreements})
+
+    assert asyncio.run(TeeClient.score_proposal("p", ["0xA", "0xB"], mode="shadow")) == tee
+
+    assert len(disagreements.data) == 1
+    doc = disagreements.data[0]
+    assert doc["proposal_id"] == "p"
+    assert doc["checked"] == 2
+    assert doc["mismatches"] == [{"address": "0xB", "tee": 2_000_000 * REWARD_UNIT, "local": 2_500_000 * REWARD_UNIT}]
+
+
+def test_unknown_mode_is_rejected():
+    with pytest.raises(ValueError):
+        asyncio.run(TeeClient.score_proposal("p", [], mode="magic"))
+
+
+class FakeTeeResults:
+    def __init__(self):
+        self.data = {}
+
+    async def find_one(self, query):
+        return self.data.get(query["_id"])
+
+    async def update_one(self, query, update, upsert=False):
+        self.data.setdefault(query["_id"], {"_id": query["_id"], **update["$setOnInsert"]})
+
+
+class FakeResponse:
+    def __init__(self, payload, status_code=200):
+        self.payload = payload
+        self.status_code = status_code
+
+    def raise_for_status(self):
+        pass
+
+    def json(self):
+        return self.payload
+
+
+class FakeHttpClient:
+    def __init__(self, user_scores=None, accept_binary=True):
+        self.bodies = []
+        self.content_types = []
+        self.user_scores = user_scores or {"0xA": 7, "0xB": -3}
+        self.accept_binary = accept_binary
+
+    async def post(self, url, content=None, headers=None):
+        self.bodies.append(content)
+        self.content_types.append(headers["Content-Type"])
+        if headers["Content-Type"] != "application/json" and not self.accept_binary:
+            return FakeResponse({"detail": "Unsupported Media Type"}, status_code=415)
+        return FakeResponse({"result": {"user_scores": self.user_scores, "signature": "sig"}})
+
+
+def test_identical_payloads_hit_the_result_cache(monkeypatch):
+    results = FakeTeeResults()
+    http = FakeHttpClient()
+    monkeypatch.setattr(tee_client, "get_database", lambda: {"tee_results": results})
+    monkeypatch.setattr(TeeClient, "http_client", staticmethod(lambda: http))
+    hits = tee_client.TEE_RESULT_CACHE.value(result="hit")
+
+    votes = [
+        {"user": "0xB", "vote": "no", "prediction_yes": 0.3, "prediction_no": 0.7},
+        {"user": "0xA", "vote": "yes", "prediction_yes": 0.6, "prediction_no": 0.4},
+    ]
+    first = asyncio.run(TeeClient._run_tee("p", {"votes": votes}))
+    # same votes in a different order hash to the same key
+    second = asyncio.run(TeeClient._run_tee("p", {"votes": list(reversed(votes))}))
+
+    assert first == second == {"0xA": 7, "0xB": -3}
+    assert len(http.bodies) == 1
+    assert tee_client.TEE_RESULT_CACHE.value(result="hit") == hits + 1
+    (cached,) = results.data.values()
+    assert cached["result"]["signature"] == "sig"
+
+
+CHECKSUMMED = "0x52908400098527886E0F7030069857D2E4169EE7"
+
+
+def test_binary_payload_restores_checksummed_addresses(monkeypatch):
+    http = FakeHttpClient(user_scores={CHECKSUMMED.lower(): 11})
+    monkeypatch.setattr(tee_client, "get_database", lambda: {"tee_results": FakeTeeResults()})
+    monkeypatch.setattr(TeeClient, "http_client", staticmethod(lambda: http))
+    monkeypatch.setattr(tee_client, "_binary_votes_supported", True)
+
+    votes = [{"user": CHECKSUMMED, "vote": "yes", "prediction_yes": 0.25, "prediction_no": 0.75}]
+    assert asyncio.run(TeeClient._run_tee("p", {"votes": votes})) == {CHECKSUMMED: 11}
+    assert http.content_types == ["application/x-bts-votes"]
+
+
+def test_binary_payload_falls_back_to_json_on_415(monkeypatch):
+    http = FakeHttpClient(user_scores={CHECKSUMMED: 11}, accept_binary=False)
+    monkeypatch.setattr(tee_client, "get_database", lambda: {"tee_results": FakeTeeResults()})
+    monkeypatch.setattr(TeeClient, "http_client", staticmethod(lambda: http))
+    monkeypatch.setattr(tee_client, "_binary_votes_supported", True)
+
+    votes = [{"user": CHECKSUMMED, "vote": "no", "prediction_yes": 0.5, "prediction_no": 0.5}]
+    assert asyncio.run(TeeClient._run_tee("p", {"votes": votes})) == {CHECKSUMMED: 11}
+    assert http.content_types == ["application/x-bts-votes", "application/json"]
+    assert tee_client._binary_votes_supported is False
@@ -0,0 +1,53 @@
+import asyncio
+import time
+from types import SimpleNamespace
+
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from app.metrics import DEPENDENCY_SECONDS, REQUEST_SECONDS, render_prometheus
+from app.timing import MongoTimingListener, TimingMiddleware, timed
+
+
+def make_app():
+    app = FastAPI()
+    app.add_middleware(TimingMiddleware)
+
+    def blocking_rpc():
+        with timed("rpc"):
+            time.sleep(0.002)
+
+    @app.get("/items/{item_id}")
+    async def item(item_id: str):
+        # a Mongo command completing in a driver thread, as Motor runs them
+        await asyncio.to_thread(MongoTimingListener().succeeded, SimpleNamespace(duration_micros=1500))
+        MongoTimingListener().succeeded(SimpleNamespace(duration_micros=500))
+        await asyncio.to_thread(blocking_rpc)
+        return {"id": item_id}
+
+    return app
+
+
+def test_server_timing_aggregates_dependencies_per_request():
+    before = REQUEST_SECONDS.count(method="GET", route="/items/{item_id}", status="200")
+    mongo_before = DEPENDENCY_SECONDS.count(component="mongo")
+
+    resp = TestClient(make_app()).get("/items/1")
+
+    header = resp.headers["server-timing"]
+    entries = {part.split(";")[0]: part for part in header.split(", ")}
+    assert set(entries) == {"mongo", "rpc", "total"}
+    assert 'mongo;dur=2.0;desc="2 calls"' == entries["mongo"]
+    assert 'desc="1 call"' in entries["rpc"]
+
+    assert REQUEST_SECONDS.count(method="GET", route="/items/{item_id}", status="200") == before + 1
+    assert DEPENDENCY_SECONDS.count(component="mongo") == mongo_before + 2
+
+
+def test_histograms_render_in_prometheus_format():
+    DEPENDENCY_SECONDS.observe(0.003, component="tee")
+    text = render_prometheus()
+    assert "# TYPE trustag_dependency_seconds histogram" in text
+    assert 'trustag_dependency_seconds_bucket{component="tee",le="0.005"}' in text
+    assert 'trustag_dependency_seconds_bucket{component="tee",le="+Inf"}' in text
+    assert 'trustag_dependency_seconds_count{component="tee"}' in text
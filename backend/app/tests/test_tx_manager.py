@@ -0,0 +1,191 @@
+import asyncio
+import json
+import time
+
+import pytest
+from web3.exceptions import TransactionNotFound
+
+from app.db.memory import MemoryClient
+from app.services import tx_manager
+from app.services.tx_manager import TransactionManager, TransactionStuck, call_key
+
+SENDER = "0x00000000000000000000000000000000000000b0"
+GWEI = 10 ** 9
+
+
+class FakeEth:
+    """
+    A chain that mines one block per mine() call, including the pending
+    transaction for the next nonce only if its gas price reaches min_price.
+    """
+
+    def __init__(self, gas_price=GWEI, min_price=GWEI):
+        self.default_account = SENDER
+        self.gas_price = gas_price
+        self.min_price = min_price
+        self.block_number = 100
+        self.mined_nonce = 0
+        self.pool = {}  # nonce -> latest transaction
+        self.receipts = {}
+        self.sent = []
+
+    def get_transaction_count(self, address, block="latest"):
+        if block == "pending":
+            return max([self.mined_nonce] + [n + 1 for n in self.pool])
+        return self.mined_nonce
+
+    def send_raw_transaction(self, raw):
+        txn = json.loads(raw)
+        if txn["nonce"] < self.mined_nonce:
+            raise ValueError("nonce too low")
+        tx_hash = bytes.fromhex(f"{len(self.sent) + 1:064x}")
+        txn["hash"] = tx_hash
+        self.pool[txn["nonce"]] = txn
+        self.sent.append(txn)
+        return tx_hash
+
+    def get_transaction_receipt(self, tx_hash):
+        receipt = self.receipts.get(bytes.fromhex(tx_hash[2:]))
+        if receipt is None:
+            raise TransactionNotFound(tx_hash)
+        return receipt
+
+    def mine(self):
+        self.block_number += 1
+        txn = self.pool.get(self.mined_nonce)
+        if txn is not None and txn["gasPrice"] >= self.min_price:
+            del self.pool[self.mined_nonce]
+            self.receipts[txn["hash"]] = {"transactionHash": txn["hash"], "status": 1, "blockNumber": self.block_number}
+            self.mined_nonce += 1
+
+
+class FakeWeb3:
+    def __init__(self, eth):
+        self.eth = eth
+
+
+class FakeFunction:
+    def __init__(self, name):
+        self.name = name
+
+    def build_transaction(self, params):
+        return dict(params, to="0x00000000000000000000000000000000000000c0", data=self.name, value=0, chainId=1)
+
+
+async def fake_sign(txn):
+    return json.dumps(txn).encode()
+
+
+def make_manager(monkeypatch, eth, **kwargs):
+    monkeypatch.setattr(tx_manager.TransactionSigner, "sign", staticmethod(fake_sign))
+    db = MemoryClient()["test"]
+    options = dict(bump_after_blocks=2, bump_percent=25, max_bumps=3, max_gas_price=0,
+                   poll_interval=0.001, timeout=5)
+    options.update(kwargs)
+    return TransactionManager(FakeWeb3(eth), collection=lambda: db["transactions"], **options), db
+
+
+async def mine_while(eth, task, interval=0.005):
+    while not task.done():
+        eth.mine()
+        await asyncio.sleep(interval)
+    return task.result()
+
+
+def test_underpriced_transaction_is_bumped_until_mined(monkeypatch):
+    eth = FakeEth(gas_price=GWEI, min_price=int(1.5 * GWEI))
+    manager, db = make_manager(monkeypatch, eth)
+
+    async def run():
+        task = asyncio.ensure_future(manager.send(FakeFunction("startRevealPhase"), "startRevealPhase", "k1", 500000))
+        receipt = await mine_while(eth, task)
+        record = await db["transactions"].find_one({"key": "k1"})
+        return receipt, record
+
+    receipt, record = asyncio.run(run())
+    assert receipt["status"] == 1
+    # 1 gwei -> 1.25 -> 1.5625 gwei, all with nonce 0
+    assert [a["gas_price"] for a in record["attempts"]] == [GWEI, 1_250_000_000, 1_562_500_000]
+    assert {t["nonce"] for t in eth.sent} == {0}
+    assert record["status"] == "mined"
+    assert record["mined_hash"] == record["attempts"][-1]["hash"]
+
+
+def test_bumps_are_capped(monkeypatch):
+    async def run(manager, db, eth):
+        task = asyncio.ensure_future(manager.send(FakeFunction("finalize"), "finalize", "k1", 500000))
+        with pytest.raises(TransactionStuck):
+            await mine_while(eth, task)
+        return await db["transactions"].find_one({"key": "k1"})
+
+    # by count
+    eth = FakeEth(gas_price=GWEI, min_price=10 * GWEI)
+    manager, db = make_manager(monkeypatch, eth, max_bumps=2, timeout=0.2)
+    record = asyncio.run(run(manager, db, eth))
+    assert [a["gas_price"] for a in record["attempts"]] == [GWEI, 1_250_000_000, 1_562_500_000]
+    # left pending, so the next send of the same call resumes it
+    assert record["status"] == "pending"
+
+    # by price: the last bump is clipped to the cap, after which there are no more
+    eth = FakeEth(gas_price=GWEI, min_price=10 * GWEI)
+    manager, db = make_manager(monkeypatch, eth, max_bumps=5, max_gas_price=int(1.3 * GWEI), timeout=0.2)
+    record = asyncio.run(run(manager, db, eth))
+    assert [a["gas_price"] for a in record["attempts"]] == [GWEI, 1_250_000_000, 1_300_000_000]
+
+
+def test_same_call_reuses_the_pending_transaction(monkeypatch):
+    eth = FakeEth()
+    manager, db = make_manager(monkeypatch, eth)
+
+    async def run():
+        fn = FakeFunction("finalize")
+        first = asyncio.ensure_future(manager.send(fn, "finalize", "same", 500000))
+        second = asyncio.ensure_future(manager.send(fn, "finalize", "same", 500000))
+        other = asyncio.ensure_future(manager.send(fn, "finalize", "other", 500000))
+        await asyncio.sleep(0.01)
+        return await mine_while(eth, asyncio.gather(first, second, other))
+
+    first, second, other = asyncio.run(run())
+    assert first == second
+    assert first != other
+    # two transactions with consecutive nonces, no duplicate for the repeated call
+    assert sorted(t["nonce"] for t in eth.sent) == [0, 1]
+
+
+def test_call_key_is_stable():
+    assert call_key("VoteContract.finalize", {"a": 1, "b": [2]}) == call_key("VoteContract.finalize", {"b": [2], "a": 1})
+    assert call_key("VoteContract.finalize", {"a": 1}) != call_key("VoteContract.startRevealPhase", {"a": 1})
+
+
+def test_abandoned_pending_transactions_are_resumed(monkeypatch):
+    eth = FakeEth(gas_price=GWEI, min_price=int(1.2 * GWEI))
+    manager, db = make_manager(monkeypatch, eth, timeout=0.05)
+
+    async def run():
+        # underpriced and given up on; the call is never sent again
+        with pytest.raises(TransactionStuck):
+            await manager.send(FakeFunction("startRevealPhase"), "startRevealPhase", "abandoned", 500000)
+        # without bumps nothing behind nonce 0 is mined
+        for _ in range(5):
+            eth.mine()
+        assert eth.mined_nonce == 0
+
+        manager.timeout = 5
+        later = asyncio.ensure_future(manager.send(FakeFunction("finalize"), "finalize", "later", 500000))
+        await asyncio.sleep(0.01)
+        # one poll per pass, bumping when due, never waiting out the timeout
+        passes = []
+        while not passes or not passes[-1]["mined"]:
+            started = time.monotonic()
+            passes.append(await manager.resume_pending())
+            assert time.monotonic() - started < 1
+            eth.mine()
+        await mine_while(eth, later)
+        return passes, await manager.pending()
+
+    passes, pending = asyncio.run(run())
+    assert passes[0] == {"mined": 0, "stuck": 1, "failed": 0}
+    # the later send is watched by its own caller, not resumed
+    assert passes[-1] == {"mined": 1, "stuck": 0, "failed": 0}
+    assert pending == []
+    assert eth.mined_nonce == 2
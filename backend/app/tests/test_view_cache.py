@@ -0,0 +1,138 @@
+import asyncio
+import time
+
+from app.services.view_cache import ViewCache
+
+
+class FakeChain:
+    """
+    A chain whose head and getProposalVoters state the test sets; counts eth_calls.
+    """
+
+    def __init__(self):
+        self.head = 100
+        self.block_reads = 0
+        self.voters = {}
+        self.calls = []
+        self.eth = self
+
+    @property
+    def block_number(self):
+        self.block_reads += 1
+        return self.head
+
+
+class FakeContract:
+    address = "0x" + "77" * 20
+
+    def __init__(self, chain):
+        self.chain = chain
+        self.functions = self
+
+    def getProposalVoters(self, proposalId):
+        return self._bound("getProposalVoters", proposalId)
+
+    def proposals(self, proposal_id):
+        return self._bound("proposals", proposal_id)
+
+    def _bound(self, method, proposal_id):
+        chain = self.chain
+
+        class Bound:
+            def call(self, block_identifier):
+                chain.calls.append((method, proposal_id, block_identifier))
+                time.sleep(0.01)
+                if method == "proposals":
+                    return ("0x" + "aa" * 20, True, "scam", proposal_id)
+                return list(chain.voters.get(proposal_id, []))
+
+        return Bound()
+
+
+def test_reads_within_a_block_share_one_call():
+    chain = FakeChain()
+    contract = FakeContract(chain)
+    views = ViewCache(chain, head_ttl=60)
+
+    async def run():
+        concurrent = await asyncio.gather(*(
+            views.call(contract, "getProposalVoters", {"proposalId": "p1"}, proposal_id="p1") for _ in range(5)
+        ))
+        again = await views.call(contract, "getProposalVoters", {"proposalId": "p1"}, proposal_id="p1")
+        getter = await views.call(contract, "proposals", ("p1",), proposal_id="p1")
+        return concurrent, again, getter
+
+    concurrent, again, getter = asyncio.run(run())
+    assert concurrent == [[]] * 5 and again == []
+    assert getter[2] == "scam"
+    assert chain.calls == [("getProposalVoters", "p1", 100), ("proposals", "p1", 100)]
+    assert chain.block_reads == 1
+
+
+def test_a_new_head_invalidates_everything():
+    chain = FakeChain()
+    contract = FakeContract(chain)
+    views = ViewCache(chain, head_ttl=0.05)
+
+    async def run():
+        first = await views.call(contract, "getProposalVoters", {"proposalId": "p1"}, proposal_id="p1")
+        chain.voters["p1"] = ["0xv1"]
+        stale = await views.call(contract, "getProposalVoters", {"proposalId": "p1"}, proposal_id="p1")
+        await asyncio.sleep(0.1)
+        same_head = await views.call(contract, "getProposalVoters", {"proposalId": "p1"}, proposal_id="p1")
+        chain.head = 101
+        await asyncio.sleep(0.1)
+        new_head = await views.call(contract, "getProposalVoters", {"proposalId": "p1"}, proposal_id="p1")
+        return first, stale, same_head, new_head
+
+    first, stale, same_head, new_head = asyncio.run(run())
+    # within the head TTL and on the same head the cached result stands
+    assert first == stale == same_head == []
+    assert new_head == ["0xv1"]
+    assert [block for _, _, block in chain.calls] == [100, 101]
+
+
+def test_observed_transactions_invalidate_at_once():
+    chain = FakeChain()
+    contract = FakeContract(chain)
+    views = ViewCache(chain, head_ttl=60)
+
+    async def voters(proposal_id):
+        return await views.call(contract, "getProposalVoters", {"proposalId": proposal_id}, proposal_id=proposal_id)
+
+    async def run():
+        await voters("p1")
+        await voters("p2")
+        # a relayed commitVote mined in the head block itself
+        chain.voters["p1"] = ["0xv1"]
+        views.observe(100, "p1")
+        after_same_block = (await voters("p1"), await voters("p2"))
+        # a backend transaction mined in a later block
+        chain.voters["p2"] = ["0xv2"]
+        views.observe(102, "p2")
+        return after_same_block, await voters("p2")
+
+    (p1, p2_cached), p2 = asyncio.run(run())
+    assert p1 == ["0xv1"] and p2_cached == []
+    assert p2 == ["0xv2"]
+    assert chain.calls[-1] == ("getProposalVoters", "p2", 102)
+    # the head came from the receipts, not from polling
+    assert chain.block_reads == 1
+
+
+def test_reads_in_flight_during_a_change_are_not_stored():
+    chain = FakeChain()
+    contract = FakeContract(chain)
+    views = ViewCache(chain, head_ttl=60)
+
+    async def run():
+        read = asyncio.ensure_future(
+            views.call(contract, "getProposalVoters", {"proposalId": "p1"}, proposal_id="p1"))
+        await asyncio.sleep(0.002)
+        views.invalidate("p1")
+        await read
+        chain.voters["p1"] = ["0xv1"]
+        return await views.call(contract, "getProposalVoters", {"proposalId": "p1"}, proposal_id="p1")
+
+    assert asyncio.run(run()) == ["0xv1"]
+    assert len(chain.calls) == 2
@@ -0,0 +1,38 @@
+import pytest
+
+from app.services.vote_codec import RECORD, decode_votes, encode_votes
+
+VOTES = [
+    {"user": "0x" + "11" * 20, "vote": "yes", "prediction_yes": 0.73, "prediction_no": 0.27},
+    {"user": "0x" + "ab" * 20, "vote": "no", "prediction_yes": 0.0, "prediction_no": 1.0},
+    {"user": "0x" + "ff" * 20, "vote": "yes", "prediction_yes": 1.0, "prediction_no": 0.0},
+]
+
+
+def test_round_trip():
+    body = encode_votes(VOTES)
+    votes, aggregate = decode_votes(body)
+    assert votes == VOTES
+    assert aggregate is None
+
+
+def test_round_trip_with_aggregate():
+    aggregate = {"total": 1200, "yes_count": 700, "sum_log_yes": -812.5, "sum_log_no": -903.25}
+    votes, decoded = decode_votes(encode_votes(VOTES, aggregate))
+    assert votes == VOTES
+    assert decoded == aggregate
+
+
+def test_records_are_fixed_width():
+    assert len(encode_votes(VOTES)) - len(encode_votes([])) == 3 * RECORD.size
+
+
+def test_rejects_non_address_users():
+    with pytest.raises(ValueError):
+        encode_votes([{"user": "alice", "vote": "yes", "prediction_yes": 0.5, "prediction_no": 0.5}])
+
+
+@pytest.mark.parametrize("body", [b"", b"JSON" + bytes(6), encode_votes(VOTES)[:-1]])
+def test_rejects_malformed_payloads(body):
+    with pytest.raises(ValueError):
+        decode_votes(body)
@@ -0,0 +1,109 @@
+import asyncio
+
+import pytest
+from pymongo.errors import BulkWriteError
+
+from app.services.vote_ingest import IngestQueueFull, VoteIngestBuffer
+
+
+class FakeVotesCollection:
+    def __init__(self, invalid_ids=(), unconfirmed=False):
+        self.batches = []
+        self.stored = set()
+        self.invalid_ids = set(invalid_ids)
+        self.unconfirmed = unconfirmed
+
+    async def insert_many(self, docs, ordered=True):
+        await asyncio.sleep(0.001)
+        self.batches.append([d["_id"] for d in docs])
+        errors = []
+        for i, d in enumerate(docs):
+            if d["_id"] in self.invalid_ids:
+                errors.append({"index": i, "code": 121, "errmsg": "Document failed validation"})
+            elif d["_id"] in self.stored:
+                errors.append({"index": i, "code": 11000, "errmsg": "duplicate key"})
+            else:
+                self.stored.add(d["_id"])
+        concern_errors = [{"code": 64, "errmsg": "waiting for replication timed out"}] if self.unconfirmed else []
+        if errors or concern_errors:
+            raise BulkWriteError({"writeErrors": errors, "writeConcernErrors": concern_errors})
+
+
+def test_concurrent_votes_are_coalesced():
+    coll = FakeVotesCollection()
+    buffer = VoteIngestBuffer(lambda: coll, max_batch=4, max_delay_ms=5, max_queue=100)
+
+    async def run():
+        await asyncio.gather(*(buffer.submit({"_id": i}) for i in range(10)))
+
+    asyncio.run(run())
+    assert [len(b) for b in coll.batches] == [4, 4, 2]
+    assert sorted(i for b in coll.batches for i in b) == list(range(10))
+
+
+def test_failed_documents_fail_only_their_request():
+    coll = FakeVotesCollection(invalid_ids={1})
+    buffer = VoteIngestBuffer(lambda: coll, max_batch=10, max_delay_ms=1, max_queue=100)
+
+    async def run():
+        return await asyncio.gather(*(buffer.submit({"_id": i}) for i in range(3)), return_exceptions=True)
+
+    results = asyncio.run(run())
+    assert results[0] is None and results[2] is None
+    assert isinstance(results[1], RuntimeError)
+
+
+def test_full_queue_sheds_load():
+    coll = FakeVotesCollection()
+    buffer = VoteIngestBuffer(lambda: coll, max_batch=10, max_delay_ms=50, max_queue=2)
+
+    async def run():
+        waiting = [asyncio.ensure_future(buffer.submit({"_id": i})) for i in range(2)]
+        await asyncio.sleep(0)
+        with pytest.raises(IngestQueueFull):
+            await buffer.submit({"_id": 2})
+        await buffer.drain()
+        await asyncio.gather(*waiting)
+
+    asyncio.run(run())
+    assert coll.batches == [[0, 1]]
+
+
+def test_on_written_sees_only_stored_votes():
+    coll = FakeVotesCollection(invalid_ids={1})
+    seen = []
+
+    async def on_written(docs):
+        seen.extend(d["_id"] for d in docs)
+
+    buffer = VoteIngestBuffer(lambda: coll, max_batch=10, max_delay_ms=1, max_queue=100, on_written=on_written)
+
+    async def run():
+        await asyncio.gather(*(buffer.submit({"_id": i}) for i in range(3)), return_exceptions=True)
+
+    asyncio.run(run())
+    assert seen == [0, 2]
+
+
+def test_votes_retried_after_an_unconfirmed_write_are_stored_once():
+    coll = FakeVotesCollection(unconfirmed=True)
+    seen = []
+
+    async def on_written(docs):
+        seen.extend(d["_id"] for d in docs)
+
+    buffer = VoteIngestBuffer(lambda: coll, max_batch=10, max_delay_ms=1, max_queue=100, on_written=on_written)
+
+    async def run():
+        first = await asyncio.gather(*(buffer.submit({"_id": i}) for i in range(2)), return_exceptions=True)
+        coll.unconfirmed = False
+        # the clients retry: their votes are already stored
+        retried = await asyncio.gather(*(buffer.submit({"_id": i}) for i in range(2)), return_exceptions=True)
+        return first, retried
+
+    first, retried = asyncio.run(run())
+    assert all(isinstance(r, BulkWriteError) for r in first)
+    assert retried == [None, None]
+    assert coll.stored == {0, 1}
+    # tallied once, with the write that stored them
+    assert seen == [0, 1]
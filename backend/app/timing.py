@@ -0,0 +1,96 @@
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Dict, List
+
+from pymongo import monitoring
+
+from app.metrics import DEPENDENCY_SECONDS, REQUEST_SECONDS
+
+# component -> [total seconds, calls] for the request being handled, if any.
+# Motor and asyncio.to_thread copy the context into their worker threads, so
+# calls made there are attributed to the request too.
+_request_timings: ContextVar[Dict[str, List[float]] | None] = ContextVar("request_timings", default=None)
+
+
+def record(component: str, seconds: float):
+    DEPENDENCY_SECONDS.observe(seconds, component=component)
+    timings = _request_timings.get()
+    if timings is not None:
+        entry = timings.setdefault(component, [0.0, 0])
+        entry[0] += seconds
+        entry[1] += 1
+
+
+@contextmanager
+def timed(component: str):
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        record(component, time.perf_counter() - start)
+
+
+class MongoTimingListener(monitoring.CommandListener):
+    """
+    Times every Mongo command (including cursor getMores) from the driver's own
+    round-trip measurement.
+    """
+
+    def started(self, event):
+        pass
+
+    def succeeded(self, event):
+        record("mongo", event.duration_micros / 1_000_000)
+
+    def failed(self, event):
+        record("mongo", event.duration_micros / 1_000_000)
+
+
+def server_timing(timings: Dict[str, List[float]], total: float) -> str:
+    parts = [
+        f'{component};dur={seconds * 1000:.1f};desc="{calls} call{"" if calls == 1 else "s"}"'
+        for component, (seconds, calls) in timings.items()
+    ]
+    parts.append(f"total;dur={total * 1000:.1f}")
+    return ", ".join(parts)
+
+
+class TimingMiddleware:
+    """
+    ASGI middleware that collects the dependency timings of each request into a
+    Server-Timing header and observes the request latency histogram.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        timings: Dict[str, List[float]] = {}
+        token = _request_timings.set(timings)
+        start = time.perf_counter()
+        status = 500
+
+        async def send_with_timing(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+                header = server_timing(timings, time.perf_counter() - start)
+                message["headers"] = list(message.get("headers", [])) + [(b"server-timing", header.encode())]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_timing)
+        finally:
+            _request_timings.reset(token)
+            route = scope.get("route")
+            REQUEST_SECONDS.observe(
+                time.perf_counter() - start,
+                method=scope["method"],
+                route=getattr(route, "path", "unmatched"),
+                status=status,
+            )
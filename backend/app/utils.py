@@ -3,6 +3,9 @@ import os
 import aiohttp
 from typing import Dict, Any
 
+from app.config import WORLDCOIN_API_URL
+from app.timing import timed
+
 def get_logger(name: str = __name__) -> logging.Logger:
     """
     Utility to get a configured logger.
@@ -40,7 +43,7 @@ async def verify_world_id(is_success_result: Dict[str, Any]) -> Dict[str, Any]:
     action = os.getenv("WORLD_ID_ACTION")
     
     # Construct the endpoint URL
-    url = f"https://developer.worldcoin.org/api/v2/verify/{app_id}"
+    url = f"{WORLDCOIN_API_URL}/api/v2/verify/{app_id}"
     
     # Prepare the request payload
     payload = {
@@ -58,15 +61,16 @@ async def verify_world_id(is_success_result: Dict[str, Any]) -> Dict[str, Any]:
     
     try:
         # Use aiohttp for async HTTP requests
-        async with aiohttp.ClientSession() as session:
-            async with session.post(url, headers=headers, json=payload) as response:
-                # Check for HTTP errors
-                response.raise_for_status()
-                
-                # Parse the JSON response
-                result = await response.json()
-                logger.info("World ID API call completed successfully")
-                return result
+        with timed("worldid"):
+            async with aiohttp.ClientSession() as session:
+                async with session.post(url, headers=headers, json=payload) as response:
+                    # Check for HTTP errors
+                    response.raise_for_status()
+
+                    # Parse the JSON response
+                    result = await response.json()
+        logger.info("World ID API call completed successfully")
+        return result
                 
     except aiohttp.ClientError as e:
         logger.error(f"World ID API call failed: {str(e)}")
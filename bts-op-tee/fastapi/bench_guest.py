@@ -0,0 +1,97 @@
+"""
+Throughput benchmark: one socket per command (the old run_in_guest) versus the
+persistent GuestPool, against the local guest simulator.
+
+    python bench_guest.py --requests 200 --concurrency 8 --voters 40
+
+The simulator starts a Python process for every BTS command, which dominates
+the timings; `--command cat` echoes the payload instead to isolate the
+transport overhead.
+"""
+import argparse
+import asyncio
+import json
+import random
+import time
+
+from guest_pool import GuestPool
+from guest_sim import start_guest
+
+COMMAND = "optee_example_bts_voting process_vote -"
+
+
+def make_payload(voters: int) -> bytes:
+    votes = []
+    for i in range(voters):
+        p = random.randint(0, 100) / 100
+        votes.append({
+            "user": f"0x{i:040x}",
+            "vote": random.choice(["yes", "no"]),
+            "prediction_yes": p,
+            "prediction_no": round(1 - p, 2),
+        })
+    return json.dumps({"votes": votes}, separators=(",", ":")).encode()
+
+
+async def single_shot(port: int, command: str, payload: bytes) -> str:
+    """
+    The original transport: new connection, send, a single read of 4 KB.
+    """
+    reader, writer = await asyncio.open_connection("127.0.0.1", port)
+    try:
+        writer.write(f"{command} <<'BTS_EOF'\n".encode() + payload + b"\nBTS_EOF\n")
+        await writer.drain()
+        return (await reader.read(4096)).decode()
+    finally:
+        writer.close()
+
+
+async def run(label, call, requests, concurrency):
+    sem = asyncio.Semaphore(concurrency)
+    complete = 0
+
+    async def one():
+        nonlocal complete
+        async with sem:
+            output = await call()
+            try:
+                json.loads(output)
+                complete += 1
+            except ValueError:
+                pass
+
+    start = time.perf_counter()
+    await asyncio.gather(*(one() for _ in range(requests)))
+    elapsed = time.perf_counter() - start
+    print(f"{label:<28} {requests / elapsed:>8.1f} req/s   complete replies {complete}/{requests}")
+
+
+async def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--requests", type=int, default=200)
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--voters", type=int, default=40)
+    parser.add_argument("--command", default=COMMAND)
+    args = parser.parse_args()
+
+    server = start_guest(port=0)
+    port = server.port
+    payload = make_payload(args.voters)
+    print(f"payload {len(payload)} bytes, {args.voters} voters")
+
+    async def payload_stream():
+        yield payload
+
+    pool = GuestPool("127.0.0.1", port, size=args.concurrency)
+    try:
+        await run("socket per command", lambda: single_shot(port, args.command, payload),
+                  args.requests, args.concurrency)
+        await run("persistent pool", lambda: pool.run(args.command, payload_stream()),
+                  args.requests, args.concurrency)
+    finally:
+        pool.close()
+        server.shutdown()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,61 @@
+"""
+Signatures per second for TEE results: inline ecdsa (the old sign_result)
+versus ResultSigner with the ecdsa process pool and with native cryptography.
+
+    python bench_signer.py --signatures 2000
+
+Every signature is checked against the ecdsa verifying key, which is what
+/pubkey clients use.
+"""
+import argparse
+import asyncio
+import json
+import time
+
+from ecdsa import SigningKey, NIST256p
+
+from result_signer import HAVE_CRYPTOGRAPHY, ResultSigner
+
+
+def make_messages(count: int):
+    return [json.dumps({"user_scores": {f"0x{i:040x}": i}}, sort_keys=True).encode() for i in range(count)]
+
+
+async def run_signer(signer: ResultSigner, messages):
+    # 先暖機，讓行程池把 worker 都開好
+    await signer.sign(b"warmup")
+    start = time.perf_counter()
+    signatures = await asyncio.gather(*(signer.sign(m) for m in messages))
+    return signatures, time.perf_counter() - start
+
+
+async def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--signatures", type=int, default=2000)
+    args = parser.parse_args()
+
+    key = SigningKey.generate(curve=NIST256p)
+    verifying_key = key.get_verifying_key()
+    messages = make_messages(args.signatures)
+
+    start = time.perf_counter()
+    for m in messages:
+        key.sign(m)
+    elapsed = time.perf_counter() - start
+    print(f"{'inline ecdsa':<24} {len(messages) / elapsed:>10.0f} sig/s")
+
+    variants = [("ecdsa process pool", False)]
+    if HAVE_CRYPTOGRAPHY:
+        variants.append(("native cryptography", True))
+    for label, native in variants:
+        signer = ResultSigner(key, native=native)
+        try:
+            signatures, elapsed = await run_signer(signer, messages)
+        finally:
+            signer.close()
+        valid = all(verifying_key.verify(s, m) for s, m in zip(signatures, messages))
+        print(f"{label:<24} {len(messages) / elapsed:>10.0f} sig/s   verified {valid}")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,126 @@
+"""
+Persistent, framed connections to the OP-TEE guest shell.
+
+The guest runs `socat TCP-LISTEN:6000,reuseaddr,fork EXEC:/bin/sh`, so every TCP
+connection is a long-lived shell. Instead of opening a socket per command and
+reading a single 4 KB packet, GuestPool keeps a few shells open and frames each
+reply with a fresh end marker that carries the exit status:
+
+    <command>
+    printf '\n<marker> %s\n' "$?"
+
+The reply is everything up to the marker, of any size.
+"""
+import asyncio
+import os
+import secrets
+from typing import AsyncIterable, Optional
+
+HEREDOC_MARK = "BTS_EOF"
+READ_LIMIT = 64 * 1024 * 1024  # largest single reply we accept
+
+
+class GuestError(Exception):
+    pass
+
+
+class GuestConnection:
+    def __init__(self, host: str, port: int, connect_timeout: float):
+        self.host = host
+        self.port = port
+        self.connect_timeout = connect_timeout
+        self.reader: Optional[asyncio.StreamReader] = None
+        self.writer: Optional[asyncio.StreamWriter] = None
+
+    @property
+    def connected(self) -> bool:
+        return self.writer is not None and not self.writer.is_closing()
+
+    async def connect(self):
+        self.reader, self.writer = await asyncio.wait_for(
+            asyncio.open_connection(self.host, self.port, limit=READ_LIMIT),
+            timeout=self.connect_timeout,
+        )
+
+    def close(self):
+        if self.writer is not None:
+            self.writer.close()
+        self.reader = self.writer = None
+
+    async def run(self, command: str, stdin: Optional[AsyncIterable[bytes]] = None) -> str:
+        """
+        Run one command and return its complete stdout.
+
+        When stdin is given, its chunks are streamed into the command through a
+        heredoc with all whitespace removed (the payload must be a single line).
+        """
+        if not self.connected:
+            await self.connect()
+        # a new marker per command: output left over from another command can't end this reply
+        marker = f"__BTS_END_{secrets.token_hex(8)}__"
+
+        if stdin is None:
+            self.writer.write(f"{command}\n".encode())
+        else:
+            self.writer.write(f"{command} <<'{HEREDOC_MARK}'\n".encode())
+            async for chunk in stdin:
+                self.writer.write(b"".join(chunk.split()))
+                await self.writer.drain()
+            self.writer.write(f"\n{HEREDOC_MARK}\n".encode())
+        self.writer.write(f"printf '\\n%s %s\\n' {marker} \"$?\"\n".encode())
+        await self.writer.drain()
+
+        separator = f"\n{marker} ".encode()
+        output = await self.reader.readuntil(separator)
+        status = (await self.reader.readline()).strip()
+
+        if status != b"0":
+            raise GuestError(f"Guest command exited with status {status.decode()}")
+        return output[:-len(separator)].decode()
+
+
+class GuestPool:
+    """
+    A small pool of persistent guest connections.
+
+    Concurrent callers each borrow their own shell, so up to `size` commands run
+    in the guest at once; further callers wait for a free connection.
+    """
+
+    def __init__(self, host: str, port: int, size: int = 4,
+                 connect_timeout: float = 3, command_timeout: float = 60):
+        self.command_timeout = command_timeout
+        self._idle: asyncio.Queue = asyncio.Queue()
+        for _ in range(size):
+            self._idle.put_nowait(GuestConnection(host, port, connect_timeout))
+
+    async def run(self, command: str, stdin: Optional[AsyncIterable[bytes]] = None) -> str:
+        conn = await self._idle.get()
+        try:
+            return await asyncio.wait_for(conn.run(command, stdin), timeout=self.command_timeout)
+        except GuestError:
+            raise
+        except Exception as e:
+            # The shell may be mid-reply; drop it and reconnect on next use.
+            conn.close()
+            raise GuestError(f"{type(e).__name__}: {e}") from e
+        except BaseException:
+            # Cancelled mid-command (e.g. the client went away): its reply is
+            # still unread, so the shell can't be handed to the next caller.
+            conn.close()
+            raise
+        finally:
+            self._idle.put_nowait(conn)
+
+    def close(self):
+        while not self._idle.empty():
+            self._idle.get_nowait().close()
+
+
+def pool_from_env() -> GuestPool:
+    return GuestPool(
+        host=os.getenv("GUEST_HOST", "127.0.0.1"),
+        port=int(os.getenv("GUEST_PORT", "6000")),
+        size=int(os.getenv("GUEST_POOL_SIZE", "4")),
+        command_timeout=float(os.getenv("GUEST_COMMAND_TIMEOUT", "60")),
+    )
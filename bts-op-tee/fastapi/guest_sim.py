@@ -0,0 +1,121 @@
+"""
+Local stand-in for the QEMU OP-TEE guest.
+
+Run as a server it behaves like `socat TCP-LISTEN:6000,reuseaddr,fork EXEC:/bin/sh`:
+every connection gets its own /bin/sh, with a fake `optee_example_bts_voting` on
+PATH that scores votes with the same BTS formula as the TA.
+
+    python guest_sim.py --port 6000
+
+Invoked as the fake binary it reads the vote JSON and prints the TA's output:
+
+    python guest_sim.py process_vote -
+"""
+import argparse
+import json
+import math
+import os
+import socket
+import socketserver
+import stat
+import subprocess
+import sys
+import tempfile
+import threading
+
+EPSILON = 1e-6
+SCORE_SCALE = 1_000_000
+BINARY_NAME = "optee_example_bts_voting"
+
+
+def process_vote(raw: str) -> str:
+    data = json.loads(raw)
+    votes = data.get("votes", [])
+    aggregate = data.get("aggregate")
+
+    if aggregate is None:
+        aggregate = {
+            "total": len(votes),
+            "yes_count": sum(1 for v in votes if v["vote"] == "yes"),
+            "sum_log_yes": sum(math.log(max(v["prediction_yes"], EPSILON)) for v in votes),
+            "sum_log_no": sum(math.log(max(v["prediction_no"], EPSILON)) for v in votes),
+        }
+
+    scores = {}
+    total = aggregate["total"]
+    if total > 0:
+        info_yes = math.log(max(aggregate["yes_count"] / total, EPSILON)) - aggregate["sum_log_yes"] / total
+        info_no = math.log(max((total - aggregate["yes_count"]) / total, EPSILON)) - aggregate["sum_log_no"] / total
+        for v in votes:
+            p_yes = max(v["prediction_yes"], EPSILON)
+            p_no = max(v["prediction_no"], EPSILON)
+            term_a = info_yes if v["vote"] == "yes" else info_no
+            term_b = -(p_yes * info_yes + p_no * info_no)
+            scores[v["user"]] = round((term_a + term_b) * SCORE_SCALE)
+
+    body = ", ".join(f'"{user}": {score}' for user, score in scores.items())
+    return '{"user_scores": {' + body + '}, "signature": "FAKE_SIGNATURE_FROM_TA"}'
+
+
+def install_fake_binary() -> str:
+    """
+    Write an `optee_example_bts_voting` wrapper into a temp dir and return the dir.
+    """
+    bin_dir = tempfile.mkdtemp(prefix="bts_guest_sim_")
+    path = os.path.join(bin_dir, BINARY_NAME)
+    with open(path, "w") as f:
+        f.write(f'#!/bin/sh\nexec "{sys.executable}" "{os.path.abspath(__file__)}" "$@"\n')
+    os.chmod(path, os.stat(path).st_mode | stat.S_IXUSR | stat.S_IXGRP | stat.S_IXOTH)
+    return bin_dir
+
+
+class _ShellHandler(socketserver.BaseRequestHandler):
+    def handle(self):
+        # Same as socat ...,nodelay EXEC:/bin/sh: the socket is the shell's stdin and stdout.
+        self.request.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        proc = subprocess.Popen(["/bin/sh"], stdin=self.request, stdout=self.request, env=self.server.env)
+        proc.wait()
+
+
+class GuestServer(socketserver.ThreadingTCPServer):
+    daemon_threads = True
+    allow_reuse_address = True
+
+    def __init__(self, host: str, port: int):
+        super().__init__((host, port), _ShellHandler)
+        self.env = dict(os.environ)
+        self.env["PATH"] = install_fake_binary() + os.pathsep + self.env.get("PATH", "")
+
+    @property
+    def port(self) -> int:
+        return self.server_address[1]
+
+
+def start_guest(host: str = "127.0.0.1", port: int = 6000) -> GuestServer:
+    """
+    Start the simulated guest in a background thread (port 0 picks a free port).
+    Call shutdown() on the returned server to stop it.
+    """
+    server = GuestServer(host, port)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def main():
+    if len(sys.argv) >= 3 and sys.argv[1] == "process_vote":
+        raw = sys.stdin.read() if sys.argv[2] == "-" else sys.argv[2]
+        sys.stdout.write(process_vote(raw))
+        return
+
+    parser = argparse.ArgumentParser(description="Simulated OP-TEE guest shell")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=6000)
+    args = parser.parse_args()
+
+    server = GuestServer(args.host, args.port)
+    print(f"Simulated OP-TEE guest listening on {args.host}:{args.port}")
+    server.serve_forever()
+
+
+if __name__ == "__main__":
+    main()
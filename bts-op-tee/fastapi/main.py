@@ -1,11 +1,17 @@
-from fastapi import FastAPI, HTTPException, UploadFile, File, Form
+from fastapi import FastAPI, HTTPException, UploadFile, File, Form, Request
 from pydantic import BaseModel
-import socket
+import asyncio
+import contextlib
 import json
 import os
+import tempfile
 from ecdsa import SigningKey, VerifyingKey, NIST256p
 import base64
 
+from guest_pool import pool_from_env
+from result_signer import ResultSigner
+from vote_codec import VOTES_CONTENT_TYPE, decode_votes
+
 app = FastAPI()
 
 SHARED_FOLDER = "/optee_2/shared_folder"
@@ -13,23 +19,48 @@ SHARED_FOLDER = "/optee_2/shared_folder"
 # ====== 固定 ECDSA 密鑰對（開機就產生一次） ======
 PRIVATE_KEY = SigningKey.generate(curve=NIST256p)
 PUBLIC_KEY = PRIVATE_KEY.get_verifying_key()
+# 簽章不在事件迴圈上做（原生 cryptography 或行程池 ecdsa），同一輪的請求一起批次簽
+SIGNER = ResultSigner(PRIVATE_KEY)
+
+UPLOAD_CHUNK_SIZE = 1024 * 1024
+
+def _append(f, data: bytes):
+    f.write(data)
 
-# ====== API: 上傳 JSON 檔案 ======
+# ====== API: 上傳 JSON 檔案（分塊串流寫入，記憶體用量固定） ======
 @app.post("/upload")
-def upload_json(file: UploadFile = File(...), filename: str = Form(...)):
-    if not filename.endswith(".json"):
+async def upload_json(file: UploadFile = File(...), filename: str = Form(...)):
+    if not filename.endswith(".json") or os.path.basename(filename) != filename:
         raise HTTPException(status_code=400, detail="Filename must end with .json")
 
     file_path = os.path.join(SHARED_FOLDER, filename)
+    f = None
 
     try:
-        with open(file_path, "wb") as f:
-            content = file.file.read()
-            # 移掉所有的空白
-            content = b"".join(content.split())
-            f.write(content)
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=f"Failed to save file: {str(e)}")
+        # 每次上傳用自己的暫存檔，同名的並行上傳不會寫進同一個檔案
+        f = await asyncio.to_thread(
+            tempfile.NamedTemporaryFile, dir=SHARED_FOLDER, prefix=filename + ".", suffix=".part", delete=False
+        )
+        try:
+            while chunk := await file.read(UPLOAD_CHUNK_SIZE):
+                # 移掉所有的空白（逐塊處理，空白不會跨塊影響結果）
+                await asyncio.to_thread(_append, f, b"".join(chunk.split()))
+        finally:
+            await asyncio.to_thread(f.close)
+        # 暫存檔預設只有擁有者可讀，改回一般檔案的權限
+        await asyncio.to_thread(os.chmod, f.name, 0o644)
+        # 寫完才換名，/vote 不會讀到寫一半的檔案
+        await asyncio.to_thread(os.replace, f.name, file_path)
+    except BaseException as e:
+        # 失敗或中斷（連線斷掉、請求取消）都把暫存檔刪掉
+        if f is not None:
+            with contextlib.suppress(FileNotFoundError):
+                os.unlink(f.name)
+        if isinstance(e, Exception):
+            raise HTTPException(status_code=500, detail=f"Failed to save file: {str(e)}")
+        raise
+    finally:
+        await file.close()
 
     return {"message": f"File '{filename}' uploaded successfully."}
 
@@ -42,30 +73,30 @@ def get_pubkey():
         "public_key": PUBLIC_KEY.to_string().hex()
     }
 
-# ====== Guest 命令執行器 ======
-def run_in_guest(command: str) -> str:
+# ====== Guest 命令執行器（常駐連線池 + 結束標記分框） ======
+GUEST = pool_from_env()
+
+@app.on_event("shutdown")
+def close_guest_pool():
+    GUEST.close()
+    SIGNER.close()
+
+async def run_in_guest(command: str, stdin=None) -> str:
     try:
-        with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as s:
-            s.settimeout(3)
-            s.connect(("127.0.0.1", 6000))
-            s.sendall((command + "\n").encode())
-            output = s.recv(4096)
-            return output.decode()
+        return await GUEST.run(command, stdin)
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Failed to run command in guest: {str(e)}")
 
-class VoteRequest(BaseModel):
-    json_file_name: str
-
-# ====== API: 呼叫 BTS 計算並簽章 ======
-@app.post("/vote")
-def run_bts_voting(payload: VoteRequest):
-    json_file_name = payload.json_file_name
-    command = f"cat {json_file_name} | optee_example_bts_voting process_vote -"
-    output = run_in_guest(command) + "}"
+def parse_guest_output(output: str) -> dict:
+    try:
+        return json.loads(output)
+    except ValueError:
+        # 舊版 TA 輸出少了最後的 "}"
+        return json.loads(output + "}")
 
+async def sign_result(output: str) -> dict:
     try:
-        parsed = json.loads(output)
+        parsed = parse_guest_output(output)
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Invalid JSON: {str(e)}")
 
@@ -75,10 +106,45 @@ def run_bts_voting(payload: VoteRequest):
     signature_input.pop("signature", None)
     message_bytes = json.dumps(signature_input, sort_keys=True).encode()
 
-    signature = PRIVATE_KEY.sign(message_bytes)
+    signature = await SIGNER.sign(message_bytes)
     signature_b64 = base64.b64encode(signature).decode()
 
     # 回傳附帶 signature（以 base64 格式）
     payload["signature"] = signature_b64
     return {"result": payload}
 
+class VoteRequest(BaseModel):
+    json_file_name: str
+
+# ====== API: 呼叫 BTS 計算並簽章 ======
+@app.post("/vote")
+async def run_bts_voting(payload: VoteRequest):
+    json_file_name = payload.json_file_name
+    command = f"cat {json_file_name} | optee_example_bts_voting process_vote -"
+    output = await run_in_guest(command)
+    return await sign_result(output)
+
+async def _once(data: bytes):
+    yield data
+
+def binary_votes_to_json(body: bytes) -> bytes:
+    try:
+        votes, aggregate = decode_votes(body)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=f"Invalid vote payload: {str(e)}")
+    # TA 只吃 JSON；aggregate 必須放在最前面
+    payload = {"aggregate": aggregate, "votes": votes} if aggregate is not None else {"votes": votes}
+    return json.dumps(payload, separators=(",", ":")).encode()
+
+# ====== API: 一次完成 上傳 + 計算 + 簽章（不落地到 SHARED_FOLDER） ======
+# Content-Type 為 application/x-bts-votes 時是二進位投票格式（見 vote_codec.py），其餘當 JSON 直接串流
+@app.post("/score")
+async def score(request: Request):
+    command = "optee_example_bts_voting process_vote -"
+    content_type = request.headers.get("content-type", "").split(";")[0].strip()
+    if content_type == VOTES_CONTENT_TYPE:
+        stdin = _once(binary_votes_to_json(await request.body()))
+    else:
+        stdin = request.stream()
+    output = await run_in_guest(command, stdin)
+    return await sign_result(output)
@@ -0,0 +1,97 @@
+"""
+Signing of TEE results off the request path.
+
+Signatures keep the format the service has always returned: raw r||s over
+SHA-1 on NIST P-256, so existing verifiers using the /pubkey key keep working.
+With `cryptography` installed the native OpenSSL implementation is used in a
+thread; otherwise pure-Python ecdsa runs in a process pool so it does not hold
+the event loop's GIL. Messages queued in the same loop iteration are signed
+together in one executor call.
+"""
+import asyncio
+import multiprocessing
+import os
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from typing import List, Tuple
+
+from ecdsa import SigningKey, NIST256p
+
+try:
+    from cryptography.hazmat.primitives import hashes
+    from cryptography.hazmat.primitives.asymmetric import ec
+    from cryptography.hazmat.primitives.asymmetric.utils import decode_dss_signature
+    HAVE_CRYPTOGRAPHY = True
+except ImportError:
+    HAVE_CRYPTOGRAPHY = False
+
+COORDINATE_SIZE = 32
+
+_worker_key = None
+
+
+def _init_worker(secret: bytes, native: bool):
+    global _worker_key
+    if native:
+        _worker_key = ec.derive_private_key(int.from_bytes(secret, "big"), ec.SECP256R1())
+    else:
+        _worker_key = SigningKey.from_string(secret, curve=NIST256p)
+
+
+def _sign_batch(messages: List[bytes]) -> List[bytes]:
+    if isinstance(_worker_key, SigningKey):
+        return [_worker_key.sign(m) for m in messages]
+    signatures = []
+    for m in messages:
+        r, s = decode_dss_signature(_worker_key.sign(m, ec.ECDSA(hashes.SHA1())))
+        signatures.append(r.to_bytes(COORDINATE_SIZE, "big") + s.to_bytes(COORDINATE_SIZE, "big"))
+    return signatures
+
+
+class ResultSigner:
+    def __init__(self, signing_key: SigningKey, native: bool = HAVE_CRYPTOGRAPHY, processes: int | None = None):
+        self.native = native
+        secret = signing_key.to_string()
+        if native:
+            # 原生簽章很快，一條執行緒就夠；key 放在本行程的全域變數
+            _init_worker(secret, native)
+            self.executor: Executor = ThreadPoolExecutor(max_workers=1)
+        else:
+            self.executor = ProcessPoolExecutor(
+                max_workers=processes or os.cpu_count() or 1,
+                mp_context=multiprocessing.get_context("spawn"),
+                initializer=_init_worker,
+                initargs=(secret, native),
+            )
+        self._pending: List[Tuple[bytes, asyncio.Future]] = []
+        self._flush_scheduled = False
+
+    async def sign(self, message: bytes) -> bytes:
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        self._pending.append((message, future))
+        if not self._flush_scheduled:
+            self._flush_scheduled = True
+            loop.call_soon(lambda: asyncio.ensure_future(self._flush()))
+        return await future
+
+    async def sign_many(self, messages: List[bytes]) -> List[bytes]:
+        if not messages:
+            return []
+        return await asyncio.get_running_loop().run_in_executor(self.executor, _sign_batch, messages)
+
+    async def _flush(self):
+        batch, self._pending = self._pending, []
+        self._flush_scheduled = False
+        try:
+            signatures = await self.sign_many([m for m, _ in batch])
+        except Exception as e:
+            for _, future in batch:
+                if not future.done():
+                    future.set_exception(e)
+            return
+        for (_, future), signature in zip(batch, signatures):
+            if not future.done():
+                future.set_result(signature)
+
+    def close(self):
+        self.executor.shutdown(wait=False, cancel_futures=True)
@@ -0,0 +1,101 @@
+import struct
+from typing import Dict, List, Tuple
+
+# Binary vote payload for the backend -> TEE link (Content-Type VOTES_CONTENT_TYPE).
+# Keep in sync with backend/app/services/vote_codec.py.
+#
+#   header    "BTSV" | version u8 | flags u8 | count u32
+#   aggregate total u64 | yes_count u64 | sum_log_yes f64 | sum_log_no f64  (flags & FLAG_AGGREGATE)
+#   record    address 20 bytes | u16: vote << 15 | prediction_yes in basis points
+#
+# All integers are little-endian. A record is 22 bytes against ~110 for the
+# compact JSON form of the same vote.
+VOTES_CONTENT_TYPE = "application/x-bts-votes"
+MAGIC = b"BTSV"
+VERSION = 1
+FLAG_AGGREGATE = 0x01
+
+HEADER = struct.Struct("<4sBBI")
+AGGREGATE = struct.Struct("<QQdd")
+RECORD = struct.Struct("<20sH")
+
+PREDICTION_SCALE = 10_000
+VOTE_BIT = 0x8000
+
+
+def encode_votes(votes: List[Dict], aggregate: Dict | None = None) -> bytes:
+    """
+    Encode TA-format votes ({"user", "vote", "prediction_yes", "prediction_no"})
+    and an optional population aggregate into the binary payload.
+
+    Raises ValueError when a vote cannot be represented exactly, e.g. a user that
+    is not a 20-byte hex address; callers then send JSON instead.
+    """
+    flags = FLAG_AGGREGATE if aggregate is not None else 0
+    offset = HEADER.size + (AGGREGATE.size if aggregate is not None else 0)
+    buf = bytearray(offset + RECORD.size * len(votes))
+
+    HEADER.pack_into(buf, 0, MAGIC, VERSION, flags, len(votes))
+    if aggregate is not None:
+        AGGREGATE.pack_into(
+            buf, HEADER.size,
+            aggregate["total"], aggregate["yes_count"], aggregate["sum_log_yes"], aggregate["sum_log_no"],
+        )
+
+    for v in votes:
+        address = _address_bytes(v["user"])
+        basis_points = round(v["prediction_yes"] * PREDICTION_SCALE)
+        if not 0 <= basis_points <= PREDICTION_SCALE:
+            raise ValueError(f"Prediction out of range for {v['user']}: {v['prediction_yes']}")
+        if basis_points + round(v["prediction_no"] * PREDICTION_SCALE) != PREDICTION_SCALE:
+            raise ValueError(f"prediction_yes and prediction_no do not sum to 1 for {v['user']}")
+        packed = basis_points | (VOTE_BIT if v["vote"] == "yes" else 0)
+        RECORD.pack_into(buf, offset, address, packed)
+        offset += RECORD.size
+
+    return bytes(buf)
+
+
+def decode_votes(data) -> Tuple[List[Dict], Dict | None]:
+    """
+    Decode a binary payload back into TA-format votes and the optional aggregate.
+    Parses through a memoryview, so the request body is never copied.
+    """
+    view = memoryview(data)
+    if len(view) < HEADER.size:
+        raise ValueError("Vote payload is shorter than its header")
+
+    magic, version, flags, count = HEADER.unpack_from(view, 0)
+    if magic != MAGIC:
+        raise ValueError("Not a binary vote payload")
+    if version != VERSION:
+        raise ValueError(f"Unsupported vote payload version {version}")
+
+    offset = HEADER.size
+    aggregate = None
+    if flags & FLAG_AGGREGATE:
+        if len(view) < offset + AGGREGATE.size:
+            raise ValueError("Vote payload is missing its aggregate")
+        total, yes_count, sum_log_yes, sum_log_no = AGGREGATE.unpack_from(view, offset)
+        aggregate = {"total": total, "yes_count": yes_count, "sum_log_yes": sum_log_yes, "sum_log_no": sum_log_no}
+        offset += AGGREGATE.size
+
+    if len(view) - offset != count * RECORD.size:
+        raise ValueError(f"Vote payload length does not match its count of {count} votes")
+
+    votes = []
+    for address, packed in RECORD.iter_unpack(view[offset:]):
+        basis_points = packed & ~VOTE_BIT
+        votes.append({
+            "user": "0x" + address.hex(),
+            "vote": "yes" if packed & VOTE_BIT else "no",
+            "prediction_yes": basis_points / PREDICTION_SCALE,
+            "prediction_no": (PREDICTION_SCALE - basis_points) / PREDICTION_SCALE,
+        })
+    return votes, aggregate
+
+
+def _address_bytes(user: str) -> bytes:
+    if not isinstance(user, str) or len(user) != 42 or not user.startswith(("0x", "0X")):
+        raise ValueError(f"Not a 20-byte hex address: {user!r}")
+    return bytes.fromhex(user[2:])
@@ -51,9 +51,15 @@ static float atof_lite(const char *s) {
     float result = 0.0f;
     float decimal = 0.1f;
     int seen_dot = 0;
+    int negative = 0;
 
     while (*s == ' ' || *s == '\n' || *s == '\t') s++;
 
+    if (*s == '-') {
+        negative = 1;
+        s++;
+    }
+
     while (*s) {
         if (*s == '.') {
             seen_dot = 1;
@@ -70,7 +76,24 @@ static float atof_lite(const char *s) {
         s++;
     }
 
-    return result;
+    // 支援 Python json.dumps 產生的科學記號，例如 -5e-05
+    if (*s == 'e' || *s == 'E') {
+        s++;
+        int exp_negative = 0;
+        int exponent = 0;
+        if (*s == '-' || *s == '+') {
+            exp_negative = (*s == '-');
+            s++;
+        }
+        while (*s >= '0' && *s <= '9') {
+            exponent = exponent * 10 + (*s - '0');
+            s++;
+        }
+        while (exponent-- > 0)
+            result = exp_negative ? result * 0.1f : result * 10.0f;
+    }
+
+    return negative ? -result : result;
 }
 
 static int parse_votes_json(const char *json, VoterInfo *voters, int max_voters) {
@@ -139,31 +162,108 @@ static int parse_votes_json(const char *json, VoterInfo *voters, int max_voters)
     return count;
 }
 
-static void compute_bts_scores(const VoterInfo *voters, int num_voters, int *scores) {
-    // 1. 計算實際比例
-    int yes_count = 0;
+/*
+ * 自然對數 ln(x)，x > 0。
+ * TA 沒有 libm，先用 IEEE754 拆出 x = m * 2^e，m 落在 [sqrt(1/2), sqrt(2)]，
+ * 再用 ln(m) = 2 * atanh((m-1)/(m+1)) 的級數展開。
+ */
+static float ln_lite(float x) {
+    union { float f; uint32_t i; } u = { x };
+    int e = (int)((u.i >> 23) & 0xff) - 127;
+    u.i = (u.i & 0x007fffff) | 0x3f800000;
+    float m = u.f;
+    if (m > 1.41421356f) {
+        m *= 0.5f;
+        e++;
+    }
+
+    float t = (m - 1.0f) / (m + 1.0f);
+    float t2 = t * t;
+    float series = t * (1.0f + t2 * (1.0f / 3 + t2 * (1.0f / 5 + t2 * (1.0f / 7 + t2 * (1.0f / 9)))));
+    return 2.0f * series + (float)e * 0.69314718f;
+}
+
+#define BTS_EPSILON     1e-6f
+#define BTS_SCORE_SCALE 1000000.0f  // 與後端 SCORE_SCALE 相同，輸出 micro 單位
+
+typedef struct {
+    int   total;
+    int   yes_count;
+    float sum_log_yes;
+    float sum_log_no;
+} BtsAggregate;
+
+static float clamp_eps(float x) {
+    return x > BTS_EPSILON ? x : BTS_EPSILON;
+}
+
+/*
+ * 分片模式：後端把整體統計放在
+ * "aggregate": {"total": N, "yes_count": Y, "sum_log_yes": A, "sum_log_no": B}，
+ * 這一批投票只是其中一片，分數要用整體的數字計算。
+ * 找不到 aggregate 時回傳 0，由這一批投票自己計算。
+ */
+static int parse_aggregate(const char *json, BtsAggregate *agg) {
+    const char *agg_p = find_json_key(json, "\"aggregate\"");
+    if (!agg_p)
+        return 0;
+
+    const char *total_p = find_json_key(agg_p, "\"total\"");
+    const char *yes_p = find_json_key(agg_p, "\"yes_count\"");
+    const char *sly_p = find_json_key(agg_p, "\"sum_log_yes\"");
+    const char *sln_p = find_json_key(agg_p, "\"sum_log_no\"");
+    if (!total_p || !yes_p || !sly_p || !sln_p) {
+        LOG_I("aggregate 欄位不完整");
+        return -1;
+    }
+
+    agg->total = (int)atof_lite(total_p);
+    agg->yes_count = (int)atof_lite(yes_p);
+    agg->sum_log_yes = atof_lite(sly_p);
+    agg->sum_log_no = atof_lite(sln_p);
+    if (agg->total <= 0 || agg->yes_count < 0 || agg->yes_count > agg->total) {
+        LOG_I("aggregate 數值不合法: total=%d, yes_count=%d", agg->total, agg->yes_count);
+        return -1;
+    }
+    return 1;
+}
+
+static void aggregate_voters(const VoterInfo *voters, int num_voters, BtsAggregate *agg) {
+    memset(agg, 0, sizeof(*agg));
+    agg->total = num_voters;
     for (int i = 0; i < num_voters; i++) {
         if (strcmp(voters[i].vote, "yes") == 0)
-            yes_count++;
+            agg->yes_count++;
+        agg->sum_log_yes += ln_lite(clamp_eps(voters[i].prediction_yes));
+        agg->sum_log_no += ln_lite(clamp_eps(voters[i].prediction_no));
     }
-    float actual_yes_ratio = (float)yes_count / num_voters;
+}
 
-    LOG_I("實際 yes 比例: %d/%d = %d", yes_count, num_voters, (int)(actual_yes_ratio * 10000));
+/*
+ * Bayesian Truth Serum，與後端 app/services/bts_scoring.py 相同的公式：
+ *   info_k = ln(f_k) - mean(ln p_k)
+ *   score  = info_{自己的選項} - (p_yes * info_yes + p_no * info_no)
+ */
+static void compute_bts_scores(const VoterInfo *voters, int num_voters,
+                               const BtsAggregate *agg, int *scores) {
+    float total = (float)agg->total;
+    float log_f_yes = ln_lite(clamp_eps((float)agg->yes_count / total));
+    float log_f_no = ln_lite(clamp_eps((float)(agg->total - agg->yes_count) / total));
+    float info_yes = log_f_yes - agg->sum_log_yes / total;
+    float info_no = log_f_no - agg->sum_log_no / total;
 
-    // 2. 計算每個人的預測準確性（越接近 actual_yes_ratio 越好）
-    for (int i = 0; i < num_voters; i++) {
-        float pred_yes = voters[i].prediction_yes;
+    LOG_I("yes 比例: %d/%d", agg->yes_count, agg->total);
 
-        // score = 1 - abs(預測 - 真實)
-        float accuracy_score = 1.0f - (pred_yes > actual_yes_ratio ?
-                                       (pred_yes - actual_yes_ratio) :
-                                       (actual_yes_ratio - pred_yes));
+    for (int i = 0; i < num_voters; i++) {
+        float p_yes = clamp_eps(voters[i].prediction_yes);
+        float p_no = clamp_eps(voters[i].prediction_no);
 
-        // 再乘上 100 當作整數分數
-        int score = (int)(accuracy_score * 100.0f);
+        // information score + prediction score
+        float term_a = strcmp(voters[i].vote, "yes") == 0 ? info_yes : info_no;
+        float term_b = -(p_yes * info_yes + p_no * info_no);
+        float score = (term_a + term_b) * BTS_SCORE_SCALE;
 
-        // 👇 這裡還沒加入 information gain（可後續擴充）
-        scores[i] = score;
+        scores[i] = (int)(score >= 0 ? score + 0.5f : score - 0.5f);
 
         LOG_I("user=%s, score=%d", voters[i].user, scores[i]);
     }
@@ -239,8 +339,18 @@ static TEE_Result handle_process_vote(uint32_t param_types, TEE_Param params[4])
             (int)(voters[i].prediction_no * 10000));
     }
 
+    BtsAggregate agg;
+    int has_aggregate = parse_aggregate(input, &agg);
+    if (has_aggregate < 0) {
+        TEE_Free(voters);
+        return TEE_ERROR_BAD_PARAMETERS;
+    }
+    if (!has_aggregate)
+        aggregate_voters(voters, num_voters, &agg);
+
     int scores[MAX_VOTERS] = {0};
-    compute_bts_scores(voters, num_voters, scores);
+    if (agg.total > 0)
+        compute_bts_scores(voters, num_voters, &agg, scores);
 
     char *output = (char *)params[1].memref.buffer;
     size_t max_len = params[1].memref.size;
@@ -259,6 +369,7 @@ static TEE_Result handle_process_vote(uint32_t param_types, TEE_Param params[4])
     safe_concat(output, max_len, "}");
 
     fake_sign_result(output, max_len);
+    safe_concat(output, max_len, "}");
     params[1].memref.size = strlen(output);
 
     LOG_I("處理投票結果: %s", output);